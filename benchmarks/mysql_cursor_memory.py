@@ -0,0 +1,62 @@
+"""Measure Python memory use of MySQLConnection across many statements.
+
+Memory should stay flat: statements share one cursor and fetch cursors are closed
+after use. Uses the same environment variables as the CLI, e.g.
+
+    DB_NAME=migritestdb DB_USER=root DB_PASS=passpass DB_HOST=127.0.0.1 \\
+        python benchmarks/mysql_cursor_memory.py 100000
+"""
+import asyncio
+import os
+import sys
+import time
+import tracemalloc
+
+from migri.backends.mysql import MySQLConnection
+from migri.elements import Query
+
+SAMPLES = 10
+
+
+async def main(statements: int):
+    conn = MySQLConnection(
+        os.getenv("DB_NAME", "migritestdb"),
+        db_user=os.getenv("DB_USER", "root"),
+        db_pass=os.getenv("DB_PASS", "passpass"),
+        db_host=os.getenv("DB_HOST", "127.0.0.1"),
+        db_port=int(os.getenv("DB_PORT", 3306)),
+    )
+
+    async with conn:
+        await conn.execute(
+            Query("CREATE TEMPORARY TABLE migri_bench (n integer NOT NULL)")
+        )
+        tracemalloc.start()
+        start = time.perf_counter()
+        print("statements\tcurrent KiB\tpeak KiB")
+
+        for n in range(1, statements + 1):
+            await conn.execute(
+                Query("INSERT INTO migri_bench (n) VALUES ($n)", values={"n": n})
+            )
+
+            if n % 10 == 0:
+                await conn.fetch(Query("SELECT COUNT(*) AS total FROM migri_bench"))
+
+            if n % (statements // SAMPLES) == 0:
+                current, peak = tracemalloc.get_traced_memory()
+                print(f"{n}\t{current / 1024:.1f}\t{peak / 1024:.1f}")
+
+        elapsed = time.perf_counter() - start
+        tracemalloc.stop()
+
+        batches = 0
+
+        async for _ in conn.iterate(Query("SELECT n FROM migri_bench"), 10000):
+            batches += 1
+
+    print(f"{statements} statements in {elapsed:.2f}s, streamed {batches} batches")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000))
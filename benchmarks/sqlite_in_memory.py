@@ -0,0 +1,64 @@
+"""Compare applying SQLite migrations in place with building the database in memory.
+
+Generates migrations that create tables, insert rows and add indexes, then applies
+them to a new database file both ways, e.g.
+
+    python benchmarks/sqlite_in_memory.py 2000
+"""
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+from migri import apply_migrations, get_connection
+
+ROWS_PER_MIGRATION = 50
+
+
+def write_migrations(directory: str, count: int):
+    for n in range(count):
+        table = f"table_{n // 3}"
+
+        if n % 3 == 0:
+            statement = f"CREATE TABLE {table} (id integer PRIMARY KEY, value text);"
+        elif n % 3 == 1:
+            values = ", ".join(f"('value {i}')" for i in range(ROWS_PER_MIGRATION))
+            statement = f"INSERT INTO {table} (value) VALUES {values};"
+        else:
+            statement = f"CREATE INDEX {table}_value_idx ON {table} (value);"
+
+        with open(os.path.join(directory, f"{n:06d}_migration.sql"), "w") as f:
+            f.write(statement)
+
+
+async def timed(migrations_dir: str, db_name: str, in_memory: bool) -> float:
+    start = time.perf_counter()
+
+    # Don't measure printing a line per migration
+    with contextlib.redirect_stdout(io.StringIO()):
+        await apply_migrations(
+            migrations_dir, get_connection(db_name), in_memory=in_memory
+        )
+
+    return time.perf_counter() - start
+
+
+async def main(count: int):
+    with tempfile.TemporaryDirectory() as directory:
+        migrations_dir = os.path.join(directory, "migrations")
+        os.mkdir(migrations_dir)
+        write_migrations(migrations_dir, count)
+
+        in_place = await timed(migrations_dir, os.path.join(directory, "a.db"), False)
+        in_memory = await timed(migrations_dir, os.path.join(directory, "b.db"), True)
+
+    print(f"{count} migrations")
+    print(f"in place\t{in_place:.2f}s")
+    print(f"in memory\t{in_memory:.2f}s ({in_place / in_memory:.1f}x)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000))
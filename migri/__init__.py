@@ -1,7 +1,13 @@
 from migri.backends.postgresql import PostgreSQLConnection
 from migri.main import (
     apply_migrations,
+    bundle_migrations,
     get_connection,
+    lint_migrations,
+    plan_migrations,
+    provision_databases,
+    render_migrations,
+    verify_migrations,
     # TODO remove in 1.1.0
     run_initialization,
     run_migrations,
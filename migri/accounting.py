@@ -0,0 +1,197 @@
+import logging
+from typing import Any, Dict, List, Optional
+
+from migri.elements import Query
+from migri.interfaces import ConnectionBackend
+
+__all__ = [
+    "MySQLResourceAccounting",
+    "PostgreSQLResourceAccounting",
+    "ResourceAccounting",
+    "SQLiteResourceAccounting",
+    "create_resource_accounting",
+    "format_resources",
+]
+logger = logging.getLogger(__name__)
+
+Counters = Dict[str, int]
+
+
+def format_resources(resources: Optional[Counters]) -> str:
+    if not resources:
+        return ""
+
+    return " (" + ", ".join(f"{k}={v}" for k, v in sorted(resources.items())) + ")"
+
+
+class ResourceAccounting:
+    """Measures nothing. Subclasses read cumulative database counters before and
+    after each migration, the difference is the migration's resource usage.
+
+    :param connection: Connected backend the migrations run on
+    :type connection: ConnectionBackend
+    """
+
+    def __init__(self, connection: ConnectionBackend):
+        self.connection = connection
+        self.probes: List[str] = []
+
+    async def _available(self, query: str) -> bool:
+        try:
+            await self.connection.fetch_all(Query(query))
+        except Exception as e:
+            logger.info("Resource accounting query unavailable: %s", e)
+            return False
+
+        return True
+
+    async def prepare(self):
+        """Find out which counters can be read, called before migrations run"""
+        pass
+
+    async def _read(self, probe: str) -> Counters:
+        raise NotImplementedError
+
+    async def snapshot(self) -> Counters:
+        counters = {}
+
+        for probe in self.probes:
+            counters.update(await self._read(probe))
+
+        return counters
+
+    @staticmethod
+    def usage(before: Counters, after: Counters) -> Counters:
+        return {
+            name: after[name] - before[name]
+            for name in after
+            if before.get(name) is not None and after[name] is not None
+        }
+
+
+def _to_int(row: Dict[str, Any]) -> Counters:
+    return {k: int(v) if v is not None else None for k, v in row.items()}
+
+
+class PostgreSQLResourceAccounting(ResourceAccounting):
+    """WAL bytes generated and, with pg_stat_statements, rows and shared blocks of
+    statements by the current user in the current database. Both are cumulative
+    for the whole server or database, so concurrent traffic is included.
+    """
+
+    PROBES = {
+        "wal": "SELECT (pg_current_wal_lsn() - '0/0'::pg_lsn)::bigint AS wal_bytes",
+        "statements": (
+            "SELECT COALESCE(SUM(rows), 0)::bigint AS rows, "
+            "COALESCE(SUM(shared_blks_hit), 0)::bigint AS blocks_hit, "
+            "COALESCE(SUM(shared_blks_read), 0)::bigint AS blocks_read, "
+            "COALESCE(SUM(shared_blks_written), 0)::bigint AS blocks_written "
+            "FROM pg_stat_statements "
+            "WHERE dbid = (SELECT oid FROM pg_database "
+            "WHERE datname = current_database()) "
+            "AND userid = current_user::regrole::oid"
+        ),
+    }
+
+    async def _available(self, query: str) -> bool:
+        # In a (sub)transaction that's rolled back, a failed query must not abort a
+        # transaction the connection is in
+        async with self.connection.transaction():
+            return await super()._available(query)
+
+    async def prepare(self):
+        self.probes = [p for p, q in self.PROBES.items() if await self._available(q)]
+
+    async def _read(self, probe: str) -> Counters:
+        return _to_int(await self.connection.fetch(Query(self.PROBES[probe])))
+
+
+class MySQLResourceAccounting(ResourceAccounting):
+    """Binary log bytes written (requires binary logging and the REPLICATION CLIENT
+    privilege) and, with performance_schema, rows affected and examined by the
+    migration's connection. Binary log bytes include concurrent traffic.
+    """
+
+    THREAD_STATEMENTS_QUERY = (
+        "SELECT SUM(SUM_ROWS_AFFECTED) AS `rows`, "
+        "SUM(SUM_ROWS_EXAMINED) AS rows_examined "
+        "FROM performance_schema.events_statements_summary_by_thread_by_event_name "
+        "WHERE THREAD_ID = (SELECT THREAD_ID FROM performance_schema.threads "
+        "WHERE PROCESSLIST_ID = CONNECTION_ID())"
+    )
+
+    # SHOW MASTER STATUS was renamed in MySQL 8.2 and removed in 8.4
+    BINLOG_STATUS_QUERIES = ("SHOW BINARY LOG STATUS", "SHOW MASTER STATUS")
+
+    def __init__(self, connection: ConnectionBackend):
+        super().__init__(connection)
+        self.binlog_status_query: Optional[str] = None
+
+    async def prepare(self):
+        probes = {
+            "binlog": "SHOW BINARY LOGS",
+            "statements": self.THREAD_STATEMENTS_QUERY,
+        }
+        self.probes = [p for p, q in probes.items() if await self._available(q)]
+
+        if "binlog" in self.probes:
+            for query in self.BINLOG_STATUS_QUERIES:
+                if await self._available(query):
+                    self.binlog_status_query = query
+                    break
+            else:
+                self.probes.remove("binlog")
+
+    async def _binlog_bytes(self) -> Optional[int]:
+        logs = await self.connection.fetch_all(Query("SHOW BINARY LOGS"))
+        status = await self.connection.fetch_all(Query(self.binlog_status_query))
+
+        if not status:
+            return None
+
+        # Total of rotated logs plus the position in the current one
+        current = status[0]["File"]
+        rotated = sum(
+            int(log["File_size"]) for log in logs if log["Log_name"] < current
+        )
+
+        return rotated + int(status[0]["Position"])
+
+    async def _read(self, probe: str) -> Counters:
+        if probe == "binlog":
+            return {"binlog_bytes": await self._binlog_bytes()}
+
+        return _to_int(await self.connection.fetch(Query(self.THREAD_STATEMENTS_QUERY)))
+
+
+class SQLiteResourceAccounting(ResourceAccounting):
+    """Rows changed on the migration's connection and growth of the database file"""
+
+    async def prepare(self):
+        self.probes = ["changes"]
+
+    async def _read(self, probe: str) -> Counters:
+        return await self.connection.fetch(
+            Query(
+                "SELECT total_changes() AS rows, page_count * page_size AS size_bytes "
+                "FROM pragma_page_count, pragma_page_size"
+            )
+        )
+
+
+RESOURCE_ACCOUNTING = {
+    "mysql": MySQLResourceAccounting,
+    "postgresql": PostgreSQLResourceAccounting,
+    "sqlite": SQLiteResourceAccounting,
+}
+
+
+def create_resource_accounting(connection: ConnectionBackend) -> ResourceAccounting:
+    try:
+        accounting = RESOURCE_ACCOUNTING[connection.dialect]
+    except KeyError:
+        raise RuntimeError(
+            f"Resource accounting isn't supported with {connection.dialect}"
+        )
+
+    return accounting(connection)
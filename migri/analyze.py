@@ -0,0 +1,166 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Iterable, List, Optional
+
+from migri.elements import Query
+from migri.interfaces import ConnectionBackend
+from migri.statements import quote_identifier
+
+__all__ = [
+    "AnalyzeResult",
+    "MySQLTableAnalyzer",
+    "PostgreSQLTableAnalyzer",
+    "SQLiteTableAnalyzer",
+    "TableAnalyzer",
+    "create_table_analyzer",
+]
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class AnalyzeResult:
+    table: str
+    seconds: float
+    error: Optional[str] = None
+
+
+class TableAnalyzer:
+    """Refresh planner statistics of tables with `ANALYZE`, e.g. of tables
+    migrations rewrote or loaded, so queries after a deploy don't have to wait for
+    background statistics collection
+
+    :param connection: Connected backend
+    :type connection: ConnectionBackend
+    :param jobs: Tables to analyze concurrently, on new connections if more than 1
+    :type jobs: int
+    """
+
+    # Whether tables can be analyzed on separate connections at the same time
+    parallel = True
+
+    def __init__(self, connection: ConnectionBackend, jobs: int = 1):
+        if jobs < 1:
+            raise ValueError("Expected at least one job")
+
+        self.connection = connection
+        self.jobs = jobs
+
+    @staticmethod
+    def quote(table: str) -> str:
+        raise NotImplementedError
+
+    async def _analyze(self, connection: ConnectionBackend, table: str):
+        raise NotImplementedError
+
+    async def _analyze_table(
+        self, connection: ConnectionBackend, table: str
+    ) -> AnalyzeResult:
+        start = time.perf_counter()
+
+        try:
+            await self._analyze(connection, table)
+        except Exception as e:
+            # Stale statistics aren't worth failing a finished run for
+            logger.warning("Couldn't analyze %s: %s", table, e)
+            return AnalyzeResult(table, time.perf_counter() - start, str(e))
+
+        seconds = time.perf_counter() - start
+        logger.info("Analyzed %s in %.1fs", table, seconds)
+
+        return AnalyzeResult(table, seconds)
+
+    async def run(self, tables: Iterable[str]) -> List[AnalyzeResult]:
+        """Analyze each table once, in the order given
+
+        :param tables: Table names, optionally schema qualified
+        :type tables: Iterable[str]
+        """
+        tables = list(dict.fromkeys(tables))
+        jobs = min(self.jobs, len(tables))
+
+        # Provided connections can't be spawned
+        provided = getattr(self.connection, "connection", None) is not None
+
+        if jobs <= 1 or not self.parallel or provided:
+            return [await self._analyze_table(self.connection, t) for t in tables]
+
+        connections = [self.connection.spawn() for _ in range(jobs)]
+        available = asyncio.Queue()
+
+        async def analyze(table: str) -> AnalyzeResult:
+            connection = await available.get()
+
+            try:
+                return await self._analyze_table(connection, table)
+            finally:
+                available.put_nowait(connection)
+
+        try:
+            for connection in connections:
+                await connection.connect()
+                available.put_nowait(connection)
+
+            return list(await asyncio.gather(*(analyze(t) for t in tables)))
+        finally:
+            for connection in connections:
+                await connection.disconnect()
+
+
+class PostgreSQLTableAnalyzer(TableAnalyzer):
+    @staticmethod
+    def quote(table: str) -> str:
+        return quote_identifier(table, '"')
+
+    async def _analyze(self, connection: ConnectionBackend, table: str):
+        await connection.execute(Query(f"ANALYZE {self.quote(table)}"))
+
+
+class MySQLTableAnalyzer(TableAnalyzer):
+    """Samples InnoDB index statistics. The statement is written to the binary log,
+    so replicas refresh their statistics as well.
+    """
+
+    @staticmethod
+    def quote(table: str) -> str:
+        return quote_identifier(table, "`")
+
+    async def _analyze(self, connection: ConnectionBackend, table: str):
+        # Problems are reported as rows rather than raised
+        rows = await connection.fetch_all(Query(f"ANALYZE TABLE {self.quote(table)}"))
+        errors = [r["Msg_text"] for r in rows if r["Msg_type"].lower() == "error"]
+
+        if errors:
+            raise RuntimeError("; ".join(errors))
+
+
+class SQLiteTableAnalyzer(TableAnalyzer):
+    """Writes `sqlite_stat1`, which only one connection can do at a time"""
+
+    parallel = False
+
+    @staticmethod
+    def quote(table: str) -> str:
+        return quote_identifier(table, '"')
+
+    async def _analyze(self, connection: ConnectionBackend, table: str):
+        await connection.execute(Query(f"ANALYZE {self.quote(table)}"))
+
+
+TABLE_ANALYZERS = {
+    "mysql": MySQLTableAnalyzer,
+    "postgresql": PostgreSQLTableAnalyzer,
+    "sqlite": SQLiteTableAnalyzer,
+}
+
+
+def create_table_analyzer(
+    connection: ConnectionBackend, jobs: int = 1
+) -> TableAnalyzer:
+    try:
+        analyzer = TABLE_ANALYZERS[connection.dialect]
+    except KeyError:
+        raise RuntimeError(f"ANALYZE isn't supported with {connection.dialect}")
+
+    return analyzer(connection, jobs)
@@ -1,5 +1,5 @@
 import re
-from typing import Any, Dict, List
+from typing import Any, AsyncIterator, Dict, List
 
 import aiomysql
 
@@ -9,6 +9,7 @@ from migri.interfaces import ConnectionBackend, TransactionBackend
 
 class MySQLConnection(ConnectionBackend):
     _dialect = "mysql"
+    _cursor = None
 
     @staticmethod
     def _compile(query: Query) -> dict:
@@ -25,11 +26,11 @@ class MySQLConnection(ConnectionBackend):
 
         return {"query": q, "values": v}
 
-    async def _cursor_execute(self, query: Query) -> aiomysql.Cursor:
+    async def _cursor_execute(self, cursor: aiomysql.Cursor, query: Query):
         q = self._compile(query)
-        cur = await self.db.cursor(aiomysql.DictCursor)
-        await cur.execute(q["query"], q["values"])
-        return cur
+
+        # Without values, % must not be treated as a format character
+        await cursor.execute(q["query"], q["values"] or None)
 
     async def connect(self):
         if not self.db:
@@ -42,18 +43,69 @@ class MySQLConnection(ConnectionBackend):
             )
 
     async def disconnect(self):
+        if self._cursor is not None:
+            await self._cursor.close()
+            self._cursor = None
+
         self.db.close()
 
-    async def execute(self, query: Query):
-        await self._cursor_execute(query)
+    async def execute(self, query: Query) -> int:
+        # Statements without a result set share a cursor, executing on it discards
+        # the previous (buffered) result so nothing accumulates
+        if self._cursor is None:
+            self._cursor = await self.db.cursor(aiomysql.DictCursor)
+
+        await self._cursor_execute(self._cursor, query)
+
+        return self._cursor.rowcount
+
+    async def execute_many(self, query: Query, values: List[Dict[str, Any]]):
+        """Execute a statement once per set of values. Multi-row `INSERT ... VALUES`
+        statements are batched into as few round trips as possible.
+
+        :param query: Query with placeholders, its values are ignored
+        :type query: Query
+        :param values: Values for each execution
+        :type values: list
+        """
+        names = [p.replace("$", "") for p in query.placeholders]
+        statement = self._compile(Query(query.statement, values[0]))["query"]
+
+        async with self.db.cursor() as cursor:
+            await cursor.executemany(statement, [[v[n] for n in names] for v in values])
 
     async def fetch(self, query: Query) -> Dict[str, Any]:
-        cursor = await self._cursor_execute(query)
-        return await cursor.fetchone()
+        async with self.db.cursor(aiomysql.DictCursor) as cursor:
+            await self._cursor_execute(cursor, query)
+            return await cursor.fetchone()
 
     async def fetch_all(self, query: Query) -> List[Dict[str, Any]]:
-        cursor = await self._cursor_execute(query)
-        return await cursor.fetchall()
+        async with self.db.cursor(aiomysql.DictCursor) as cursor:
+            await self._cursor_execute(cursor, query)
+            return await cursor.fetchall()
+
+    async def iterate(
+        self, query: Query, batch_size: int = 1000
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Stream rows in batches with an unbuffered cursor, so only one batch is
+        held in memory. The connection can't be used for anything else until
+        iteration is done.
+
+        :param query: Query to run
+        :type query: Query
+        :param batch_size: Rows per batch
+        :type batch_size: int
+        """
+        async with self.db.cursor(aiomysql.SSDictCursor) as cursor:
+            await self._cursor_execute(cursor, query)
+
+            while True:
+                rows = await cursor.fetchmany(batch_size)
+
+                if not rows:
+                    break
+
+                yield rows
 
     def transaction(self) -> "TransactionBackend":
         return MySQLTransaction(self)
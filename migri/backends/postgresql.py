@@ -1,6 +1,6 @@
 import re
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional
 
 import asyncpg
 
@@ -49,9 +49,28 @@ class PostgreSQLConnection(ConnectionBackend):
             # don't close the connection if we didn't create it
             await self.db.close()
 
-    async def execute(self, query: Query):
+    async def execute(self, query: Query) -> Optional[int]:
         q = self._compile(query)
-        await self.db.execute(q["query"], *q["values"])
+        status = await self.db.execute(q["query"], *q["values"])
+
+        # e.g. INSERT 0 250, statements without a row count return None
+        count = status.split()[-1] if status else ""
+        return int(count) if count.isdigit() else None
+
+    async def execute_many(self, query: Query, values: List[Dict[str, Any]]):
+        """Execute a statement once per set of values, in a single round trip
+
+        :param query: Query with placeholders, its values are ignored
+        :type query: Query
+        :param values: Values for each execution
+        :type values: list
+        """
+        names = list(dict.fromkeys(p.replace("$", "") for p in query.placeholders))
+        statement = self._compile(
+            Query(query.statement, {n: values[0][n] for n in names})
+        )["query"]
+
+        await self.db.executemany(statement, [[v[n] for n in names] for v in values])
 
     async def fetch(self, query: Query) -> Dict[str, Any]:
         q = self._compile(query)
@@ -64,6 +83,31 @@ class PostgreSQLConnection(ConnectionBackend):
 
         return [dict(r) for r in res]
 
+    async def iterate(
+        self, query: Query, batch_size: int = 1000
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Stream rows in batches with a server-side cursor, so only one batch is
+        held in memory. Cursors need a transaction, a savepoint is used if one is
+        already open.
+
+        :param query: Query to run
+        :type query: Query
+        :param batch_size: Rows per batch
+        :type batch_size: int
+        """
+        q = self._compile(query)
+
+        async with self.db.transaction():
+            cursor = await self.db.cursor(q["query"], *q["values"])
+
+            while True:
+                rows = await cursor.fetch(batch_size)
+
+                if not rows:
+                    break
+
+                yield [dict(r) for r in rows]
+
     def transaction(self) -> TransactionBackend:
         return PostgreSQLTransaction(self)
 
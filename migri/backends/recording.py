@@ -0,0 +1,239 @@
+import csv
+import dataclasses
+import io
+import re
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Any, AsyncIterable, Dict, List, Match, Optional
+
+from migri.elements import Query
+from migri.interfaces import ConnectionBackend, TransactionBackend
+from migri.statements import quote_identifier
+
+__all__ = ["RecordingConnection", "render_literal", "render_query"]
+
+PLACEHOLDER_PATTERN = re.compile(r"\$([_a-z][_a-z0-9]*)")
+COMMENT_PATTERN = re.compile(r"(?:\s*(?:--[^\n]*|/\*.*?\*/))*\s*", re.DOTALL)
+# Statements with semicolons of their own (e.g. a trigger's BEGIN ... END block)
+# are sent to the mysql client with another delimiter
+MYSQL_DELIMITER = "$$"
+
+
+def render_literal(value: Any, dialect: str) -> str:
+    """Render a value as a SQL literal of `dialect`
+
+    :param value: Value bound to a placeholder
+    :type value: Any
+    :param dialect: Dialect to render for
+    :type dialect: str
+    """
+    if value is None:
+        return "NULL"
+    if isinstance(value, bool):
+        if dialect == "postgresql":
+            return "TRUE" if value else "FALSE"
+
+        return str(int(value))
+    if isinstance(value, (int, float, Decimal)):
+        return str(value)
+    if isinstance(value, bytes):
+        if dialect == "postgresql":
+            return f"'\\x{value.hex()}'::bytea"
+
+        return f"X'{value.hex()}'"
+
+    text = str(value).replace("'", "''")
+
+    if dialect == "mysql":
+        # Backslashes are escape characters in MySQL strings by default
+        text = text.replace("\\", "\\\\")
+
+    return f"'{text}'"
+
+
+def render_query(query: Query, dialect: str) -> str:
+    """Render a query with its values inlined as literals"""
+    if not query.values:
+        return query.statement
+
+    def replace(match: Match) -> str:
+        name = match.group(1)
+
+        if name not in query.values:
+            return match.group()
+
+        return render_literal(query.values[name], dialect)
+
+    return PLACEHOLDER_PATTERN.sub(replace, query.statement)
+
+
+class RecordedDatabase:
+    """Stands in for the driver connection, which Python migrations are passed as
+    `conn`. Only bulk loads can be recorded.
+    """
+
+    def __init__(self, connection: "RecordingConnection"):
+        self._connection = connection
+
+    async def copy_to_table(
+        self,
+        table_name: str,
+        *,
+        source: AsyncIterable[bytes],
+        columns: List[str],
+        schema_name: Optional[str] = None,
+        format: str = "csv",
+        delimiter: str = ",",
+        null: str = "",
+    ) -> str:
+        table = f"{schema_name}.{table_name}" if schema_name else table_name
+        options = ", ".join(
+            [
+                f"FORMAT {format}",
+                f"DELIMITER {render_literal(delimiter, 'postgresql')}",
+                f"NULL {render_literal(null, 'postgresql')}",
+            ]
+        )
+        data = b"".join([chunk async for chunk in source]).decode()
+
+        if data and not data.endswith("\n"):
+            data += "\n"
+
+        # Rows follow the statement in the script, as psql reads them from STDIN
+        self._connection.statements.append(
+            f"COPY {quote_identifier(table)} "
+            f"({', '.join(quote_identifier(c) for c in columns)}) "
+            f"FROM STDIN WITH ({options});\n{data}\\."
+        )
+
+        rows = sum(1 for _ in csv.reader(io.StringIO(data), delimiter=delimiter))
+
+        return f"COPY {rows}"
+
+    def __getattr__(self, name: str):
+        raise RuntimeError(
+            "Migrations using the driver connection can't be recorded, "
+            "use the `backend` argument instead"
+        )
+
+
+@dataclass
+class RecordingConnection(ConnectionBackend):
+    """Records the statements it's given as SQL of `target_dialect`, with values
+    inlined, instead of executing them, e.g. to render a script for a native client
+    or to measure migri's own overhead without a database. Queries are answered by
+    `source` (e.g. which migrations were applied) or return no rows without one.
+
+    :param source: Connection to read from, it's not written to
+    :type source: ConnectionBackend, optional
+    :param target_dialect: Dialect to render statements for, defaults to the
+        source's dialect
+    :type target_dialect: str, optional
+    """
+
+    source: Optional[ConnectionBackend] = None
+    target_dialect: Optional[str] = None
+    # Shared with spawned copies, so statements of parallel groups are recorded too
+    statements: List[str] = field(default_factory=list)
+
+    def __post_init__(self):
+        if self.source is None and self.target_dialect is None:
+            raise RuntimeError("Expected source or target_dialect")
+
+        self.target_dialect = self.target_dialect or self.source.dialect
+        self.db_name = self.db_name or getattr(self.source, "db_name", None)
+
+    @property
+    def dialect(self) -> str:
+        return self.target_dialect
+
+    @property
+    def database(self) -> RecordedDatabase:
+        return RecordedDatabase(self)
+
+    async def connect(self):
+        if self.source is not None:
+            await self.source.connect()
+
+    async def disconnect(self):
+        if self.source is not None:
+            await self.source.disconnect()
+
+    def _terminate(self, statement: str) -> str:
+        if self.target_dialect == "mysql" and ";" in statement:
+            return (
+                f"DELIMITER {MYSQL_DELIMITER}\n{statement}{MYSQL_DELIMITER}\n"
+                f"DELIMITER ;"
+            )
+        if "--" in statement.splitlines()[-1]:
+            # Not inside a trailing comment
+            return f"{statement}\n;"
+
+        return f"{statement};"
+
+    def record(self, statement: str):
+        """Add a statement to the script, terminated for the dialect's client"""
+        statement = statement.strip()
+
+        if statement.endswith(";"):
+            statement = statement[:-1].rstrip()
+
+        # Only a comment, which would leave an empty statement if terminated
+        if not COMMENT_PATTERN.fullmatch(statement):
+            statement = self._terminate(statement)
+
+        self.statements.append(statement)
+
+    def script(self) -> str:
+        """Recorded statements as a script, in order"""
+        return "".join(f"{s}\n" for s in self.statements)
+
+    async def execute(self, query: Query):
+        self.record(render_query(query, self.target_dialect))
+
+    async def execute_many(self, query: Query, values: List[Dict[str, Any]]):
+        for v in values:
+            self.record(render_query(Query(query.statement, v), self.target_dialect))
+
+    async def fetch(self, query: Query) -> Optional[Dict[str, Any]]:
+        if self.source is None:
+            return None
+
+        return await self.source.fetch(query)
+
+    async def fetch_all(self, query: Query) -> List[Dict[str, Any]]:
+        if self.source is None:
+            return []
+
+        return await self.source.fetch_all(query)
+
+    def spawn(self, **changes) -> "RecordingConnection":
+        # Reads go to the original, copies only record
+        return dataclasses.replace(self, source=None, **changes)
+
+    def transaction(self) -> "RecordingTransaction":
+        return RecordingTransaction(self)
+
+
+class RecordingTransaction(TransactionBackend):
+    """Records transaction boundaries. Commits and rollbacks of transactions that
+    weren't started (e.g. implicit ones) are left out.
+    """
+
+    def __init__(self, connection: RecordingConnection):
+        super().__init__(connection)
+        self._started = False
+
+    async def start(self):
+        self._connection.record("BEGIN")
+        self._started = True
+
+    async def commit(self):
+        if self._started:
+            self._connection.record("COMMIT")
+            self._started = False
+
+    async def rollback(self):
+        if self._started:
+            self._connection.record("ROLLBACK")
+            self._started = False
@@ -1,14 +1,36 @@
 import re
-from typing import Any, Dict, List
+import sqlite3
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Union
 
 import aiosqlite
 
 from migri.elements import Query
 from migri.interfaces import ConnectionBackend, TransactionBackend
 
+FAST_PRAGMAS = {
+    "journal_mode": "wal",
+    "synchronous": "normal",
+    "cache_size": -65536,  # KiB, i.e. 64 MiB
+    "temp_store": "memory",
+}
+PRAGMA_PROFILES = {"default": None, "fast": FAST_PRAGMAS}
 
+
+@dataclass
 class SQLiteConnection(ConnectionBackend):
+    """
+    :param pragmas: Pragmas to set for the duration of the connection, previous
+        values are restored on disconnect (e.g. `FAST_PRAGMAS`)
+    :type pragmas: dict, optional
+    """
+
     _dialect = "sqlite"
+    pragmas: Optional[Dict[str, Any]] = None
+
+    def __post_init__(self):
+        super().__post_init__()
+        self._previous_pragmas: Dict[str, Any] = {}
 
     @staticmethod
     def _compile(query: Query) -> dict:
@@ -25,16 +47,63 @@ class SQLiteConnection(ConnectionBackend):
 
         return {"query": q, "values": v}
 
+    @staticmethod
+    def _pragma_statement(name: str, value: Any = None) -> str:
+        # PRAGMA doesn't accept bound parameters, so only allow plain values
+        if not re.match(r"^[a-z_]+$", name):
+            raise ValueError(f"Invalid pragma: {name}")
+
+        if value is None:
+            return f"PRAGMA {name}"
+
+        if not re.match(r"^-?\w+$", str(value)):
+            raise ValueError(f"Invalid value for pragma {name}: {value}")
+
+        return f"PRAGMA {name} = {value}"
+
+    async def _set_pragmas(self):
+        for name, value in (self.pragmas or {}).items():
+            previous = await self.fetch_all(Query(self._pragma_statement(name)))
+
+            if previous:
+                self._previous_pragmas[name] = list(previous[0].values())[0]
+
+            await self.fetch_all(Query(self._pragma_statement(name, value)))
+
+    async def _restore_pragmas(self):
+        # Restore in reverse order, e.g. synchronous depends on journal_mode
+        for name, value in reversed(list(self._previous_pragmas.items())):
+            await self.fetch_all(Query(self._pragma_statement(name, value)))
+
+        self._previous_pragmas.clear()
+
     async def connect(self):
         self.db = await aiosqlite.connect(self.db_name)
         self.db.row_factory = aiosqlite.Row
+        await self._set_pragmas()
 
     async def disconnect(self):
+        await self._restore_pragmas()
         await self.db.close()
 
-    async def execute(self, query: Query):
+    async def execute(self, query: Query) -> int:
         q = self._compile(query)
-        await self.db.execute(q["query"], q["values"])
+        cursor = await self.db.execute(q["query"], q["values"])
+
+        return cursor.rowcount
+
+    async def execute_many(self, query: Query, values: List[Dict[str, Any]]):
+        """Execute a statement once per set of values
+
+        :param query: Query with placeholders, its values are ignored
+        :type query: Query
+        :param values: Values for each execution
+        :type values: list
+        """
+        names = [p.replace("$", "") for p in query.placeholders]
+        statement = self._compile(Query(query.statement, values[0]))["query"]
+
+        await self.db.executemany(statement, [[v[n] for n in names] for v in values])
 
     async def fetch(self, query: Query) -> Dict[str, Any]:
         q = self._compile(query)
@@ -52,10 +121,147 @@ class SQLiteConnection(ConnectionBackend):
 
         return [dict(r) for r in res]
 
+    async def iterate(
+        self, query: Query, batch_size: int = 1000
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Stream rows in batches, so only one batch is held in memory
+
+        :param query: Query to run
+        :type query: Query
+        :param batch_size: Rows per batch
+        :type batch_size: int
+        """
+        q = self._compile(query)
+        cursor = await self.db.execute(q["query"], q["values"])
+
+        try:
+            while True:
+                rows = await cursor.fetchmany(batch_size)
+
+                if not rows:
+                    break
+
+                yield [dict(r) for r in rows]
+        finally:
+            await cursor.close()
+
+    async def backup(self, path: str):
+        """Copy the database to a file with the backup API, replacing its contents
+
+        :param path: Database file to write
+        :type path: str
+        """
+        target = sqlite3.connect(path)
+
+        try:
+            await self.db.backup(target)
+        finally:
+            target.close()
+
+    async def restore(self, path: str):
+        """Replace the database's contents with those of a database file
+
+        :param path: Database file to read
+        :type path: str
+        """
+        # Without pragmas, e.g. journal_mode must not change on the source file
+        async with self.spawn(db_name=path, pragmas=None) as source:
+            await source.database.backup(self.db)
+
     def transaction(self) -> "TransactionBackend":
         return SQLiteTransaction(self)
 
 
+class NativeSQLiteCursor:
+    """Async facade over a sqlite3 cursor, matching aiosqlite's Cursor"""
+
+    def __init__(self, cursor: sqlite3.Cursor):
+        self._cursor = cursor
+
+    @property
+    def lastrowid(self) -> Optional[int]:
+        return self._cursor.lastrowid
+
+    @property
+    def rowcount(self) -> int:
+        return self._cursor.rowcount
+
+    async def close(self):
+        self._cursor.close()
+
+    async def fetchall(self) -> List[sqlite3.Row]:
+        return self._cursor.fetchall()
+
+    async def fetchmany(self, size: Optional[int] = None) -> List[sqlite3.Row]:
+        return self._cursor.fetchmany(size or self._cursor.arraysize)
+
+    async def fetchone(self) -> Optional[sqlite3.Row]:
+        return self._cursor.fetchone()
+
+
+class NativeSQLiteDatabase:
+    """Async facade over a sqlite3 connection, matching the parts of aiosqlite's
+    Connection used by migrations. Calls run inline on the event loop instead of
+    being handed to a worker thread.
+    """
+
+    def __init__(self, connection: sqlite3.Connection):
+        self.connection = connection
+
+    async def close(self):
+        self.connection.close()
+
+    async def commit(self):
+        self.connection.commit()
+
+    async def execute(self, sql: str, parameters: Sequence = ()) -> NativeSQLiteCursor:
+        return NativeSQLiteCursor(self.connection.execute(sql, parameters))
+
+    async def executemany(
+        self, sql: str, parameters: Sequence[Sequence]
+    ) -> NativeSQLiteCursor:
+        return NativeSQLiteCursor(self.connection.executemany(sql, parameters))
+
+    async def backup(self, target: Union["NativeSQLiteDatabase", sqlite3.Connection]):
+        if isinstance(target, NativeSQLiteDatabase):
+            target = target.connection
+
+        self.connection.backup(target)
+
+    async def rollback(self):
+        self.connection.rollback()
+
+
+@dataclass
+class SQLiteNativeConnection(SQLiteConnection):
+    """SQLite backend using the standard library's sqlite3 module directly. Avoids
+    aiosqlite's thread hop per call, which is faster for the CLI (nothing else runs
+    on the event loop) but blocks the loop while statements run.
+    """
+
+    async def connect(self):
+        connection = sqlite3.connect(self.db_name)
+        connection.row_factory = sqlite3.Row
+        self.db = NativeSQLiteDatabase(connection)
+        await self._set_pragmas()
+
+    async def execute(self, query: Query) -> int:
+        q = self._compile(query)
+        return self.db.connection.execute(q["query"], q["values"]).rowcount
+
+    async def fetch(self, query: Query) -> Optional[Dict[str, Any]]:
+        q = self._compile(query)
+        row = self.db.connection.execute(q["query"], q["values"]).fetchone()
+
+        return dict(row) if row is not None else None
+
+    async def fetch_all(self, query: Query) -> List[Dict[str, Any]]:
+        q = self._compile(query)
+        cursor = self.db.connection.execute(q["query"], q["values"])
+
+        return [dict(r) for r in cursor.fetchall()]
+
+
 class SQLiteTransaction(TransactionBackend):
     async def start(self):
         # Nothing to do
@@ -0,0 +1,262 @@
+import asyncio
+import logging
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, List, Optional, Sequence, Tuple, Union
+
+from migri.elements import Query
+from migri.interfaces import ConnectionBackend
+from migri.throttle import Throttle
+
+__all__ = ["BackfillResult", "PartitionProgress", "parallel_backfill"]
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 1000
+
+# Process keys in (lower, upper], returns the number of rows processed
+BatchFunction = Callable[[ConnectionBackend, int, int], Awaitable[Optional[int]]]
+
+
+@dataclass
+class PartitionProgress:
+    partition: int
+    lower: int
+    upper: int
+    # Last key processed, batches resume after it
+    last_key: int
+    batches: int = 0
+    rows: int = 0
+    seconds: float = 0.0
+    done: bool = False
+
+    @property
+    def fraction(self) -> float:
+        if self.upper == self.lower:
+            return 1.0
+
+        return (self.last_key - self.lower) / (self.upper - self.lower)
+
+
+@dataclass
+class BackfillResult:
+    partitions: List[PartitionProgress] = field(default_factory=list)
+    seconds: float = 0.0
+
+    @property
+    def rows(self) -> int:
+        return sum(p.rows for p in self.partitions)
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+def split_key_range(lower: int, upper: int, partitions: int) -> List[Tuple[int, int]]:
+    """Split keys [lower, upper] into at most `partitions` ranges of (lower, upper]
+
+    :param lower: Lowest key
+    :type lower: int
+    :param upper: Highest key
+    :type upper: int
+    :param partitions: Number of ranges
+    :type partitions: int
+    """
+    if partitions < 1:
+        raise ValueError("Expected at least one partition")
+
+    start = lower - 1
+    size = max(-(-(upper - start) // partitions), 1)
+
+    return [(s, min(s + size, upper)) for s in range(start, upper, size)]
+
+
+class _Backfill:
+    def __init__(
+        self,
+        table: str,
+        key: str,
+        work: Union[str, BatchFunction],
+        batch_size: int,
+        throttle: Throttle,
+    ):
+        if not re.match(r"^\w+$", table) or not re.match(r"^\w+$", key):
+            raise ValueError("Invalid table or key name")
+
+        self.table = table
+        self.key = key
+        self.work = work
+        self.batch_size = batch_size
+        self.throttle = throttle
+
+    async def _next_batch(
+        self, connection: ConnectionBackend, progress: PartitionProgress
+    ) -> Tuple[int, Optional[int]]:
+        rows = await connection.fetch_all(
+            Query(
+                f"SELECT COUNT(*) AS total, MAX(k) AS upper FROM ("
+                f"SELECT {self.key} AS k FROM {self.table} "
+                f"WHERE {self.key} > $lower AND {self.key} <= $upper "
+                f"ORDER BY {self.key} LIMIT {int(self.batch_size)}) batch",
+                values={"lower": progress.last_key, "upper": progress.upper},
+            )
+        )
+
+        return rows[0]["total"], rows[0]["upper"]
+
+    async def _process(
+        self, connection: ConnectionBackend, lower: int, upper: int
+    ) -> Optional[int]:
+        if callable(self.work):
+            return await self.work(connection, lower, upper)
+
+        transaction = connection.transaction()
+
+        async with transaction:
+            await connection.execute(
+                Query(self.work, values={"lower": lower, "upper": upper})
+            )
+            await transaction.commit()
+
+        return None
+
+    async def run_partition(
+        self, connection: ConnectionBackend, progress: PartitionProgress
+    ):
+        start = time.perf_counter()
+
+        while True:
+            await self.throttle.wait(connection)
+            total, upper = await self._next_batch(connection, progress)
+
+            if not total:
+                break
+
+            processed = await self._process(connection, progress.last_key, upper)
+            progress.last_key = upper
+            progress.batches += 1
+            progress.rows += total if processed is None else processed
+            progress.seconds = time.perf_counter() - start
+
+        progress.done = True
+        logger.info(
+            "Backfilled partition %s of %s (%s rows in %.1fs)",
+            progress.partition,
+            self.table,
+            progress.rows,
+            progress.seconds,
+        )
+
+
+async def parallel_backfill(
+    backend: ConnectionBackend,
+    table: str,
+    key: str,
+    work: Union[str, BatchFunction],
+    partitions: int = 4,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    connections: Optional[Sequence[ConnectionBackend]] = None,
+    key_range: Optional[Tuple[int, int]] = None,
+    throttle: Optional[Throttle] = None,
+) -> BackfillResult:
+    """Split a table's integer key range into partitions and process them
+    concurrently, one connection per partition at a time. Each partition is walked
+    in batches of at most `batch_size` rows in key order.
+
+    `work` is either a statement with `$lower` and `$upper` placeholders, executed
+    in a transaction per batch, e.g.
+    `UPDATE account SET zone = 'eu' WHERE id > $lower AND id <= $upper`, or an
+    async function called with a connection and the batch's key range that returns
+    the number of rows it processed.
+
+    Partitions run on separate connections and don't see uncommitted changes of
+    the migration calling this, so use it from a migration with `TRANSACTION = False`.
+
+    :param backend: Backend to open connections with (and to read the key range)
+    :type backend: ConnectionBackend
+    :param table: Table to backfill
+    :type table: str
+    :param key: Integer key column, e.g. the primary key
+    :type key: str
+    :param work: Statement or async function to run per batch
+    :type work: Union[str, Callable]
+    :param partitions: Number of key ranges
+    :type partitions: int
+    :param batch_size: Rows per batch
+    :type batch_size: int
+    :param connections: Connected backends to use instead of opening `partitions`
+        connections, e.g. from a pool. Limits concurrency to their number.
+    :type connections: Sequence[ConnectionBackend], optional
+    :param key_range: Lowest and highest key, read from the table if not given
+    :type key_range: tuple, optional
+    :param throttle: Checked before each batch, e.g. the `throttle` a migration
+        receives to pause while replicas lag behind
+    :type throttle: Throttle, optional
+    """
+    backfill = _Backfill(table, key, work, batch_size, throttle or Throttle())
+    start = time.perf_counter()
+
+    if key_range is None:
+        bounds = await backend.fetch_all(
+            Query(f"SELECT MIN({key}) AS lower, MAX({key}) AS upper FROM {table}")
+        )
+        key_range = (bounds[0]["lower"], bounds[0]["upper"])
+
+    if key_range[0] is None:
+        return BackfillResult()
+
+    result = BackfillResult(
+        partitions=[
+            PartitionProgress(partition=i, lower=lower, upper=upper, last_key=lower)
+            for i, (lower, upper) in enumerate(
+                split_key_range(int(key_range[0]), int(key_range[1]), partitions)
+            )
+        ]
+    )
+    owned = []
+
+    if connections is None:
+        owned = [backend.spawn() for _ in result.partitions]
+
+        for connection in owned:
+            await connection.connect()
+
+    available = asyncio.Queue()
+
+    for connection in connections or owned:
+        available.put_nowait(connection)
+
+    async def run(progress: PartitionProgress):
+        connection = await available.get()
+
+        try:
+            await backfill.run_partition(connection, progress)
+        finally:
+            available.put_nowait(connection)
+
+    try:
+        # Let every partition finish before closing connections, then raise
+        errors = [
+            e
+            for e in await asyncio.gather(
+                *(run(p) for p in result.partitions), return_exceptions=True
+            )
+            if isinstance(e, BaseException)
+        ]
+    finally:
+        for connection in owned:
+            await connection.disconnect()
+
+    if errors:
+        raise errors[0]
+
+    result.seconds = time.perf_counter() - start
+    logger.info(
+        "Backfilled %s rows of %s in %.1fs (%.0f rows/s)",
+        result.rows,
+        table,
+        result.seconds,
+        result.rows_per_second,
+    )
+
+    return result
@@ -0,0 +1,158 @@
+import importlib.resources
+import io
+import json
+import logging
+import marshal
+import os
+import re
+import shutil
+import tempfile
+import zipfile
+from importlib.util import MAGIC_NUMBER
+from types import CodeType
+from typing import Any, Dict, Iterable, List
+
+__all__ = ["Bundle", "is_bundle", "read_bundle", "write_bundle"]
+logger = logging.getLogger(__name__)
+
+BUNDLE_FORMAT = 1
+MANIFEST_NAME = "manifest.json"
+# package:resource of a bundle installed as package data, e.g. myapp:migrations.zip
+RESOURCE_PATTERN = re.compile(r"^([A-Za-z_][\w.]*):([\w.-]+)$")
+
+
+class Bundle:
+    """Migrations packed into a single zip archive by `write_bundle`, with SQL
+    migrations already split into statements and Python migrations compiled. The
+    archive is read into memory at once, so migrations don't touch the filesystem.
+
+    :param data: Contents of the archive
+    :type data: bytes
+    :param source: Where the archive was read from, used in migration paths
+    :type source: str
+    """
+
+    def __init__(self, data: bytes, source: str):
+        self.source = source
+        self._archive = zipfile.ZipFile(io.BytesIO(data))
+
+        try:
+            manifest = json.loads(self._archive.read(MANIFEST_NAME))
+        except KeyError:
+            raise ValueError(f"Not a migration bundle: {source}")
+
+        if manifest.get("format") != BUNDLE_FORMAT:
+            raise ValueError(f"Unsupported bundle format: {manifest.get('format')}")
+
+        self.entries: List[Dict[str, Any]] = manifest["migrations"]
+        self._magic = bytes.fromhex(manifest["magic"])
+
+    def read(self, filename: str) -> bytes:
+        return self._archive.read(filename)
+
+    def blocks(self, entry: Dict[str, Any]) -> list:
+        blocks = json.loads(self.read(f"{entry['name']}{entry['file_ext']}.json"))
+        return [(options, statements) for options, statements in blocks]
+
+    def code(self, entry: Dict[str, Any]) -> CodeType:
+        filename = f"{entry['name']}{entry['file_ext']}"
+
+        if self._magic == MAGIC_NUMBER:
+            return marshal.loads(self.read(f"{filename}c")[len(MAGIC_NUMBER) :])
+
+        # Bytecode of another Python version, compile the source instead
+        logger.info("Compiling %s, the bundle's bytecode doesn't match", filename)
+        return compile(self.read(filename), filename, "exec", dont_inherit=True)
+
+
+def is_bundle(source: str) -> bool:
+    """Whether `source` is a bundle file or a package resource rather than a
+    migrations directory
+    """
+    if os.path.isdir(source):
+        return False
+
+    return os.path.isfile(source) or RESOURCE_PATTERN.match(source) is not None
+
+
+def read_bundle(source: str) -> Bundle:
+    """Read a bundle with a single read, from a file or from package data given as
+    `package:resource`
+
+    :param source: Path or package resource of the bundle
+    :type source: str
+    """
+    if os.path.isfile(source):
+        with open(source, "rb") as f:
+            return Bundle(f.read(), os.path.abspath(source))
+
+    match = RESOURCE_PATTERN.match(source)
+
+    if not match:
+        raise FileNotFoundError(f"Migration bundle not found: {source}")
+
+    package, resource = match.groups()
+
+    if hasattr(importlib.resources, "files"):
+        data = importlib.resources.files(package).joinpath(resource).read_bytes()
+    else:
+        data = importlib.resources.read_binary(package, resource)
+
+    return Bundle(data, source)
+
+
+def write_bundle(migrations: Iterable[Any], path: str) -> int:
+    """Pack migrations into a bundle, replacing `path` atomically
+
+    :param migrations: Migrations to pack, in order
+    :type migrations: Iterable[Migration]
+    :param path: Bundle to write
+    :type path: str
+    :return: Number of migrations packed
+    """
+    manifest = {"format": BUNDLE_FORMAT, "magic": MAGIC_NUMBER.hex(), "migrations": []}
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+
+    try:
+        with os.fdopen(fd, "wb") as f, zipfile.ZipFile(
+            f, "w", zipfile.ZIP_DEFLATED
+        ) as archive:
+            for migration in migrations:
+                filename = f"{migration.name}{migration.file_ext}"
+                entry = {
+                    "name": migration.name,
+                    "file_ext": migration.file_ext,
+                    # Of the original file, so bookkeeping and `migri verify` match
+                    "checksum": migration.checksum,
+                }
+
+                if migration.file_ext == ".py":
+                    source = migration.read()
+                    code = compile(source, filename, "exec", dont_inherit=True)
+                    archive.writestr(filename, source)
+                    archive.writestr(f"{filename}c", MAGIC_NUMBER + marshal.dumps(code))
+                elif migration.file_ext == ".sql":
+                    entry["directives"] = migration.directives
+                    archive.writestr(
+                        f"{filename}.json", json.dumps(list(migration.blocks))
+                    )
+                else:
+                    # Data files as they are, decompressed as the archive compresses
+                    entry["directives"] = migration.directives
+
+                    with migration.open() as source, io.TextIOWrapper(
+                        archive.open(filename, "w"), encoding="utf-8"
+                    ) as target:
+                        shutil.copyfileobj(source, target)
+
+                manifest["migrations"].append(entry)
+
+            archive.writestr(MANIFEST_NAME, json.dumps(manifest, indent=2))
+
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+    return len(manifest["migrations"])
@@ -0,0 +1,134 @@
+import hashlib
+import json
+import logging
+import mmap
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+__all__ = ["ChecksumCache", "checksum_files", "hash_file"]
+logger = logging.getLogger(__name__)
+
+MMAP_THRESHOLD = 1024 * 1024
+READ_SIZE = 1024 * 1024
+
+
+def hash_file(path: str) -> str:
+    """SHA-256 of a file's contents. Large files are memory mapped instead of read
+    in chunks.
+
+    :param path: File to hash
+    :type path: str
+    :return: Hex digest
+    """
+    checksum = hashlib.sha256()
+
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size >= MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                checksum.update(m)
+        else:
+            for chunk in iter(lambda: f.read(READ_SIZE), b""):
+                checksum.update(chunk)
+
+    return checksum.hexdigest()
+
+
+StatKey = Tuple[int, int, int]
+
+
+def _stat_key(path: str) -> StatKey:
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns, stat.st_ino
+
+
+class ChecksumCache:
+    """Checksums keyed by path and stat (size, mtime, inode), so files are only
+    hashed again once they change. Kept in a JSON file if a path is given.
+
+    :param path: File to load the cache from and save it to
+    :type path: str, optional
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._entries: Dict[str, Tuple[StatKey, str]] = {}
+        self._dirty = False
+
+        if path and os.path.exists(path):
+            try:
+                with open(path, "r") as f:
+                    self._entries = {
+                        p: (tuple(key), checksum)
+                        for p, (key, checksum) in json.load(f).items()
+                    }
+            except (ValueError, TypeError) as e:
+                logger.warning("Ignoring invalid checksum cache %s: %s", path, e)
+
+    def get(self, path: str, key: StatKey) -> Optional[str]:
+        entry = self._entries.get(path)
+        return entry[1] if entry and entry[0] == key else None
+
+    def set(self, path: str, key: StatKey, checksum: str):
+        self._entries[path] = (key, checksum)
+        self._dirty = True
+
+    def save(self):
+        if not self.path or not self._dirty:
+            return
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".migri-checksums-")
+
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(self._entries, f)
+
+            os.replace(tmp_path, self.path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+        self._dirty = False
+
+
+def checksum_files(
+    paths: Iterable[str],
+    cache: Optional[ChecksumCache] = None,
+    max_workers: Optional[int] = None,
+) -> Dict[str, str]:
+    """Checksum files in a thread pool (hashlib releases the GIL), skipping files
+    whose stat matches the cache
+
+    :param paths: Files to checksum
+    :type paths: Iterable[str]
+    :param cache: Cache to read from and update
+    :type cache: ChecksumCache, optional
+    :param max_workers: Threads to use, defaults to ThreadPoolExecutor's default
+    :type max_workers: int, optional
+    :return: Checksums keyed by path
+    """
+    cache = cache or ChecksumCache()
+    checksums = {}
+    misses: List[Tuple[str, StatKey]] = []
+
+    for path in paths:
+        key = _stat_key(path)
+        checksum = cache.get(path, key)
+
+        if checksum is None:
+            misses.append((path, key))
+        else:
+            checksums[path] = checksum
+
+    if misses:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            hashed = executor.map(hash_file, [path for path, _ in misses])
+
+            for (path, key), checksum in zip(misses, hashed):
+                cache.set(path, key, checksum)
+                checksums[path] = checksum
+
+    return checksums
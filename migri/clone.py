@@ -0,0 +1,151 @@
+import asyncio
+import logging
+import os
+import re
+import secrets
+import sqlite3
+import tempfile
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from migri.elements import Query
+from migri.interfaces import ConnectionBackend
+from migri.migration import MIGRATION_TABLE_NAME, SCHEMA_VERSION_TABLE_NAME
+
+__all__ = ["clone_database"]
+logger = logging.getLogger(__name__)
+
+BOOKKEEPING_TABLES = (MIGRATION_TABLE_NAME, SCHEMA_VERSION_TABLE_NAME)
+CLONE_SUFFIX = "_migri_clone_"
+MAX_DATABASE_NAME_LENGTH = 63  # PostgreSQL's limit, MySQL allows 64
+
+
+def _clone_name(db_name: str) -> str:
+    if not re.match(r"^\w+$", db_name):
+        raise ValueError(f"Can't clone database with name {db_name}")
+
+    suffix = f"{CLONE_SUFFIX}{secrets.token_hex(4)}"
+    return f"{db_name[:MAX_DATABASE_NAME_LENGTH - len(suffix)]}{suffix}"
+
+
+@asynccontextmanager
+async def _clone_mysql(connection: ConnectionBackend) -> AsyncIterator:
+    source, clone = connection.db_name, _clone_name(connection.db_name)
+
+    async with connection.spawn() as admin:
+        tables = await admin.fetch_all(
+            Query(
+                "SELECT table_name AS name FROM information_schema.tables "
+                "WHERE table_schema = DATABASE() AND table_type = 'BASE TABLE'"
+            )
+        )
+        await admin.execute(Query(f"CREATE DATABASE `{clone}`"))
+
+        try:
+            # Schema only, copying data would take as long as a dump
+            for table in tables:
+                await admin.execute(
+                    Query(
+                        f"CREATE TABLE `{clone}`.`{table['name']}` "
+                        f"LIKE `{source}`.`{table['name']}`"
+                    )
+                )
+
+            # Already applied migrations must not be applied to the clone again
+            for table in tables:
+                if table["name"] in BOOKKEEPING_TABLES:
+                    await admin.execute(
+                        Query(
+                            f"INSERT INTO `{clone}`.`{table['name']}` "
+                            f"SELECT * FROM `{source}`.`{table['name']}`"
+                        )
+                    )
+
+            await admin.database.commit()
+        except Exception:
+            await admin.execute(Query(f"DROP DATABASE `{clone}`"))
+            raise
+
+    try:
+        yield connection.spawn(db_name=clone)
+    finally:
+        async with connection.spawn() as admin:
+            await admin.execute(Query(f"DROP DATABASE IF EXISTS `{clone}`"))
+
+
+@asynccontextmanager
+async def _clone_postgresql(connection: ConnectionBackend) -> AsyncIterator:
+    if connection.connection is not None:
+        raise RuntimeError("Can't clone a database from a provided connection")
+
+    source, clone = connection.db_name, _clone_name(connection.db_name)
+
+    # Fails if anyone else is connected to the source database
+    async with connection.spawn(db_name="postgres") as admin:
+        await admin.execute(Query(f'CREATE DATABASE "{clone}" TEMPLATE "{source}"'))
+
+    try:
+        yield connection.spawn(db_name=clone)
+    finally:
+        async with connection.spawn(db_name="postgres") as admin:
+            await admin.execute(Query(f'DROP DATABASE IF EXISTS "{clone}"'))
+
+
+def backup_sqlite(source: str, destination: str):
+    source_connection = sqlite3.connect(source)
+    destination_connection = sqlite3.connect(destination)
+
+    try:
+        source_connection.backup(destination_connection)
+    finally:
+        destination_connection.close()
+        source_connection.close()
+
+
+@asynccontextmanager
+async def _clone_sqlite(connection: ConnectionBackend) -> AsyncIterator:
+    if connection.db_name == ":memory:":
+        raise RuntimeError("Can't clone an in-memory database")
+
+    fd, clone = tempfile.mkstemp(prefix="migri-clone-", suffix=".db")
+    os.close(fd)
+
+    try:
+        if os.path.exists(connection.db_name):
+            # The backup API gives a consistent copy even if the database is in use
+            await asyncio.get_running_loop().run_in_executor(
+                None, backup_sqlite, connection.db_name, clone
+            )
+
+        yield connection.spawn(db_name=clone)
+    finally:
+        for path in (clone, f"{clone}-wal", f"{clone}-shm"):
+            if os.path.exists(path):
+                os.unlink(path)
+
+
+CLONE_FUNCTIONS = {
+    "mysql": _clone_mysql,
+    "postgresql": _clone_postgresql,
+    "sqlite": _clone_sqlite,
+}
+
+
+@asynccontextmanager
+async def clone_database(connection: ConnectionBackend) -> AsyncIterator:
+    """Clone the database of an unconnected backend and yield an unconnected backend
+    for the clone, which is dropped on exit. PostgreSQL databases are cloned with
+    `CREATE DATABASE ... TEMPLATE` (nobody else may be connected), SQLite databases
+    with the backup API and MySQL databases are copied schema only.
+
+    :param connection: Backend of the database to clone
+    :type connection: ConnectionBackend
+    """
+    try:
+        clone = CLONE_FUNCTIONS[connection.dialect]
+    except KeyError:
+        raise RuntimeError(f"Cloning isn't supported with {connection.dialect}")
+
+    async with clone(connection) as clone_connection:
+        logger.info("Cloned %s to %s", connection.db_name, clone_connection.db_name)
+        yield clone_connection
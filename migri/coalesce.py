@@ -0,0 +1,215 @@
+import re
+from dataclasses import dataclass
+from typing import List, Optional, Set, Tuple
+
+from migri.statements import IDENTIFIER, normalize
+
+__all__ = [
+    "AlterTable",
+    "COALESCE_DIALECTS",
+    "Rewrite",
+    "coalesce_alters",
+    "parse_alter_table",
+]
+
+# SQLite's ALTER TABLE takes a single action
+COALESCE_DIALECTS = {"mysql", "postgresql"}
+
+NAME = r'("[^"]+"|`[^`]+`|[\w$]+)'
+# Table header, e.g. ALTER TABLE IF EXISTS ONLY public.account
+HEADER_PATTERN = re.compile(
+    rf"^(ALTER\s+TABLE\s+(?:IF\s+EXISTS\s+)?(?:ONLY\s+)?({IDENTIFIER}))\s+(.+)$",
+    re.IGNORECASE | re.DOTALL,
+)
+# Actions that can share a statement, with the kind of object each one changes.
+# Anything else (renames, VALIDATE CONSTRAINT, ALGORITHM=..., partitions, ...)
+# keeps the statement as it is.
+CLAUSE_PATTERNS = [
+    ("constraint", rf"^ADD\s+CONSTRAINT\s+{NAME}"),
+    ("index", rf"^ADD\s+(?:UNIQUE\s+)?(?:INDEX|KEY)\s+{NAME}"),
+    ("constraint", rf"^DROP\s+CONSTRAINT\s+(?:IF\s+EXISTS\s+)?{NAME}"),
+    ("index", rf"^DROP\s+(?:INDEX|KEY)\s+{NAME}"),
+    ("column", rf"^ADD\s+(?:COLUMN\s+)?(?:IF\s+NOT\s+EXISTS\s+)?{NAME}"),
+    ("column", rf"^DROP\s+(?:COLUMN\s+)?(?:IF\s+EXISTS\s+)?{NAME}"),
+    ("column", rf"^ALTER\s+(?:COLUMN\s+)?{NAME}"),
+    ("column", rf"^MODIFY\s+(?:COLUMN\s+)?{NAME}"),
+    ("column", rf"^CHANGE\s+(?:COLUMN\s+)?{NAME}\s+{NAME}"),
+]
+# Keywords that follow ADD/DROP/ALTER where the patterns above expect a name
+KEYWORDS = {
+    "check",
+    "column",
+    "constraint",
+    "exclude",
+    "foreign",
+    "fulltext",
+    "index",
+    "key",
+    "partition",
+    "primary",
+    "spatial",
+    "unique",
+}
+
+
+@dataclass(frozen=True)
+class AlterTable:
+    # Statement up to and including the table name
+    header: str
+    table: str
+    clauses: Tuple[str, ...]
+    # (kind, name) of the columns, constraints and indexes the clauses change
+    subjects: Tuple[Tuple[str, str], ...]
+
+    @property
+    def key(self) -> str:
+        """Statements with the same key alter the same table with the same
+        modifiers (IF EXISTS, ONLY)
+        """
+        return re.sub(r"\s+", " ", self.header).lower()
+
+    def combines_with(
+        self, other: "AlterTable", subjects: Optional[Set[Tuple[str, str]]] = None
+    ) -> bool:
+        """Whether `other` can be added to this statement, or to a combined
+        statement changing `subjects`
+        """
+        subjects = set(self.subjects) if subjects is None else subjects
+
+        return self.key == other.key and not subjects & set(other.subjects)
+
+
+@dataclass(frozen=True)
+class Rewrite:
+    table: str
+    # Numbers of the statements that were combined, starting at 1
+    statements: Tuple[int, ...]
+    sql: str
+
+    def __str__(self) -> str:
+        return (
+            f"combined statements {', '.join(map(str, self.statements))} into one "
+            f"ALTER TABLE {self.table}"
+        )
+
+
+def _split_clauses(actions: str) -> List[str]:
+    """Split on commas outside of parentheses and quotes"""
+    clauses, current, depth, quote = [], [], 0, None
+
+    for char in actions:
+        if quote:
+            quote = None if char == quote else quote
+        elif char in "'\"`":
+            quote = char
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "," and depth == 0:
+            clauses.append("".join(current).strip())
+            current = []
+            continue
+
+        current.append(char)
+
+    clauses.append("".join(current).strip())
+
+    return clauses
+
+
+def _subjects(clause: str) -> Optional[List[Tuple[str, str]]]:
+    for kind, pattern in CLAUSE_PATTERNS:
+        match = re.match(pattern, clause, re.IGNORECASE)
+
+        if not match:
+            continue
+
+        # Case-insensitively, so a conflict is assumed rather than missed
+        names = [name.strip('"`').lower() for name in match.groups()]
+
+        if any(name in KEYWORDS for name in names):
+            return None
+
+        return [(kind, name) for name in names]
+
+    return None
+
+
+def parse_alter_table(statement: str) -> Optional[AlterTable]:
+    """Parse an `ALTER TABLE` statement whose actions can all be combined with
+    actions of other statements, or return None
+
+    :param statement: SQL statement
+    :type statement: str
+    """
+    match = HEADER_PATTERN.match(normalize(statement).rstrip(";").strip())
+
+    if not match:
+        return None
+
+    header, table, actions = match.groups()
+    clauses = _split_clauses(actions)
+    subjects = []
+
+    for clause in clauses:
+        clause_subjects = _subjects(clause)
+
+        if not clause or clause_subjects is None:
+            return None
+
+        subjects.extend(clause_subjects)
+
+    if len(set(subjects)) != len(subjects):
+        return None
+
+    return AlterTable(header, table, tuple(clauses), tuple(subjects))
+
+
+def coalesce_alters(
+    statements: List[str], first: int = 1
+) -> Tuple[List[str], List[Rewrite]]:
+    """Combine consecutive `ALTER TABLE` statements on the same table into a single
+    statement, so the table is rewritten and locked once. Statements are only
+    combined if each of their actions is a known combinable action and no two
+    actions change the same column, constraint or index.
+
+    :param statements: Statements of a migration, in order
+    :type statements: List[str]
+    :param first: Number of the first statement, used in rewrites
+    :type first: int
+    :return: Statements to execute and the rewrites that were made
+    """
+    result: List[str] = []
+    rewrites: List[Rewrite] = []
+    group: List[Tuple[int, str, AlterTable]] = []
+
+    def flush():
+        if len(group) > 1:
+            first = group[0][2]
+            clauses = [c for _, _, alter in group for c in alter.clauses]
+            sql = f"{first.header} {', '.join(clauses)};"
+            rewrites.append(Rewrite(first.table, tuple(n for n, _, _ in group), sql))
+            result.append(sql)
+        else:
+            result.extend(statement for _, statement, _ in group)
+
+        group.clear()
+
+    for number, statement in enumerate(statements, start=first):
+        alter = parse_alter_table(statement)
+        subjects: Set[Tuple[str, str]] = {s for _, _, a in group for s in a.subjects}
+
+        if alter is None:
+            flush()
+            result.append(statement)
+            continue
+
+        if group and not group[0][2].combines_with(alter, subjects):
+            flush()
+
+        group.append((number, statement, alter))
+
+    flush()
+
+    return result, rewrites
@@ -0,0 +1,50 @@
+import bz2
+import gzip
+import lzma
+from typing import Callable, Dict, Optional, TextIO
+
+__all__ = ["COMPRESSED_EXTENSIONS", "compression_of", "open_text"]
+
+
+def _open_zstd(path: str) -> TextIO:
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError(
+            f"Reading {path} requires zstandard to be installed (migri[zstd])"
+        )
+
+    return zstandard.open(path, "rt")
+
+
+OPENERS: Dict[str, Callable[[str], TextIO]] = {
+    ".gz": lambda path: gzip.open(path, "rt"),
+    ".bz2": lambda path: bz2.open(path, "rt"),
+    ".xz": lambda path: lzma.open(path, "rt"),
+    ".zst": _open_zstd,
+}
+COMPRESSED_EXTENSIONS = list(OPENERS)
+
+
+def compression_of(path: str) -> Optional[str]:
+    """Extension of the compression `path` uses, e.g. `.gz`, or None"""
+    for ext in COMPRESSED_EXTENSIONS:
+        if path.endswith(ext):
+            return ext
+
+    return None
+
+
+def open_text(path: str) -> TextIO:
+    """Open a file for reading text, decompressing it on the fly if its extension
+    is one of `COMPRESSED_EXTENSIONS`
+
+    :param path: Path of the file
+    :type path: str
+    """
+    ext = compression_of(path)
+
+    if ext is None:
+        return open(path, "r")
+
+    return OPENERS[ext](path)
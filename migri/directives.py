@@ -0,0 +1,204 @@
+import ast
+import re
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Pattern, Tuple
+
+from migri.statements import StatementSplitter
+
+__all__ = [
+    "iter_blocks",
+    "parse_data_directives",
+    "parse_module_directives",
+    "parse_sql_directives",
+    "split_parallel_groups",
+]
+
+SQL_DIRECTIVE_PATTERN = re.compile(r"^--\s*migri:([a-z][\w-]*)(.*)$")
+DATA_DIRECTIVE_PATTERN = re.compile(r"^#\s*migri:([a-z][\w-]*)(.*)$")
+# Sequential statements read by `iter_blocks` are yielded in batches of up to
+BATCH_STATEMENTS = 100
+BATCH_SIZE = 1024 * 1024
+
+
+def parse_sql_directives(lines: Iterable[str]) -> Dict[str, Dict[str, str]]:
+    """Parse directives from the comment header of a SQL migration. Only comment
+    lines before the first statement are read, e.g.
+
+        -- migri:no-transaction
+        -- migri:online chunk_size=5000 throttle=0.1
+
+    :param lines: Lines of the migration
+    :type lines: Iterable[str]
+    :return: Options of each directive keyed by directive name
+    """
+    return _parse_header_directives(lines, "--", SQL_DIRECTIVE_PATTERN)
+
+
+def parse_data_directives(lines: Iterable[str]) -> Dict[str, Dict[str, str]]:
+    """Parse directives from the `#` comment lines before the header row of a data
+    migration, e.g.
+
+        # migri:load table=country delimiter=;
+
+    :param lines: Lines of the migration
+    :type lines: Iterable[str]
+    :return: Options of each directive keyed by directive name
+    """
+    return _parse_header_directives(lines, "#", DATA_DIRECTIVE_PATTERN)
+
+
+def _parse_header_directives(
+    lines: Iterable[str], comment: str, pattern: Pattern
+) -> Dict[str, Dict[str, str]]:
+    directives = {}
+
+    for line in lines:
+        line = line.strip()
+
+        if not line:
+            continue
+        if not line.startswith(comment):
+            break
+
+        match = pattern.match(line)
+
+        if match:
+            name, options = match.groups()
+            directives[name] = _parse_options(options)
+
+    return directives
+
+
+def _parse_options(options: str) -> Dict[str, str]:
+    return dict(option.partition("=")[::2] for option in options.split())
+
+
+def split_parallel_groups(contents: str) -> List[Tuple[Optional[Dict[str, str]], str]]:
+    """Split a SQL migration into blocks of statements to run in order and parallel
+    groups, which are enclosed in directives, e.g.
+
+        -- migri:parallel jobs=2
+        CREATE INDEX CONCURRENTLY account_name_idx ON account (name);
+        CREATE INDEX CONCURRENTLY record_date_idx ON record (date);
+        -- migri:end-parallel
+
+    :param contents: Contents of the migration
+    :type contents: str
+    :return: Options of the parallel group (None for sequential blocks) and SQL of
+        each block
+    """
+    blocks = []
+    lines = []
+    options = None
+
+    for line in contents.splitlines(keepends=True):
+        match = SQL_DIRECTIVE_PATTERN.match(line.strip())
+        name = match.group(1) if match else None
+
+        if name == "parallel":
+            if options is not None:
+                raise ValueError("parallel groups can't be nested")
+
+            blocks.append((None, "".join(lines)))
+            lines, options = [], _parse_options(match.group(2))
+        elif name == "end-parallel":
+            if options is None:
+                raise ValueError("end-parallel without parallel")
+
+            blocks.append((options, "".join(lines)))
+            lines, options = [], None
+        else:
+            lines.append(line)
+
+    if options is not None:
+        raise ValueError("parallel group is missing end-parallel")
+
+    blocks.append((None, "".join(lines)))
+
+    return [(o, sql) for o, sql in blocks if sql.strip()]
+
+
+def iter_blocks(
+    lines: Iterable[str],
+) -> Iterator[Tuple[Optional[Dict[str, str]], List[str]]]:
+    """Split a SQL migration into blocks of statements like `split_parallel_groups`
+    and `split_statements`, reading it line by line so only the current block is
+    kept in memory. Sequential statements are yielded in batches, parallel groups
+    whole.
+
+    :param lines: Lines of the migration
+    :type lines: Iterable[str]
+    :return: Options of the parallel group (None for sequential blocks) and
+        statements of each block
+    """
+    splitter = StatementSplitter()
+    statements: List[str] = []
+    size = 0
+    options = None
+
+    for line in lines:
+        match = SQL_DIRECTIVE_PATTERN.match(line.strip())
+        name = match.group(1) if match else None
+
+        if name == "parallel":
+            if options is not None:
+                raise ValueError("parallel groups can't be nested")
+
+            statements.extend(splitter.close())
+
+            if statements:
+                yield None, statements
+
+            statements, size, options = [], 0, _parse_options(match.group(2))
+        elif name == "end-parallel":
+            if options is None:
+                raise ValueError("end-parallel without parallel")
+
+            statements.extend(splitter.close())
+
+            if statements:
+                yield options, statements
+
+            statements, size, options = [], 0, None
+        else:
+            ended = splitter.feed(line)
+            statements.extend(ended)
+            size += sum(len(s) for s in ended)
+            full = len(statements) >= BATCH_STATEMENTS or size >= BATCH_SIZE
+
+            if options is None and full:
+                yield None, statements
+                statements, size = [], 0
+
+    if options is not None:
+        raise ValueError("parallel group is missing end-parallel")
+
+    statements.extend(splitter.close())
+
+    if statements:
+        yield None, statements
+
+
+def parse_module_directives(source: str) -> Dict[str, Any]:
+    """Read module level constants (e.g. `TRANSACTION = False`) from a Python
+    migration without importing it
+
+    :param source: Source code of the migration
+    :type source: str
+    :return: Literal values of upper case module level names
+    """
+    directives = {}
+
+    for node in ast.parse(source).body:
+        if not isinstance(node, ast.Assign) or len(node.targets) != 1:
+            continue
+
+        target = node.targets[0]
+
+        if isinstance(target, ast.Name) and target.id.isupper():
+            try:
+                directives[target.id] = ast.literal_eval(node.value)
+            except ValueError:
+                # Not a literal, so not a directive
+                continue
+
+    return directives
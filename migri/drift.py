@@ -0,0 +1,125 @@
+import asyncio
+import json
+from dataclasses import dataclass
+from enum import Enum
+from typing import List, Optional
+
+from migri.checksums import ChecksumCache, checksum_files
+from migri.elements import Query
+from migri.interfaces import Task
+from migri.migration import (
+    MIGRATION_TABLE_NAME,
+    TABLE_EXISTS_QUERY,
+    BundledMigration,
+    MigrationFilesMixin,
+)
+
+__all__ = ["Drift", "DriftStatus", "Verify", "format_drift"]
+
+
+class DriftStatus(Enum):
+    # File differs from the one that was applied
+    CHANGED = "changed"
+    # Applied, but the file no longer exists
+    MISSING = "missing"
+    # Applied before checksums were recorded, can't be verified
+    UNKNOWN = "unknown"
+
+
+@dataclass(frozen=True)
+class Drift:
+    migration_name: str
+    status: DriftStatus
+    recorded_checksum: Optional[str] = None
+    checksum: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "migration": self.migration_name,
+            "status": self.status.value,
+            "recorded_checksum": self.recorded_checksum,
+            "checksum": self.checksum,
+        }
+
+
+def format_drift(drift: List[Drift], output_format: str = "text") -> str:
+    if output_format == "json":
+        return json.dumps([d.to_dict() for d in drift], indent=2)
+
+    return "\n".join(f"{d.migration_name}...{d.status.value}" for d in drift)
+
+
+class Verify(MigrationFilesMixin, Task):
+    async def run(
+        self,
+        migrations_dir: str,
+        cache_path: Optional[str] = None,
+        max_workers: Optional[int] = None,
+    ) -> List[Drift]:
+        """Compare applied migrations with the checksums of their files
+
+        :param migrations_dir: Migrations directory
+        :type migrations_dir: str
+        :param cache_path: File to cache checksums in, keyed by file stat
+        :type cache_path: str, optional
+        :param max_workers: Threads used to hash files
+        :type max_workers: int, optional
+        """
+        with self.tracer.span("migri.discover"):
+            migrations = {m.name: m for m in self.get_migrations(migrations_dir)}
+
+        exists = await self._connection.fetch_all(
+            Query(
+                TABLE_EXISTS_QUERY[self._connection.dialect],
+                values={"table": MIGRATION_TABLE_NAME},
+            )
+        )
+
+        # Nothing was applied that could have drifted
+        if not exists:
+            return []
+
+        applied = await self._connection.fetch_all(
+            Query(f"SELECT name, checksum FROM {MIGRATION_TABLE_NAME} ORDER BY name")
+        )
+        # Bundled migrations carry the checksums of their files
+        bundled = {
+            m.abspath: m.checksum
+            for m in migrations.values()
+            if isinstance(m, BundledMigration)
+        }
+        paths = [
+            migrations[a["name"]].abspath
+            for a in applied
+            if a["name"] in migrations and a["checksum"]
+        ]
+        paths = [p for p in paths if p not in bundled]
+        cache = ChecksumCache(cache_path)
+
+        with self.tracer.span("migri.checksum", files=len(paths)):
+            checksums = await asyncio.get_running_loop().run_in_executor(
+                None, checksum_files, paths, cache, max_workers
+            )
+
+        cache.save()
+        checksums.update(bundled)
+        drift = []
+
+        for a in applied:
+            migration = migrations.get(a["name"])
+
+            if migration is None:
+                drift.append(Drift(a["name"], DriftStatus.MISSING, a["checksum"]))
+            elif not a["checksum"]:
+                drift.append(Drift(a["name"], DriftStatus.UNKNOWN))
+            elif checksums[migration.abspath] != a["checksum"]:
+                drift.append(
+                    Drift(
+                        a["name"],
+                        DriftStatus.CHANGED,
+                        a["checksum"],
+                        checksums[migration.abspath],
+                    )
+                )
+
+        return drift
@@ -1,5 +1,15 @@
+import dataclasses
 from dataclasses import dataclass
-from typing import Any, ClassVar, Dict, List, Optional, TYPE_CHECKING, Union
+from typing import (
+    Any,
+    AsyncIterator,
+    ClassVar,
+    Dict,
+    List,
+    Optional,
+    TYPE_CHECKING,
+    Union,
+)
 
 if TYPE_CHECKING:
     from aiomysql import Connection as MySQLConnection
@@ -7,6 +17,9 @@ if TYPE_CHECKING:
     from asyncpg import Connection as PostgreSQLConnection
 
 from migri.elements import Query
+from migri.metrics import MetricsRecorder
+from migri.throttle import Throttle
+from migri.tracing import Tracer
 from migri.utils import Echo
 
 Database = Union["MySQLConnection", "PostgreSQLConnection", "SQLiteConnection"]
@@ -51,15 +64,37 @@ class ConnectionBackend:
     async def disconnect(self):
         raise NotImplementedError
 
-    async def execute(self, query: Query):
+    async def execute(self, query: Query) -> Optional[int]:
+        """Execute a statement
+
+        :param query: Query to run
+        :type query: Query
+        :return: Number of rows the statement changed, if the driver reports it
+        """
         raise NotImplementedError
 
     async def fetch(self, query: Query) -> Dict[str, Any]:
         raise NotImplementedError
 
+    async def execute_many(self, query: Query, values: List[Dict[str, Any]]):
+        raise NotImplementedError
+
     async def fetch_all(self, query: Query) -> List[Dict[str, Any]]:
         raise NotImplementedError
 
+    def iterate(
+        self, query: Query, batch_size: int = 1000
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        raise NotImplementedError
+
+    def spawn(self, **changes) -> "ConnectionBackend":
+        """Create an unconnected copy of the backend, e.g. to open a second
+        connection or connect to another database with the same credentials
+
+        :param changes: Fields to change, e.g. `db_name`
+        """
+        return dataclasses.replace(self, db=None, **changes)
+
     def transaction(self) -> "TransactionBackend":
         raise NotImplementedError
 
@@ -86,8 +121,17 @@ class TransactionBackend:
 
 
 class Task:
-    def __init__(self, connection: ConnectionBackend):
+    def __init__(
+        self,
+        connection: ConnectionBackend,
+        metrics: Optional[MetricsRecorder] = None,
+        tracer: Optional[Tracer] = None,
+        throttle: Optional[Throttle] = None,
+    ):
         self.echo = Echo
+        self.metrics = metrics or MetricsRecorder()
+        self.tracer = tracer or Tracer()
+        self.throttle = throttle or Throttle()
         self._connection = connection
 
     async def run(self, *args, **kwargs):
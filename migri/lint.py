@@ -0,0 +1,369 @@
+import json
+import re
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from migri.coalesce import AlterTable, parse_alter_table
+from migri.interfaces import Task
+from migri.migration import (
+    Migration,
+    MigrationFilesMixin,
+    MigrationPendingMixin,
+)
+from migri.statements import normalize, statement_type, target_table
+
+__all__ = ["Finding", "Lint", "RULES", "Severity", "format_findings"]
+
+
+class Severity(Enum):
+    OFF = "off"
+    INFO = "info"
+    WARNING = "warning"
+    ERROR = "error"
+
+    @property
+    def rank(self) -> int:
+        return list(Severity).index(self)
+
+
+@dataclass(frozen=True)
+class Finding:
+    migration_name: str
+    statement_number: int
+    rule: str
+    severity: Severity
+    message: str
+    statement: str
+
+    def to_dict(self) -> dict:
+        return {
+            "migration": self.migration_name,
+            "statement": self.statement_number,
+            "rule": self.rule,
+            "severity": self.severity.value,
+            "message": self.message,
+            "sql": self.statement,
+        }
+
+
+@dataclass
+class LintContext:
+    """State carried across statements of all linted migrations"""
+
+    dialect: str
+    # Tables created by the linted migrations, i.e. tables that are new/empty
+    created_tables: Set[str] = field(default_factory=set)
+    # (table, column) pairs guarded by a CHECK (column IS NOT NULL) constraint
+    not_null_checks: Set[Tuple[str, str]] = field(default_factory=set)
+    # Migration being linted
+    migration_name: str = ""
+    # The previous statement, if it's a combinable ALTER TABLE, and its migration
+    previous_alter: Optional[Tuple[str, AlterTable]] = None
+
+    def is_existing_table(self, table: Optional[str]) -> bool:
+        return table is not None and table not in self.created_tables
+
+
+Check = Callable[[str, LintContext], Optional[str]]
+
+
+@dataclass(frozen=True)
+class Rule:
+    name: str
+    severity: Severity
+    dialects: Tuple[str, ...]
+    check: Check
+
+
+VOLATILE_DEFAULTS = {
+    "postgresql": (
+        r"\b(?:clock_timestamp|gen_random_uuid|nextval|random|timeofday|"
+        r"uuid_generate_v1|uuid_generate_v4)\s*\("
+    ),
+    # Expression defaults (MySQL 8.0.13+) can't be added instantly
+    "mysql": r"DEFAULT\s*\(|\b(?:rand|uuid|uuid_short)\s*\(",
+}
+
+
+def _check_alter_column_type(statement: str, context: LintContext) -> Optional[str]:
+    if not re.match(r"^ALTER\s+TABLE\b", statement, re.IGNORECASE):
+        return None
+    if not context.is_existing_table(target_table(statement)):
+        return None
+
+    if context.dialect == "postgresql":
+        pattern = r"\bALTER\s+(?:COLUMN\s+)?\S+\s+(?:SET\s+DATA\s+)?TYPE\b"
+    else:
+        pattern = r"\b(?:MODIFY|CHANGE)\s+(?:COLUMN\s+)?\S+"
+
+    if re.search(pattern, statement, re.IGNORECASE):
+        return "changing a column type can rewrite the table and block writes"
+
+    return None
+
+
+def _check_volatile_default(statement: str, context: LintContext) -> Optional[str]:
+    if not re.match(r"^ALTER\s+TABLE\b", statement, re.IGNORECASE):
+        return None
+    if not context.is_existing_table(target_table(statement)):
+        return None
+
+    for clause in re.split(r",\s*(?=ADD\b)", statement, flags=re.IGNORECASE):
+        if not re.search(r"\bADD\s+(?:COLUMN\b)?.*\bDEFAULT\b", clause, re.I | re.S):
+            continue
+
+        if re.search(VOLATILE_DEFAULTS[context.dialect], clause, re.IGNORECASE):
+            return "adding a column with a volatile default rewrites every row"
+
+    return None
+
+
+def _check_index_not_concurrent(statement: str, context: LintContext) -> Optional[str]:
+    is_create_index = re.match(
+        r"^CREATE\s+(?:UNIQUE\s+)?INDEX\b", statement, re.IGNORECASE
+    )
+    is_add_index = re.match(
+        r"^ALTER\s+TABLE\b.*\bADD\s+(?:UNIQUE\s+)?(?:INDEX|KEY)\b",
+        statement,
+        re.IGNORECASE | re.DOTALL,
+    )
+
+    if not (is_create_index or is_add_index):
+        return None
+    if not context.is_existing_table(target_table(statement)):
+        return None
+
+    if context.dialect == "postgresql":
+        if is_create_index and not re.search(
+            r"\bINDEX\s+CONCURRENTLY\b", statement, re.IGNORECASE
+        ):
+            return "index is built without CONCURRENTLY and blocks writes"
+    elif re.search(
+        r"\bALGORITHM\s*=?\s*COPY\b|\bLOCK\s*=?\s*(?:SHARED|EXCLUSIVE)\b",
+        statement,
+        re.IGNORECASE,
+    ):
+        return "index is built with a copying algorithm or a blocking lock"
+
+    return None
+
+
+def _check_not_null_without_check(
+    statement: str, context: LintContext
+) -> Optional[str]:
+    table = target_table(statement)
+
+    if not re.match(r"^ALTER\s+TABLE\b", statement, re.IGNORECASE) or not table:
+        return None
+
+    for column in re.findall(
+        r"CHECK\s*\(\s*[\"`]?(\w+)[\"`]?\s+IS\s+NOT\s+NULL\s*\)",
+        statement,
+        re.IGNORECASE,
+    ):
+        context.not_null_checks.add((table, column.lower()))
+
+    if not context.is_existing_table(table):
+        return None
+
+    for column in re.findall(
+        r"\bALTER\s+(?:COLUMN\s+)?[\"`]?(\w+)[\"`]?\s+SET\s+NOT\s+NULL\b",
+        statement,
+        re.IGNORECASE,
+    ):
+        if (table, column.lower()) not in context.not_null_checks:
+            return (
+                f"SET NOT NULL on '{column}' scans the table under an exclusive "
+                f"lock; add and validate a CHECK ({column} IS NOT NULL) "
+                f"constraint first"
+            )
+
+    return None
+
+
+def _check_unbatched_dml(statement: str, context: LintContext) -> Optional[str]:
+    if statement_type(statement) not in ("UPDATE", "DELETE"):
+        return None
+    if not context.is_existing_table(target_table(statement)):
+        return None
+
+    if not re.search(r"\bWHERE\b", statement, re.IGNORECASE):
+        return "statement touches every row of the table in a single transaction"
+
+    return None
+
+
+def _check_coalescible_alter(statement: str, context: LintContext) -> Optional[str]:
+    alter = parse_alter_table(statement)
+
+    if alter is None or context.previous_alter is None:
+        return None
+
+    migration_name, previous = context.previous_alter
+
+    if not previous.combines_with(alter):
+        return None
+
+    if migration_name != context.migration_name:
+        return (
+            f"ALTER TABLE {alter.table} directly follows one on the same table in "
+            f"{migration_name}; combining them into one statement rewrites and locks "
+            f"the table once"
+        )
+
+    return (
+        f"ALTER TABLE {alter.table} directly follows one on the same table; "
+        f"combine them into one statement or apply with --coalesce-alters"
+    )
+
+
+RULES: Dict[str, Rule] = {
+    rule.name: rule
+    for rule in (
+        Rule(
+            "alter-column-type",
+            Severity.ERROR,
+            ("mysql", "postgresql"),
+            _check_alter_column_type,
+        ),
+        Rule(
+            "volatile-default",
+            Severity.ERROR,
+            ("mysql", "postgresql"),
+            _check_volatile_default,
+        ),
+        Rule(
+            "index-not-concurrent",
+            Severity.WARNING,
+            ("mysql", "postgresql"),
+            _check_index_not_concurrent,
+        ),
+        Rule(
+            "not-null-without-check",
+            Severity.WARNING,
+            ("postgresql",),
+            _check_not_null_without_check,
+        ),
+        Rule(
+            "unbatched-dml",
+            Severity.WARNING,
+            ("mysql", "postgresql", "sqlite"),
+            _check_unbatched_dml,
+        ),
+        Rule(
+            "coalescible-alter",
+            Severity.INFO,
+            ("mysql", "postgresql"),
+            _check_coalescible_alter,
+        ),
+    )
+}
+
+
+def format_findings(findings: List[Finding], output_format: str = "text") -> str:
+    if output_format == "json":
+        return json.dumps([f.to_dict() for f in findings], indent=2)
+
+    return "\n".join(
+        f"{f.migration_name}:{f.statement_number} [{f.severity.value}] "
+        f"{f.rule}: {f.message}"
+        for f in findings
+    )
+
+
+class Lint(MigrationFilesMixin, MigrationPendingMixin, Task):
+    def lint_statements(
+        self,
+        migration_name: str,
+        statements: List[str],
+        context: LintContext,
+        severities: Dict[str, Severity],
+    ) -> List[Finding]:
+        findings = []
+        context.migration_name = migration_name
+
+        for number, statement in enumerate(statements, start=1):
+            normalized = normalize(statement)
+
+            for rule in RULES.values():
+                severity = severities.get(rule.name, rule.severity)
+
+                if severity == Severity.OFF or context.dialect not in rule.dialects:
+                    continue
+
+                message = rule.check(normalized, context)
+
+                if message:
+                    findings.append(
+                        Finding(
+                            migration_name=migration_name,
+                            statement_number=number,
+                            rule=rule.name,
+                            severity=severity,
+                            message=message,
+                            statement=normalized,
+                        )
+                    )
+
+            alter = parse_alter_table(normalized)
+            context.previous_alter = (migration_name, alter) if alter else None
+
+            if statement_type(normalized) == "CREATE":
+                table = target_table(normalized)
+
+                if table and re.match(
+                    r"^CREATE\b.*?\bTABLE\b", normalized, re.I | re.S
+                ):
+                    context.created_tables.add(table)
+
+        return findings
+
+    async def run(
+        self,
+        migrations_dir: str,
+        severities: Optional[Dict[str, Severity]] = None,
+        all_migrations: bool = False,
+    ) -> List[Finding]:
+        """Lint SQL migrations for statements known to be slow or lock heavy
+
+        :param migrations_dir: Migrations directory
+        :type migrations_dir: str
+        :param severities: Severity overrides keyed by rule name, use
+            `Severity.OFF` to disable a rule
+        :type severities: dict, optional
+        :param all_migrations: Lint all migrations instead of pending migrations
+            only, doesn't require a database connection
+        :type all_migrations: bool
+        """
+        unknown_rules = set(severities or {}) - set(RULES)
+
+        if unknown_rules:
+            raise ValueError(f"Unknown lint rules: {', '.join(sorted(unknown_rules))}")
+
+        migrations: List[Migration] = self.get_migrations(migrations_dir)
+
+        if not all_migrations:
+            migrations = await self._migrations_to_apply(migrations)
+
+        context = LintContext(dialect=self._connection.dialect)
+        findings = []
+
+        for migration in migrations:
+            if migration.file_ext != ".sql":
+                # Statements on either side aren't consecutive
+                context.previous_alter = None
+                continue
+
+            # Without knowing what's applied, only tables created by the migration
+            # itself are known to be new
+            if all_migrations:
+                context.created_tables.clear()
+
+            findings.extend(
+                self.lint_statements(
+                    migration.name, migration.statements, context, severities or {}
+                )
+            )
+
+        return findings
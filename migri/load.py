@@ -0,0 +1,184 @@
+import csv
+import itertools
+from typing import AsyncIterator, Iterable, Iterator, List, Optional, TextIO
+
+from migri.elements import Query
+from migri.interfaces import ConnectionBackend
+from migri.statements import quote_identifier
+
+__all__ = [
+    "BulkLoader",
+    "DATA_FILE_EXTENSIONS",
+    "MySQLBulkLoader",
+    "PostgreSQLBulkLoader",
+    "create_bulk_loader",
+    "data_lines",
+]
+
+# Data migration file types and their default delimiters
+DATA_FILE_EXTENSIONS = {".csv": ",", ".tsv": "\t"}
+DEFAULT_BATCH_SIZE = 1000
+# Characters of the file sent to COPY per message
+COPY_CHUNK_SIZE = 64 * 1024
+
+
+def data_lines(f: TextIO) -> Iterator[str]:
+    """Lines of a data file from its header row on, skipping the directive comments
+    and blank lines before it
+    """
+    return itertools.dropwhile(lambda line: not line.strip() or line[0] == "#", f)
+
+
+class BulkLoader:
+    """Load the rows of a delimited data file into a table with multi-row inserts.
+    The file's first row names the columns. Values are passed as text for the
+    database to convert, values equal to `null` (empty by default) as NULL.
+
+    :param connection: Connected backend
+    :type connection: ConnectionBackend
+    :param batch_size: Rows per round trip
+    :type batch_size: int
+    """
+
+    quote_char = '"'
+
+    def __init__(
+        self, connection: ConnectionBackend, batch_size: int = DEFAULT_BATCH_SIZE
+    ):
+        self.connection = connection
+        self.batch_size = batch_size
+
+    def quote(self, name: str) -> str:
+        return quote_identifier(name, self.quote_char)
+
+    @staticmethod
+    def _records(
+        rows: Iterable[List[str]], columns: List[str], null: str
+    ) -> Iterator[List[Optional[str]]]:
+        for number, row in enumerate(rows, start=1):
+            if not row:
+                continue
+            if len(row) != len(columns):
+                raise ValueError(
+                    f"row {number} has {len(row)} values, expected {len(columns)}"
+                )
+
+            yield [None if value == null else value for value in row]
+
+    async def load(
+        self, f: TextIO, table: str, delimiter: str = ",", null: str = ""
+    ) -> int:
+        """Load a data file
+
+        :param f: Data file, read from the current position
+        :type f: TextIO
+        :param table: Table to load into, optionally schema qualified
+        :type table: str
+        :param delimiter: Value delimiter
+        :type delimiter: str
+        :param null: Values to load as NULL
+        :type null: str
+        :return: Number of rows loaded
+        """
+        rows = csv.reader(data_lines(f), delimiter=delimiter)
+        columns = next(rows, None)
+
+        if not columns:
+            raise ValueError("data file has no header row")
+
+        # Of equal width, so no placeholder is a prefix of another
+        names = [f"c{i:0{len(str(len(columns)))}d}" for i in range(len(columns))]
+        query = Query(
+            f"INSERT INTO {self.quote(table)} "
+            f"({', '.join(self.quote(c) for c in columns)}) "
+            f"VALUES ({', '.join(f'${n}' for n in names)})"
+        )
+        records = self._records(rows, columns, null)
+        loaded = 0
+
+        while True:
+            batch = [
+                dict(zip(names, r)) for r in itertools.islice(records, self.batch_size)
+            ]
+
+            if not batch:
+                break
+
+            await self.connection.execute_many(query, batch)
+            loaded += len(batch)
+
+        return loaded
+
+
+class PostgreSQLBulkLoader(BulkLoader):
+    """Stream the file to `COPY ... FROM STDIN`, which parses it on the server"""
+
+    @staticmethod
+    async def _chunks(lines: Iterable[str]) -> AsyncIterator[bytes]:
+        chunk: List[str] = []
+        size = 0
+
+        for line in lines:
+            chunk.append(line)
+            size += len(line)
+
+            if size >= COPY_CHUNK_SIZE:
+                yield "".join(chunk).encode()
+                chunk, size = [], 0
+
+        if chunk:
+            yield "".join(chunk).encode()
+
+    async def load(
+        self, f: TextIO, table: str, delimiter: str = ",", null: str = ""
+    ) -> int:
+        lines = data_lines(f)
+        header = next(lines, None)
+
+        if header is None:
+            raise ValueError("data file has no header row")
+
+        columns = next(csv.reader([header], delimiter=delimiter))
+        schema, _, name = table.rpartition(".")
+        # asyncpg quotes the names, e.g. COPY "public"."country" ("code", "name")
+        status = await self.connection.database.copy_to_table(
+            name,
+            schema_name=schema or None,
+            columns=columns,
+            source=self._chunks(lines),
+            format="csv",
+            delimiter=delimiter,
+            null=null,
+        )
+
+        # e.g. COPY 250
+        return int(status.split()[-1])
+
+
+class MySQLBulkLoader(BulkLoader):
+    """Batches rows into multi-row inserts. `LOAD DATA LOCAL INFILE` is faster but
+    needs `local_infile` enabled on both the client and the server.
+    """
+
+    quote_char = "`"
+
+
+BULK_LOADERS = {
+    "mysql": MySQLBulkLoader,
+    "postgresql": PostgreSQLBulkLoader,
+    # One transaction per migration already, executemany runs each batch in C
+    "sqlite": BulkLoader,
+}
+
+
+def create_bulk_loader(
+    connection: ConnectionBackend, batch_size: int = DEFAULT_BATCH_SIZE
+) -> BulkLoader:
+    try:
+        loader = BULK_LOADERS[connection.dialect]
+    except KeyError:
+        raise RuntimeError(
+            f"Data migrations aren't supported with {connection.dialect}"
+        )
+
+    return loader(connection, batch_size)
@@ -2,17 +2,34 @@ import asyncio
 import logging
 import os
 import sys
+import time
 from importlib import import_module
-from typing import Optional, Type, TYPE_CHECKING, Union
+from typing import Dict, List, Optional, Tuple, Type, TYPE_CHECKING, Union
 
 import click
 
 if TYPE_CHECKING:
     from asyncpg import Connection
 
-from migri import migration
+from migri import (
+    bundle,
+    clone,
+    drift,
+    lint,
+    memory,
+    migration,
+    plan,
+    provision,
+    render,
+)
+from migri.backends.recording import RecordingConnection
+from migri.backends.sqlite import PRAGMA_PROFILES
 from migri.interfaces import ConnectionBackend
+from migri.metrics import MetricsRecorder, OpenMetricsRecorder
+from migri.throttle import LAG_QUERIES, LagThrottle, sql_lag_probe, Throttle
+from migri.tracing import create_tracer, Tracer
 from migri.utils import deprecated, Echo
+from migri.watchdog import create_lock_watchdog, LockWatchdog
 
 DEFAULT_LOG_LEVEL = "error"
 LEGACY_FUNCTIONALITY_END_OF_LIFE = "1.1.0"
@@ -20,6 +37,7 @@ SUPPORTED_DIALECTS = {
     "mysql": "migri.backends.mysql::MySQL",
     "postgresql": "migri.backends.postgresql::PostgreSQL",
     "sqlite": "migri.backends.sqlite::SQLite",
+    "sqlite3": "migri.backends.sqlite::SQLiteNative",
 }
 
 logging.basicConfig(
@@ -75,38 +93,290 @@ async def run_migrations(
     await apply_migrations(migrations_dir, conn, dry_run, force_close_conn)
 
 
+async def _check_lag_query(conn: ConnectionBackend, lag_query: str):
+    """Read the lag once before migrating. The query runs on the database being
+    migrated, one that returns no lag there (e.g. `SHOW REPLICA STATUS` on a primary)
+    would never pause migrations.
+    """
+    async with conn.spawn() as probe_conn:
+        lag = await sql_lag_probe(lag_query)(probe_conn)
+
+    if lag is None:
+        raise click.UsageError(
+            "--lag-query returned no lag on the database being migrated, it must "
+            "return the lag of its replicas in seconds"
+        )
+
+
+async def _verify_on_clone(
+    migrations_dir: str,
+    conn: ConnectionBackend,
+    tracer: Tracer,
+    **options,
+) -> List[migration.MigrationResult]:
+    """Apply pending migrations to a throwaway clone of the database, with the same
+    `Migrate` options as the database itself. The clone isn't replicated, so it
+    isn't throttled, and it gets a watchdog of its own.
+    """
+    with tracer.span("migri.verify"):
+        async with clone.clone_database(conn) as clone_conn:
+            Echo.info("Verifying migrations on a clone of the database")
+
+            async with clone_conn:
+                await migration.Initialize(clone_conn, tracer=tracer).run()
+                results = await migration.Migrate(
+                    clone_conn, tracer=tracer, **options
+                ).run(migrations_dir)
+
+    for result in results:
+        if result.duration is not None:
+            Echo.info(f"{result.migration_name} took {result.duration:.3f}s on clone")
+
+    return results
+
+
+async def _apply_in_memory(
+    migrations_dir: str,
+    conn: ConnectionBackend,
+    dry_run: bool,
+    metrics: Optional[MetricsRecorder],
+    tracer: Tracer,
+    throttle: Optional[Throttle],
+    session_settings: Optional[Dict[str, str]],
+    account_resources: bool,
+    analyze: bool,
+    analyze_jobs: int,
+) -> List[migration.MigrationResult]:
+    build = memory.InMemoryBuild(conn)
+
+    async with build as memory_conn:
+        await migration.Initialize(memory_conn, metrics, tracer).run()
+        results = await migration.Migrate(
+            memory_conn,
+            metrics,
+            tracer,
+            throttle,
+            session_settings,
+            account_resources,
+            analyze=analyze,
+            analyze_jobs=analyze_jobs,
+        ).run(migrations_dir, dry_run)
+
+        if any(r.status == migration.MigrationStatus.FAILURE for r in results):
+            Echo.error("Migrations failed in memory, nothing was written.")
+        elif not dry_run:
+            await build.commit()
+
+    return results
+
+
 async def apply_migrations(
     migrations_dir: str,
     conn: ConnectionBackend,
     dry_run: bool = False,
     force_close_conn: bool = True,  # TODO For backwards compatibility, remove in 1.1.0
-):
-    init_task = migration.Initialize(conn)
-    migrate_task = migration.Migrate(conn)
+    metrics: Optional[MetricsRecorder] = None,
+    tracer: Optional[Tracer] = None,
+    verify_on_clone: bool = False,
+    throttle: Optional[Throttle] = None,
+    in_memory: bool = False,
+    session_settings: Optional[Dict[str, str]] = None,
+    account_resources: bool = False,
+    watchdog: Optional[LockWatchdog] = None,
+    analyze: bool = False,
+    analyze_jobs: int = 1,
+    coalesce_alters: bool = False,
+) -> List[migration.MigrationResult]:
+    """Apply pending migrations. With `verify_on_clone`, they're applied to a clone
+    of the database first and only applied to the database if that succeeds, in
+    which case the clone's results are returned. With `in_memory` (SQLite only),
+    they're applied to an in-memory copy of the database that replaces the file
+    only if all of them succeed. `session_settings` (e.g.
+    `{"maintenance_work_mem": "1GB"}`) are applied while each migration runs, unless
+    the migration declares its own value. With `account_resources`, database
+    counters each migration changed (e.g. WAL bytes) are added to its result.
+    A `watchdog` (e.g. `create_lock_watchdog(dialect, max_blocked=10)`) cancels
+    migrations that block other sessions. With `analyze`, tables touched by applied
+    migrations are analyzed at the end of the run, `analyze_jobs` at a time. With
+    `coalesce_alters` (MySQL and PostgreSQL), consecutive `ALTER TABLE` statements on
+    the same table within a migration are combined into one.
+    """
+    tracer = tracer or Tracer()
+    init_task = migration.Initialize(conn, metrics, tracer)
+    migrate_task = migration.Migrate(
+        conn,
+        metrics,
+        tracer,
+        throttle,
+        session_settings,
+        account_resources,
+        watchdog,
+        analyze,
+        analyze_jobs,
+        coalesce_alters,
+    )
+    start = time.perf_counter()
+
+    try:
+        with tracer.span("migri.run", dialect=conn.dialect, dry_run=dry_run):
+            if verify_on_clone:
+                # Statistics of the clone are thrown away with it, so it isn't
+                # analyzed
+                results = await _verify_on_clone(
+                    migrations_dir,
+                    conn,
+                    tracer,
+                    session_settings=session_settings,
+                    account_resources=account_resources,
+                    watchdog=watchdog.fresh() if watchdog else None,
+                    coalesce_alters=coalesce_alters,
+                )
+
+                if any(r.status == migration.MigrationStatus.FAILURE for r in results):
+                    Echo.error("Migrations failed on the clone, nothing was applied.")
+                    return results
+
+            if in_memory:
+                return await _apply_in_memory(
+                    migrations_dir,
+                    conn,
+                    dry_run,
+                    metrics,
+                    tracer,
+                    throttle,
+                    session_settings,
+                    account_resources,
+                    analyze,
+                    analyze_jobs,
+                )
+
+            with tracer.span("migri.connect"):
+                await conn.connect()
+
+            await init_task.run()
+            results = await migrate_task.run(migrations_dir, dry_run)
+
+        if force_close_conn:
+            await conn.disconnect()
+    finally:
+        tracer.close()
+
+        if metrics:
+            metrics.observe_run(time.perf_counter() - start)
+            await metrics.export()
+
+    return results
+
+
+async def lint_migrations(
+    migrations_dir: str,
+    conn: ConnectionBackend,
+    severities: Optional[Dict[str, "lint.Severity"]] = None,
+    all_migrations: bool = False,
+) -> List["lint.Finding"]:
+    """Lint pending (or all) SQL migrations for slow and lock heavy statements"""
+    lint_task = lint.Lint(conn)
+
+    if all_migrations:
+        return await lint_task.run(migrations_dir, severities, all_migrations)
+
+    await conn.connect()
+
+    try:
+        await migration.Initialize(conn).check()
+        return await lint_task.run(migrations_dir, severities)
+    finally:
+        await conn.disconnect()
+
+
+async def plan_migrations(
+    migrations_dir: str,
+    conn: ConnectionBackend,
+    seq_scan_threshold: int = plan.DEFAULT_SEQ_SCAN_THRESHOLD,
+) -> List["plan.MigrationPlan"]:
+    """EXPLAIN DML statements of pending migrations without applying them"""
+    await conn.connect()
 
+    try:
+        await migration.Initialize(conn).check()
+        return await plan.Plan(conn).run(migrations_dir, seq_scan_threshold)
+    finally:
+        await conn.disconnect()
+
+
+async def provision_databases(
+    migrations_dir: str,
+    conn: ConnectionBackend,
+    copies: int,
+    rebuild: bool = False,
+) -> List[ConnectionBackend]:
+    """Migrate a template database if the migrations changed since it was last built
+    and create copies of it. Returns unconnected backends for the copies.
+    """
+    return await provision.create_provision(conn).run(migrations_dir, copies, rebuild)
+
+
+async def verify_migrations(
+    migrations_dir: str,
+    conn: ConnectionBackend,
+    cache_path: Optional[str] = None,
+) -> List["drift.Drift"]:
+    """Report applied migrations whose files changed or are missing"""
     await conn.connect()
-    await init_task.run()
-    await migrate_task.run(migrations_dir, dry_run)
 
-    if force_close_conn:
+    try:
+        await migration.Initialize(conn).check()
+        return await drift.Verify(conn).run(migrations_dir, cache_path)
+    finally:
         await conn.disconnect()
 
 
+async def render_migrations(
+    migrations_dir: str,
+    conn: Optional[ConnectionBackend] = None,
+    dialect: Optional[str] = None,
+) -> "render.RenderedScript":
+    """Render pending migrations into a SQL script for native clients (e.g. psql)
+    instead of applying them, including bookkeeping and transaction boundaries.
+    Applied migrations are read from `conn`, which isn't written to. Without it, all
+    migrations are rendered for a new database of `dialect`.
+    """
+    recording = RecordingConnection(
+        source=conn, target_dialect=None if conn else dialect
+    )
+    await recording.connect()
+
+    try:
+        await migration.Initialize(recording).run()
+        results = await render.Render(recording).run(migrations_dir)
+    finally:
+        await recording.disconnect()
+
+    return render.RenderedScript(recording.script(), results)
+
+
+def bundle_migrations(migrations_dir: str, path: str) -> int:
+    """Pack a migrations directory into a bundle file that commands accept in place
+    of the directory. Returns the number of migrations packed.
+    """
+    migrations = migration.MigrationFilesMixin().get_migrations(migrations_dir)
+    return bundle.write_bundle(migrations, path)
+
+
+def _default_checksum_cache() -> str:
+    cache_home = os.getenv("XDG_CACHE_HOME", os.path.expanduser("~/.cache"))
+    return os.path.join(cache_home, "migri", "checksums.json")
+
+
 def _get_backend(module_info: str) -> Type[ConnectionBackend]:
     module_name, module_class_prefix = module_info.split("::")
     module = import_module(module_name)
     return getattr(module, f"{module_class_prefix}Connection")
 
 
-def get_connection(
-    db_name: str,
-    db_user: Optional[str] = None,
-    db_pass: Optional[str] = None,
-    db_host: Optional[str] = None,
-    db_port: Optional[Union[int, str]] = None,
-    dialect: Optional[str] = None,
-) -> ConnectionBackend:
-    """Infer db dialect if not provided and initialize connection to database"""
+def _infer_dialect(
+    db_port: Optional[Union[int, str]] = None, dialect: Optional[str] = None
+) -> str:
     # If no dialect, infer
     if not dialect:
         if not db_port:
@@ -120,12 +390,32 @@ def get_connection(
                 "Unable to infer database dialect, please specify dialect"
             )
 
+    return dialect
+
+
+def _dialect_backend(dialect: str) -> Type[ConnectionBackend]:
     try:
         module_info = SUPPORTED_DIALECTS[dialect]
     except KeyError:
         raise RuntimeError(f"The dialect '{dialect}' is not supported")
 
-    connection = _get_backend(module_info)
+    return _get_backend(module_info)
+
+
+def get_connection(
+    db_name: str,
+    db_user: Optional[str] = None,
+    db_pass: Optional[str] = None,
+    db_host: Optional[str] = None,
+    db_port: Optional[Union[int, str]] = None,
+    dialect: Optional[str] = None,
+    **options,
+) -> ConnectionBackend:
+    """Infer db dialect if not provided and initialize connection to database.
+    Additional options are passed to the connection backend (e.g. `pragmas` for
+    SQLite).
+    """
+    connection = _dialect_backend(_infer_dialect(db_port, dialect))
 
     return connection(
         db_name,
@@ -133,11 +423,17 @@ def get_connection(
         db_pass=db_pass,
         db_host=db_host,
         db_port=int(db_port) if db_port else None,
+        **options,
     )
 
 
 @click.group()
-@click.option("-n", "--db-name", required=True, default=lambda: os.getenv("DB_NAME"))
+@click.option(
+    "-n",
+    "--db-name",
+    default=lambda: os.getenv("DB_NAME"),
+    help="Required by commands that connect to the database",
+)
 @click.option("-u", "--db-user", default=lambda: os.getenv("DB_USER"))
 @click.option("-s", "--db-pass", default=lambda: os.getenv("DB_PASS"))
 @click.option("-h", "--db-host", default=lambda: os.getenv("DB_HOST"))
@@ -146,25 +442,80 @@ def get_connection(
 @click.option(
     "-l", "--log-level", default=lambda: os.getenv("LOG_LEVEL", DEFAULT_LOG_LEVEL)
 )
+@click.option(
+    "--sqlite-profile",
+    default=lambda: os.getenv("MIGRI_SQLITE_PROFILE", "default"),
+    type=click.Choice(list(PRAGMA_PROFILES)),
+    help="SQLite pragmas to use while migrating, restored afterwards",
+)
 @click.pass_context
 def cli(ctx, **kwargs) -> None:
     log_level = kwargs.pop("log_level")
+    options = {}
 
     logger.setLevel(log_level.upper())
     logger.debug("Log %s", logging.getLevelName(log_level))
 
-    # Expose db creds to commands via context
+    if kwargs["sqlite_profile"] != "default":
+        dialect = _infer_dialect(kwargs["db_port"], kwargs["dialect"])
+
+        if dialect not in ("sqlite", "sqlite3"):
+            raise click.UsageError(f"--sqlite-profile doesn't apply to {dialect}")
+
+        options["pragmas"] = PRAGMA_PROFILES[kwargs["sqlite_profile"]]
+
+    # Expose db creds to commands via context, commands that don't connect (e.g.
+    # bundle) don't need them
     ctx.ensure_object(dict)
-    ctx.obj["connection"] = get_connection(
+    ctx.obj["connection_options"] = dict(
         db_name=kwargs["db_name"],
         db_user=kwargs["db_user"],
         db_pass=kwargs["db_pass"],
         db_host=kwargs["db_host"],
         db_port=kwargs["db_port"],
         dialect=kwargs["dialect"],
+        **options,
     )
 
 
+def _connection(ctx) -> ConnectionBackend:
+    """Connection of a command that connects to the database"""
+    options = ctx.obj["connection_options"]
+
+    if not options["db_name"]:
+        raise click.UsageError("Missing option '-n' / '--db-name'.")
+
+    return get_connection(**options)
+
+
+def _dialect(ctx) -> str:
+    """Dialect of a command that only needs to know it, without a database"""
+    options = ctx.obj["connection_options"]
+    return _dialect_backend(
+        _infer_dialect(options["db_port"], options["dialect"])
+    )._dialect
+
+
+def _lint_severities(ctx, param, value: Tuple[str, ...]) -> Dict[str, lint.Severity]:
+    """Severity overrides keyed by rule name from `RULE=LEVEL` options"""
+    levels = click.Choice([s.value for s in lint.Severity], case_sensitive=False)
+    overrides = {}
+
+    for override in value:
+        rule, _, level = override.partition("=")
+
+        if rule not in lint.RULES:
+            raise click.BadParameter(
+                f"unknown rule {rule!r} (expected one of {', '.join(lint.RULES)})",
+                ctx,
+                param,
+            )
+
+        overrides[rule] = lint.Severity(levels.convert(level, param, ctx).lower())
+
+    return overrides
+
+
 @cli.command(short_help="Create migrations table to begin using migri [unsupported]")
 @click.pass_context
 def init(ctx) -> None:
@@ -179,9 +530,390 @@ def init(ctx) -> None:
     default=lambda: os.getenv("MIGRATIONS_DIR", "migrations"),
 )
 @click.option("--dry-run", default=False, is_flag=True)
+@click.option(
+    "--metrics-file",
+    default=lambda: os.getenv("MIGRI_METRICS_FILE"),
+    help="Write run metrics in OpenMetrics text format to this file",
+)
+@click.option(
+    "--metrics-push-url",
+    default=lambda: os.getenv("MIGRI_METRICS_PUSH_URL"),
+    help="PUT run metrics in OpenMetrics text format to this URL",
+)
+@click.option(
+    "--trace-file",
+    default=lambda: os.getenv("MIGRI_TRACE_FILE"),
+    help="Append trace spans as JSON lines to this file",
+)
+@click.option(
+    "--trace-parent",
+    default=lambda: os.getenv("TRACEPARENT"),
+    help="W3C traceparent of the deploy trace to link spans to",
+)
+@click.option(
+    "--otel",
+    default=False,
+    is_flag=True,
+    help="Emit trace spans with OpenTelemetry (requires opentelemetry-api)",
+)
+@click.option(
+    "--max-lag",
+    default=lambda: os.getenv("MIGRI_MAX_LAG"),
+    type=float,
+    help="Pause between migrations and chunks while replication lag is above this "
+    "many seconds",
+)
+@click.option(
+    "--lag-query",
+    default=lambda: os.getenv("MIGRI_LAG_QUERY"),
+    help="Query returning replication lag in seconds (default for PostgreSQL: "
+    "pg_stat_replication)",
+)
+@click.option(
+    "--verify-on-clone",
+    default=False,
+    is_flag=True,
+    help="Apply migrations to a throwaway clone of the database first",
+)
+@click.option(
+    "--in-memory",
+    default=False,
+    is_flag=True,
+    help="SQLite only: migrate a copy of the database in memory and replace the "
+    "file atomically if all migrations succeed",
+)
+@click.option(
+    "--set",
+    "session_settings",
+    multiple=True,
+    metavar="NAME=VALUE",
+    help="Session setting to apply while each migration runs (e.g. "
+    "maintenance_work_mem=1GB), unless the migration declares its own",
+)
+@click.option(
+    "--account-resources",
+    default=False,
+    is_flag=True,
+    help="Report database resources used by each migration (e.g. WAL or binary "
+    "log bytes, rows)",
+)
+@click.option(
+    "--max-blocked",
+    default=lambda: os.getenv("MIGRI_MAX_BLOCKED"),
+    type=int,
+    help="Cancel a migration when more than this many sessions wait on its locks",
+)
+@click.option(
+    "--max-blocked-wait",
+    default=lambda: os.getenv("MIGRI_MAX_BLOCKED_WAIT"),
+    type=float,
+    help="Cancel a migration when a session has waited on its locks for longer than "
+    "this many seconds",
+)
+@click.option(
+    "--analyze",
+    default=False,
+    is_flag=True,
+    help="Refresh statistics of tables touched by applied migrations with ANALYZE",
+)
+@click.option(
+    "--analyze-jobs",
+    default=lambda: os.getenv("MIGRI_ANALYZE_JOBS", 1),
+    type=int,
+    help="Tables to analyze concurrently",
+)
+@click.option(
+    "--coalesce-alters",
+    default=False,
+    is_flag=True,
+    help="Combine consecutive ALTER TABLE statements on the same table within a "
+    "migration into one (MySQL and PostgreSQL)",
+)
+@click.pass_context
+def migrate(
+    ctx,
+    migrations_dir: str,
+    dry_run: bool,
+    metrics_file: Optional[str],
+    metrics_push_url: Optional[str],
+    trace_file: Optional[str],
+    trace_parent: Optional[str],
+    otel: bool,
+    max_lag: Optional[float],
+    lag_query: Optional[str],
+    verify_on_clone: bool,
+    in_memory: bool,
+    session_settings: List[str],
+    account_resources: bool,
+    max_blocked: Optional[int],
+    max_blocked_wait: Optional[float],
+    analyze: bool,
+    analyze_jobs: int,
+    coalesce_alters: bool,
+) -> None:
+    connection = _connection(ctx)
+    metrics = None
+    throttle = None
+    watchdog = None
+    settings = {}
+
+    for setting in session_settings:
+        name, _, value = setting.partition("=")
+        settings[name] = value
+
+    if metrics_file or metrics_push_url:
+        metrics = OpenMetricsRecorder(metrics_file, metrics_push_url)
+
+    if max_lag is not None:
+        lag_query = lag_query or LAG_QUERIES.get(connection.dialect)
+
+        if not lag_query:
+            raise click.UsageError(f"--lag-query is required with {connection.dialect}")
+
+        asyncio.run(_check_lag_query(connection, lag_query))
+        throttle = LagThrottle(sql_lag_probe(lag_query), max_lag)
+
+    if max_blocked is not None or max_blocked_wait is not None:
+        try:
+            watchdog = create_lock_watchdog(
+                connection.dialect, max_blocked=max_blocked, max_wait=max_blocked_wait
+            )
+        except RuntimeError as e:
+            raise click.UsageError(str(e))
+
+    asyncio.run(
+        apply_migrations(
+            migrations_dir,
+            connection,
+            dry_run,
+            metrics=metrics,
+            tracer=create_tracer(trace_file, trace_parent, otel),
+            verify_on_clone=verify_on_clone,
+            throttle=throttle,
+            in_memory=in_memory,
+            session_settings=settings,
+            account_resources=account_resources,
+            watchdog=watchdog,
+            analyze=analyze,
+            analyze_jobs=analyze_jobs,
+            coalesce_alters=coalesce_alters,
+        )
+    )
+
+
+@cli.command("lint", short_help="Check migrations for slow and lock heavy statements")
+@click.option(
+    "-m",
+    "--migrations-dir",
+    required=True,
+    default=lambda: os.getenv("MIGRATIONS_DIR", "migrations"),
+)
+@click.option(
+    "--all",
+    "all_migrations",
+    default=False,
+    is_flag=True,
+    help="Lint all migrations, not only pending ones (no database required)",
+)
+@click.option(
+    "--severity",
+    "severities",
+    multiple=True,
+    metavar="RULE=LEVEL",
+    callback=_lint_severities,
+    help="Override a rule's severity (off, info, warning, error)",
+)
+@click.option(
+    "--fail-on",
+    default=lint.Severity.ERROR.value,
+    type=click.Choice([s.value for s in lint.Severity if s != lint.Severity.OFF]),
+)
+@click.option(
+    "-f",
+    "--format",
+    "output_format",
+    default="text",
+    type=click.Choice(["text", "json"]),
+)
+@click.pass_context
+def lint_cmd(
+    ctx,
+    migrations_dir: str,
+    all_migrations: bool,
+    severities: Dict[str, lint.Severity],
+    fail_on: str,
+    output_format: str,
+) -> None:
+    findings = asyncio.run(
+        lint_migrations(
+            migrations_dir,
+            # Only the dialect's rules are needed to lint all migrations
+            RecordingConnection(target_dialect=_dialect(ctx))
+            if all_migrations
+            else _connection(ctx),
+            severities,
+            all_migrations,
+        )
+    )
+
+    if findings or output_format == "json":
+        Echo.info(lint.format_findings(findings, output_format))
+
+    threshold = lint.Severity(fail_on)
+
+    if any(f.severity.rank >= threshold.rank for f in findings):
+        ctx.exit(1)
+
+
+@cli.command("plan", short_help="Estimate rows and cost of pending DML statements")
+@click.option(
+    "-m",
+    "--migrations-dir",
+    required=True,
+    default=lambda: os.getenv("MIGRATIONS_DIR", "migrations"),
+)
+@click.option(
+    "--seq-scan-threshold",
+    default=plan.DEFAULT_SEQ_SCAN_THRESHOLD,
+    type=int,
+    help="Flag sequential scans of tables with at least this many rows",
+)
+@click.option(
+    "-f",
+    "--format",
+    "output_format",
+    default="text",
+    type=click.Choice(["text", "json"]),
+)
+@click.pass_context
+def plan_cmd(
+    ctx, migrations_dir: str, seq_scan_threshold: int, output_format: str
+) -> None:
+    plans = asyncio.run(
+        plan_migrations(migrations_dir, _connection(ctx), seq_scan_threshold)
+    )
+
+    if plans or output_format == "json":
+        Echo.info(plan.format_plans(plans, output_format))
+    else:
+        Echo.info("All synced! No new migrations to plan.")
+
+
+@cli.command("provision", short_help="Create migrated copies of a template database")
+@click.option(
+    "-m",
+    "--migrations-dir",
+    required=True,
+    default=lambda: os.getenv("MIGRATIONS_DIR", "migrations"),
+)
+@click.option("-c", "--copies", default=1, type=click.IntRange(min=0))
+@click.option(
+    "--rebuild",
+    default=False,
+    is_flag=True,
+    help="Rebuild the template even if the migrations didn't change",
+)
+@click.pass_context
+def provision_cmd(ctx, migrations_dir: str, copies: int, rebuild: bool) -> None:
+    connections = asyncio.run(
+        provision_databases(migrations_dir, _connection(ctx), copies, rebuild)
+    )
+
+    for connection in connections:
+        Echo.info(connection.db_name)
+
+
+@cli.command(short_help="Check applied migrations for changed or missing files")
+@click.option(
+    "-m",
+    "--migrations-dir",
+    required=True,
+    default=lambda: os.getenv("MIGRATIONS_DIR", "migrations"),
+)
+@click.option(
+    "--cache-file",
+    default=lambda: os.getenv("MIGRI_CHECKSUM_CACHE", _default_checksum_cache()),
+    help="File to cache checksums in, keyed by file size and modification time",
+)
+@click.option("--no-cache", default=False, is_flag=True)
+@click.option(
+    "-f",
+    "--format",
+    "output_format",
+    default="text",
+    type=click.Choice(["text", "json"]),
+)
+@click.pass_context
+def verify(
+    ctx, migrations_dir: str, cache_file: str, no_cache: bool, output_format: str
+) -> None:
+    found = asyncio.run(
+        verify_migrations(
+            migrations_dir, _connection(ctx), None if no_cache else cache_file
+        )
+    )
+
+    if found or output_format == "json":
+        Echo.info(drift.format_drift(found, output_format))
+    else:
+        Echo.info("No drift, applied migrations match their files.")
+
+    if any(d.status != drift.DriftStatus.UNKNOWN for d in found):
+        ctx.exit(1)
+
+
+@cli.command("bundle", short_help="Pack migrations into a single bundle file")
+@click.option(
+    "-m",
+    "--migrations-dir",
+    required=True,
+    default=lambda: os.getenv("MIGRATIONS_DIR", "migrations"),
+)
+@click.option(
+    "-o",
+    "--output",
+    required=True,
+    default=lambda: os.getenv("MIGRI_BUNDLE", "migrations.zip"),
+    help="Bundle file to write",
+)
+def bundle_cmd(migrations_dir: str, output: str) -> None:
+    count = bundle_migrations(migrations_dir, output)
+    Echo.success(f"Bundled {count} migrations into {output}")
+
+
+@cli.command("sql", short_help="Render pending migrations into a SQL script")
+@click.option(
+    "-m",
+    "--migrations-dir",
+    required=True,
+    default=lambda: os.getenv("MIGRATIONS_DIR", "migrations"),
+)
+@click.option(
+    "-o",
+    "--output",
+    default="-",
+    type=click.File("w"),
+    help="Script to write, stdout by default",
+)
+@click.option(
+    "--all",
+    "all_migrations",
+    default=False,
+    is_flag=True,
+    help="Render all migrations for a new database (no database required)",
+)
 @click.pass_context
-def migrate(ctx, migrations_dir: str, dry_run: bool) -> None:
-    asyncio.run(apply_migrations(migrations_dir, ctx.obj["connection"], dry_run))
+def sql_cmd(ctx, migrations_dir: str, output, all_migrations: bool) -> None:
+    if all_migrations:
+        script = asyncio.run(render_migrations(migrations_dir, dialect=_dialect(ctx)))
+    else:
+        script = asyncio.run(render_migrations(migrations_dir, _connection(ctx)))
+
+    # Failures were reported with the results
+    if not script.ok:
+        ctx.exit(1)
+
+    output.write(script.sql)
 
 
 def main():
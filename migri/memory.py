@@ -0,0 +1,113 @@
+import logging
+import os
+import sqlite3
+import tempfile
+
+from migri.interfaces import ConnectionBackend
+
+__all__ = ["InMemoryBuild"]
+logger = logging.getLogger(__name__)
+
+IN_MEMORY_DIALECTS = {"sqlite"}
+
+
+def _journal_mode(path: str) -> str:
+    connection = sqlite3.connect(path)
+
+    try:
+        return connection.execute("PRAGMA journal_mode").fetchone()[0]
+    finally:
+        connection.close()
+
+
+def _fsync(path: str):
+    fd = os.open(path, os.O_RDONLY)
+
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+async def _write_atomically(memory: ConnectionBackend, path: str, journal_mode: str):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(
+        dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".migri"
+    )
+    os.close(fd)
+
+    try:
+        await memory.backup(temp_path)
+
+        # The in-memory database has no journal, restore WAL mode if the file had it
+        if journal_mode == "wal":
+            connection = sqlite3.connect(temp_path)
+            connection.execute("PRAGMA journal_mode = wal")
+            connection.close()
+
+        if os.path.exists(path):
+            os.chmod(temp_path, os.stat(path).st_mode)
+
+        _fsync(temp_path)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+
+    if hasattr(os, "O_DIRECTORY"):
+        _fsync(directory)
+
+
+class InMemoryBuild:
+    """Load an SQLite database file (or nothing if it doesn't exist) into memory to
+    migrate it there. Entering yields a connected backend for the in-memory copy and
+    `commit` writes it to a temporary file next to the database that is renamed over
+    it, so the file is either untouched or replaced as a whole. Changes made by
+    others during the build are lost.
+
+    :param connection: Unconnected backend of the database file
+    :type connection: ConnectionBackend
+    """
+
+    def __init__(self, connection: ConnectionBackend):
+        if connection.dialect not in IN_MEMORY_DIALECTS:
+            raise RuntimeError(
+                f"In-memory builds aren't supported with {connection.dialect}"
+            )
+
+        if connection.db_name == ":memory:":
+            raise RuntimeError("Database is already in memory")
+
+        self.path = connection.db_name
+        self.memory = connection.spawn(db_name=":memory:")
+        self._journal_mode = "delete"
+
+    async def __aenter__(self) -> ConnectionBackend:
+        path = self.path
+
+        # Frames in a leftover WAL would be applied to the replaced file
+        if os.path.exists(f"{path}-wal") and os.path.getsize(f"{path}-wal"):
+            raise RuntimeError(f"{path} is in use (found a write-ahead log)")
+
+        await self.memory.connect()
+
+        try:
+            if os.path.exists(path) and os.path.getsize(path) > 0:
+                self._journal_mode = _journal_mode(path)
+                await self.memory.restore(path)
+        except BaseException:
+            await self.memory.disconnect()
+            raise
+
+        logger.info("Loaded %s into memory", path)
+        return self.memory
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.memory.disconnect()
+
+    async def commit(self):
+        # Migrations commit their own changes, anything left open is discarded
+        await self.memory.database.rollback()
+        await _write_atomically(self.memory, self.path, self._journal_mode)
+        logger.info("Wrote in-memory database to %s", self.path)
@@ -0,0 +1,246 @@
+import asyncio
+import logging
+import os
+import tempfile
+import time
+import urllib.request
+from typing import Dict, List, Optional, Tuple
+
+__all__ = ["MetricsRecorder", "OpenMetricsRecorder"]
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0)
+OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+
+def _escape_label_value(value: str) -> str:
+    """Escape a label value for the OpenMetrics text format"""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsRecorder:
+    """Records nothing. Tasks call these hooks unconditionally, so keeping them
+    no-ops is what makes metrics free when they're turned off.
+    """
+
+    def observe_bookkeeping(self, seconds: float):
+        pass
+
+    def observe_lock_wait(self, seconds: float):
+        pass
+
+    def observe_migration(self, migration_name: str, seconds: float, ok: bool):
+        pass
+
+    def observe_resources(self, migration_name: str, resources: Dict[str, int]):
+        pass
+
+    def observe_run(self, seconds: float):
+        pass
+
+    def observe_throttle(self, seconds: float):
+        pass
+
+    def set_pending(self, count: int):
+        pass
+
+    async def progress(self):
+        """Called before the first migration of a run and after each one"""
+        pass
+
+    async def export(self):
+        pass
+
+
+class OpenMetricsRecorder(MetricsRecorder):
+    """Collects metrics for a single run and writes them in OpenMetrics text format
+    to a file (e.g. for node-exporter's textfile collector) and/or pushes them to an
+    HTTP endpoint (e.g. a local Pushgateway).
+
+    :param path: File to write metrics to, replaced atomically
+    :type path: str, optional
+    :param push_url: URL to PUT metrics to
+    :type push_url: str, optional
+    :param timeout: Push request timeout in seconds
+    :type timeout: float
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        push_url: Optional[str] = None,
+        timeout: float = 5.0,
+    ):
+        if not path and not push_url:
+            raise ValueError("Expected path or push_url")
+
+        self.path = path
+        self.push_url = push_url
+        self.timeout = timeout
+        self.applied = 0
+        self.bookkeeping_seconds = 0.0
+        self.durations: List[Tuple[str, float]] = []
+        self.failed = 0
+        self.lock_wait_seconds = 0.0
+        self.pending = 0
+        self.resources: List[Tuple[str, Dict[str, int]]] = []
+        # Until the run finished, its duration and end aren't known
+        self.running = False
+        self.run_seconds = 0.0
+        self.throttled_seconds = 0.0
+
+    def observe_bookkeeping(self, seconds: float):
+        self.bookkeeping_seconds += seconds
+
+    def observe_lock_wait(self, seconds: float):
+        self.lock_wait_seconds += seconds
+
+    def observe_migration(self, migration_name: str, seconds: float, ok: bool):
+        self.durations.append((migration_name, seconds))
+
+        if ok:
+            self.applied += 1
+        else:
+            self.failed += 1
+
+    def observe_resources(self, migration_name: str, resources: Dict[str, int]):
+        self.resources.append((migration_name, resources))
+
+    def observe_run(self, seconds: float):
+        self.running = False
+        self.run_seconds = seconds
+
+    def observe_throttle(self, seconds: float):
+        self.throttled_seconds = seconds
+
+    def set_pending(self, count: int):
+        self.pending = count
+
+    async def progress(self):
+        # Exported as the run goes, so long runs can be followed
+        self.running = True
+        await self.export()
+
+    def render(self, timestamp: Optional[float] = None) -> str:
+        lines = []
+
+        def gauge(name: str, description: str, value: float, unit: str = ""):
+            lines.append(f"# TYPE {name} gauge")
+
+            if unit:
+                lines.append(f"# UNIT {name} {unit}")
+
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"{name} {value}")
+
+        gauge(
+            "migri_run_in_progress",
+            "Whether the migration run is still going.",
+            int(self.running),
+        )
+
+        if not self.running:
+            gauge(
+                "migri_run_duration_seconds",
+                "Duration of the last migration run.",
+                self.run_seconds,
+                "seconds",
+            )
+            gauge(
+                "migri_last_run_timestamp_seconds",
+                "Time the last migration run finished.",
+                timestamp if timestamp is not None else time.time(),
+                "seconds",
+            )
+
+        gauge("migri_migrations_pending", "Pending migrations found.", self.pending)
+        gauge("migri_migrations_applied", "Migrations applied.", self.applied)
+        gauge("migri_migrations_failed", "Migrations that failed.", self.failed)
+        gauge(
+            "migri_lock_wait_seconds",
+            "Time migrations spent waiting on locks.",
+            self.lock_wait_seconds,
+            "seconds",
+        )
+        gauge(
+            "migri_throttled_seconds",
+            "Time spent paused for replication lag.",
+            self.throttled_seconds,
+            "seconds",
+        )
+        gauge(
+            "migri_bookkeeping_seconds",
+            "Time spent on applied_migration bookkeeping queries.",
+            self.bookkeeping_seconds,
+            "seconds",
+        )
+
+        name = "migri_migration_duration_seconds"
+        lines.append(f"# TYPE {name} histogram")
+        lines.append(f"# UNIT {name} seconds")
+        lines.append(f"# HELP {name} Duration of individual migrations.")
+
+        for bucket in DURATION_BUCKETS:
+            count = sum(1 for _, d in self.durations if d <= bucket)
+            lines.append(f'{name}_bucket{{le="{bucket}"}} {count}')
+
+        lines.append(f'{name}_bucket{{le="+Inf"}} {len(self.durations)}')
+        lines.append(f"{name}_count {len(self.durations)}")
+        lines.append(f"{name}_sum {sum(d for _, d in self.durations)}")
+
+        if self.resources:
+            name = "migri_migration_resource_usage"
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"# HELP {name} Database counters changed by migrations.")
+
+            for migration_name, resources in self.resources:
+                for resource, value in sorted(resources.items()):
+                    lines.append(
+                        f'{name}{{migration="{_escape_label_value(migration_name)}",'
+                        f'resource="{_escape_label_value(resource)}"}} {value}'
+                    )
+
+        lines.append("# EOF")
+
+        return "\n".join(lines) + "\n"
+
+    def _write(self, contents: str):
+        # Write next to the target and rename so collectors never read a partial file
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".migri-metrics-")
+
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(contents)
+
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, self.path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+    def _push(self, contents: str):
+        request = urllib.request.Request(
+            self.push_url,
+            data=contents.encode("utf-8"),
+            headers={"Content-Type": OPENMETRICS_CONTENT_TYPE},
+            method="PUT",
+        )
+
+        with urllib.request.urlopen(request, timeout=self.timeout):
+            pass
+
+    async def export(self):
+        contents = self.render()
+
+        if self.path:
+            self._write(contents)
+
+        if self.push_url:
+            loop = asyncio.get_running_loop()
+
+            try:
+                await loop.run_in_executor(None, self._push, contents)
+            except Exception as e:
+                # Metrics shouldn't fail a deploy
+                logger.warning("Unable to push metrics to %s: %s", self.push_url, e)
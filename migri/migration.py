@@ -1,31 +1,132 @@
+import asyncio
 import glob
+import importlib.abc
 import importlib.util
+import io
 import itertools
 import logging
 import os
+import re
+import sys
+import time
 from contextlib import asynccontextmanager
-from dataclasses import dataclass
+from dataclasses import dataclass, field, replace
 from datetime import datetime, timezone
 from enum import Enum
-from inspect import iscoroutinefunction
+from importlib.machinery import ModuleSpec
+from inspect import iscoroutinefunction, signature
 from pathlib import Path
-from typing import AsyncGenerator, Iterable, List, Optional, Union
-
-import sqlparse
+from types import CodeType, ModuleType
+from typing import (
+    Any,
+    AsyncGenerator,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    TextIO,
+    Tuple,
+    Union,
+)
 
+from migri.accounting import (
+    ResourceAccounting,
+    create_resource_accounting,
+    format_resources,
+)
+from migri.analyze import create_table_analyzer
+from migri.bundle import Bundle, is_bundle, read_bundle
+from migri.checksums import hash_file
+from migri.coalesce import COALESCE_DIALECTS, coalesce_alters
+from migri.compression import COMPRESSED_EXTENSIONS, compression_of, open_text
+from migri.directives import (
+    iter_blocks,
+    parse_data_directives,
+    parse_module_directives,
+    parse_sql_directives,
+    split_parallel_groups,
+)
 from migri.elements import Query
-from migri.interfaces import Task
+from migri.interfaces import ConnectionBackend, Task
+from migri.load import DATA_FILE_EXTENSIONS, create_bulk_loader
+from migri.metrics import MetricsRecorder
+from migri.osc import DEFAULT_CHUNK_SIZE, create_online_schema_change, parse_alterations
+from migri.session import SessionSettings, create_session_settings, parse_settings
+from migri.statements import split_statements, target_table
+from migri.throttle import Throttle
+from migri.tracing import Tracer
+from migri.watchdog import LockWatchdog
 
 __all__ = ["Initialize", "Migrate"]
 logger = logging.getLogger(__name__)
 
 MIGRATION_TABLE_NAME = "applied_migration"
+STATEMENT_ATTRIBUTE_LENGTH = 1000
+# Statements outside of a transaction are committed without asking
+AUTOCOMMIT_DIALECTS = {"postgresql"}
 APPLICATION_SQL_PATH = Path(os.path.dirname(__file__), "sql")
 APPLIED_MIGRATION_SQL_FILE = {
     "mysql": "mysql_applied_migration.sql",
     "postgresql": "default_applied_migration.sql",
     "sqlite": "default_applied_migration.sql",
 }
+APPLIED_MIGRATION_COLUMNS_QUERY = {
+    "mysql": (
+        "SELECT column_name AS name FROM information_schema.columns "
+        f"WHERE table_schema = DATABASE() AND table_name = '{MIGRATION_TABLE_NAME}'"
+    ),
+    "postgresql": (
+        "SELECT column_name AS name FROM information_schema.columns "
+        "WHERE table_schema = current_schema() "
+        f"AND table_name = '{MIGRATION_TABLE_NAME}'"
+    ),
+    "sqlite": f"SELECT name FROM pragma_table_info('{MIGRATION_TABLE_NAME}')",
+}
+DURATION_COLUMN_TYPE = {
+    "mysql": "double",
+    "postgresql": "double precision",
+    "sqlite": "real",
+}
+# Version of migri's own bookkeeping schema, bump it when adding an upgrade step
+SCHEMA_VERSION = 4
+SCHEMA_VERSION_TABLE_NAME = "migri_schema_version"
+TABLE_EXISTS_QUERY = {
+    "mysql": (
+        "SELECT 1 FROM information_schema.tables "
+        "WHERE table_schema = DATABASE() AND table_name = $table"
+    ),
+    "postgresql": (
+        "SELECT 1 FROM information_schema.tables "
+        "WHERE table_schema = current_schema() AND table_name = $table"
+    ),
+    "sqlite": "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = $table",
+}
+INDEX_EXISTS_QUERY = {
+    "mysql": (
+        "SELECT 1 FROM information_schema.statistics "
+        "WHERE table_schema = DATABASE() AND index_name = $index"
+    ),
+    "postgresql": (
+        "SELECT 1 FROM pg_indexes "
+        "WHERE schemaname = current_schema() AND indexname = $index"
+    ),
+    "sqlite": "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = $index",
+}
+# Longest migration name that can be indexed with MySQL
+MAX_NAME_LENGTH = 255
+
+
+# Options of a parallel group (None for sequential statements) and its statements
+Block = Tuple[Optional[Dict[str, str]], List[str]]
+
+
+def split_blocks(contents: str) -> List[Block]:
+    return [
+        (options, split_statements(sql))
+        for options, sql in split_parallel_groups(contents)
+    ]
 
 
 @dataclass
@@ -36,7 +137,187 @@ class Migration:
 
     def __post_init__(self):
         name = os.path.basename(self.abspath)
+        # e.g. 0002_seed.sql.gz is a .sql migration compressed with gzip
+        self.compression = compression_of(name)
+
+        if self.compression:
+            name = name[: -len(self.compression)]
+
         self.name, self.file_ext = os.path.splitext(name)
+        self._checksum = None
+        self._directives = None
+
+    def open(self) -> TextIO:
+        """Open the migration file for reading text, decompressing it if needed"""
+        return open_text(self.abspath)
+
+    def read(self) -> str:
+        with self.open() as f:
+            return f.read()
+
+    @property
+    def blocks(self) -> Iterable[Block]:
+        """Statements of a SQL migration, split into sequential blocks and parallel
+        groups. Compressed migrations are decompressed and split as the blocks are
+        iterated over.
+        """
+        if self.compression:
+            return self._stream_blocks()
+
+        return split_blocks(self.read())
+
+    def _stream_blocks(self) -> Iterator[Block]:
+        with self.open() as f:
+            yield from iter_blocks(f)
+
+    @property
+    def statements(self) -> Iterable[str]:
+        return (s for _, statements in self.blocks for s in statements)
+
+    def module_spec(self, name: str) -> ModuleSpec:
+        """Spec to load a Python migration as module `name` with"""
+        return importlib.util.spec_from_file_location(name, self.abspath)
+
+    @property
+    def checksum(self) -> str:
+        """SHA-256 of the migration file, recorded when the migration is applied"""
+        if self._checksum is None:
+            self._checksum = hash_file(self.abspath)
+
+        return self._checksum
+
+    @property
+    def directives(self) -> Dict[str, Any]:
+        """Directives from a SQL migration's comment header, or the upper case
+        module level constants of a Python migration. Read on first access.
+        """
+        if self._directives is None:
+            with self.open() as f:
+                if self.file_ext == ".py":
+                    self._directives = parse_module_directives(f.read())
+                elif self.file_ext in DATA_FILE_EXTENSIONS:
+                    self._directives = parse_data_directives(f)
+                else:
+                    self._directives = parse_sql_directives(f)
+
+        return self._directives
+
+    @property
+    def load_options(self) -> Dict[str, str]:
+        """Table and format of a data migration, declared with
+        `# migri:load table=name [delimiter=;] [null=\\N]`
+        """
+        options = self.directives.get("load", {})
+
+        if not options.get("table"):
+            raise ValueError("Expected # migri:load table=... in data migration")
+
+        delimiter = options.get("delimiter", DATA_FILE_EXTENSIONS[self.file_ext])
+
+        return {
+            "table": options["table"],
+            # e.g. delimiter=\t, as a literal tab can't be given as an option
+            "delimiter": delimiter.encode().decode("unicode_escape"),
+            "null": options.get("null", ""),
+        }
+
+    @property
+    def transactional(self) -> bool:
+        """Whether the migration is applied in a transaction, opt out with
+        `-- migri:no-transaction` or `TRANSACTION = False`
+        """
+        if self.file_ext == ".py":
+            return self.directives.get("TRANSACTION", True) is not False
+
+        return not {"no-transaction", "online"} & set(self.directives)
+
+    @property
+    def session_settings(self) -> Dict[str, str]:
+        """Session settings to apply while the migration runs, declared with
+        `-- migri:set name=value ...` or `SESSION_SETTINGS = {...}`
+        """
+        if self.file_ext == ".py":
+            return parse_settings(self.directives.get("SESSION_SETTINGS", {}))
+
+        return parse_settings(self.directives.get("set", {}))
+
+    @property
+    def analyze_tables(self) -> List[str]:
+        """Tables to refresh statistics of after the migration, the tables written
+        to or altered by a SQL migration's statements, the table a data migration
+        loads into, or `ANALYZE_TABLES = [...]`
+        """
+        if self.file_ext == ".py":
+            tables = self.directives.get("ANALYZE_TABLES", [])
+
+            if not isinstance(tables, (list, tuple)):
+                raise ValueError("Expected ANALYZE_TABLES to be a list")
+
+            return [str(t) for t in tables]
+
+        if self.file_ext in DATA_FILE_EXTENSIONS:
+            return [self.load_options["table"]]
+
+        tables = (target_table(s) for s in self.statements)
+
+        return list(dict.fromkeys(t for t in tables if t))
+
+
+class _CodeLoader(importlib.abc.Loader):
+    def __init__(self, code: CodeType):
+        self.code = code
+
+    def create_module(self, spec: ModuleSpec):
+        return None
+
+    def exec_module(self, module: ModuleType):
+        exec(self.code, module.__dict__)
+
+    def get_code(self, fullname: str) -> CodeType:
+        return self.code
+
+
+@dataclass
+class BundledMigration(Migration):
+    """Migration read from a bundle (see `migri.bundle`) instead of a file"""
+
+    bundle: Optional[Bundle] = None
+    entry: Dict[str, Any] = field(default_factory=dict)
+
+    def open(self) -> TextIO:
+        # Python and data migrations are stored as they are
+        return io.StringIO(self.bundle.read(f"{self.name}{self.file_ext}").decode())
+
+    def read(self) -> str:
+        if self.file_ext == ".sql":
+            return "\n".join(self.statements)
+
+        return super().read()
+
+    @property
+    def blocks(self) -> List[Block]:
+        return self.bundle.blocks(self.entry)
+
+    def module_spec(self, name: str) -> ModuleSpec:
+        # Without a location, so migri.transform workers load the module from its
+        # code rather than a file that doesn't exist
+        return importlib.util.spec_from_loader(
+            name, _CodeLoader(self.bundle.code(self.entry))
+        )
+
+    @property
+    def checksum(self) -> str:
+        return self.entry["checksum"]
+
+    @property
+    def directives(self) -> Dict[str, Any]:
+        if self._directives is None:
+            if self.file_ext == ".py":
+                self._directives = parse_module_directives(self.read())
+            else:
+                self._directives = self.entry.get("directives", {})
+
+        return self._directives
 
 
 class MigrationStatus(Enum):
@@ -49,6 +330,28 @@ class MigrationResult:
     migration_name: str
     message: str
     status: MigrationStatus
+    duration: Optional[float] = None
+    # Database counters the migration changed, see migri.accounting
+    resources: Optional[Dict[str, int]] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "migration": self.migration_name,
+            "status": self.status.value,
+            "message": self.message,
+            "duration": self.duration,
+            "resources": self.resources,
+        }
+
+
+def statement_tag(migration_name: str) -> str:
+    """SQL comment prepended to statements of a migration, so the database's own
+    statistics (pg_stat_activity, performance_schema, slow query logs) can be
+    attributed to it
+    """
+    # Nothing that could end the comment early
+    name = re.sub(r"[^\w.-]", "_", migration_name)
+    return f"/* migri:{name} */ "
 
 
 class MigrationFailed(Exception):
@@ -60,7 +363,11 @@ class MigrationOk(Exception):
 
 
 class MigrationFilesMixin(object):
-    MIGRATION_FILE_EXTENSIONS = ["py", "sql"]
+    MIGRATION_FILE_EXTENSIONS = ["py"] + [
+        f"{file_ext[1:]}{ext}"
+        for file_ext in [".sql", *DATA_FILE_EXTENSIONS]
+        for ext in ["", *COMPRESSED_EXTENSIONS]
+    ]
 
     def _find_migrations(self, migrations_path: str) -> Iterable[str]:
         return itertools.chain(
@@ -71,6 +378,18 @@ class MigrationFilesMixin(object):
         )
 
     def get_migrations(self, migrations_dir: str) -> List[Migration]:
+        if is_bundle(migrations_dir):
+            bundle = read_bundle(migrations_dir)
+
+            return [
+                BundledMigration(
+                    abspath=f"{bundle.source}/{e['name']}{e['file_ext']}",
+                    bundle=bundle,
+                    entry=e,
+                )
+                for e in bundle.entries
+            ]
+
         path = os.path.abspath(migrations_dir)
 
         if not os.path.isdir(path):
@@ -79,85 +398,561 @@ class MigrationFilesMixin(object):
         return [Migration(abspath=p) for p in sorted(self._find_migrations(path))]
 
 
+class MigrationPendingMixin(object):
+    async def _migrations_to_apply(
+        self, migrations: List[Migration]
+    ) -> List[Migration]:
+        """Takes migration paths and uses migration file names to search for entries in
+        'applied_migration' table
+        """
+        start = time.perf_counter()
+        exists = await self._connection.fetch_all(
+            Query(
+                TABLE_EXISTS_QUERY[self._connection.dialect],
+                values={"table": MIGRATION_TABLE_NAME},
+            )
+        )
+
+        # Nothing was ever applied, e.g. a read-only task on a new database
+        if not exists:
+            self.metrics.observe_bookkeeping(time.perf_counter() - start)
+            return migrations
+
+        applied = await self._connection.fetch_all(
+            Query(f"SELECT name FROM {MIGRATION_TABLE_NAME}")
+        )
+        applied_names = {a["name"] for a in applied}
+        to_apply = [m for m in migrations if m.name not in applied_names]
+
+        self.metrics.observe_bookkeeping(time.perf_counter() - start)
+
+        return to_apply
+
+
 class MigrationApplyMixin(object):
-    async def _apply_migration_from_module(self, path: str) -> bool:
-        spec = importlib.util.spec_from_file_location("migration", path)
+    # Whether consecutive ALTER TABLE statements are combined, see migri.coalesce
+    _coalesce_alters = False
+    # Whether statements are prefixed with the migration's name, see statement_tag
+    _tag_statements = False
+
+    def __init__(self, *args, watchdog: Optional[LockWatchdog] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Session settings of the migration being applied, also used on the extra
+        # connections of parallel groups
+        self._migration_settings: Dict[str, str] = {}
+        # Also watches the extra connections of parallel groups
+        self.watchdog = watchdog or LockWatchdog()
+
+    def _migrate_kwargs(self, migrate_func: Callable) -> Dict[str, Any]:
+        """Keyword arguments migrate() opted into by naming them in its signature,
+        e.g. `async def migrate(conn, backend)`
+        """
+        available = {"backend": self._connection, "throttle": self.throttle}
+        parameters = signature(migrate_func).parameters
+
+        return {k: v for k, v in available.items() if k in parameters}
+
+    def _session_settings(
+        self,
+        connection: ConnectionBackend,
+        settings: Dict[str, str],
+        local: bool = False,
+    ) -> SessionSettings:
+        return create_session_settings(connection, settings, local)
+
+    async def _apply_migration_from_module(self, migration: Migration) -> bool:
+        # Registered under a unique name so its functions can be found by name,
+        # e.g. by worker processes of migri.transform
+        name = "migri_migration_" + re.sub(r"\W", "_", migration.name)
+        spec = migration.module_spec(name)
         module = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(module)
+        sys.modules[name] = module
+
+        try:
+            spec.loader.exec_module(module)
+        except BaseException:
+            del sys.modules[name]
+            raise
+
         migrate_func = getattr(module, "migrate", None)
 
         if not migrate_func:
             raise ImportError("module missing migrate()")
         else:
             if iscoroutinefunction(migrate_func):
-                return await migrate_func(self._connection.database)
+                return await migrate_func(
+                    self._connection.database, **self._migrate_kwargs(migrate_func)
+                )
             else:
                 raise RuntimeError("migrate() expected to be an async function")
 
-    async def _apply_migration_from_sql_file(self, path: str) -> bool:
+    async def _execute_parallel(
+        self, statements: List[str], first: int, jobs: int, tag: str = ""
+    ):
+        """Execute statements concurrently on up to `jobs` new connections"""
+        connections = [
+            self._connection.spawn() for _ in range(min(jobs, len(statements)))
+        ]
+        available = asyncio.Queue()
+
+        for connection in connections:
+            await connection.connect()
+            # Discarded afterwards, so there's nothing to restore
+            await self._session_settings(connection, self._migration_settings).apply()
+            await self.watchdog.add(connection)
+            available.put_nowait(connection)
+
+        async def execute(number: int, statement: str):
+            connection = await available.get()
+
+            try:
+                with self.tracer.span(
+                    "migri.statement",
+                    statement_number=number,
+                    statement=statement[:STATEMENT_ATTRIBUTE_LENGTH],
+                    parallel=True,
+                ):
+                    start = time.perf_counter()
+                    await connection.execute(Query(f"{tag}{statement}"))
+
+                    if connection.dialect not in AUTOCOMMIT_DIALECTS:
+                        await connection.transaction().commit()
+
+                logger.info(
+                    "Statement %s took %.1fs", number, time.perf_counter() - start
+                )
+            finally:
+                available.put_nowait(connection)
+
+        try:
+            results = await asyncio.gather(
+                *(execute(n, s) for n, s in enumerate(statements, start=first)),
+                return_exceptions=True,
+            )
+        finally:
+            for connection in connections:
+                self.watchdog.remove(connection)
+                await connection.disconnect()
+
+        errors = [
+            f"statement {n}: {r}"
+            for n, r in enumerate(results, start=first)
+            if isinstance(r, BaseException)
+        ]
+
+        if errors:
+            raise MigrationFailed(f"parallel group failed ({'; '.join(errors)})")
+
+    def _coalesce_blocks(self, name: str, blocks: Iterable[Block]) -> Iterator[Block]:
+        number = 1
+
+        for options, statements in blocks:
+            # Statements of parallel groups are independent of each other already
+            if options is None:
+                rewritten, rewrites = coalesce_alters(statements, number)
+
+                for rewrite in rewrites:
+                    logger.info("%s: %s: %s", name, rewrite, rewrite.sql)
+                    self.echo.info(f"{name}: {rewrite}")
+            else:
+                rewritten = statements
+
+            yield options, rewritten
+            number += len(statements)
+
+    async def _apply_migration_from_sql_file(
+        self, path: str, transactional: bool = True
+    ) -> bool:
         with open(path, "r") as f:
-            contents = f.read()
-            statements = [s for s in sqlparse.split(contents) if s != ""]
+            blocks = split_blocks(f.read())
+
+        return await self._apply_sql_blocks(Path(path).stem, blocks, transactional)
+
+    async def _execute_block(
+        self,
+        options: Optional[Dict[str, str]],
+        statements: List[str],
+        number: int,
+        tag: str,
+    ):
+        if options is not None:
+            jobs = int(options.get("jobs", len(statements)))
+            await self._execute_parallel(statements, number, jobs, tag)
+            return
+
+        for statement in statements:
+            with self.tracer.span(
+                "migri.statement",
+                statement_number=number,
+                statement=statement[:STATEMENT_ATTRIBUTE_LENGTH],
+            ):
+                await self._connection.execute(Query(f"{tag}{statement}"))
+
+            number += 1
 
-        if not statements:
+    async def _apply_sql_blocks(
+        self, name: str, blocks: Iterable[Block], transactional: bool = True
+    ) -> bool:
+        """Execute blocks of statements as they are read, so streamed migrations
+        are never held in memory as a whole
+        """
+        if self._coalesce_alters and self._connection.dialect in COALESCE_DIALECTS:
+            blocks = self._coalesce_blocks(name, blocks)
+
+        number = 1
+        tag = statement_tag(name) if self._tag_statements else ""
+
+        for options, statements in blocks:
+            if transactional and options is not None:
+                raise ValueError("parallel groups require -- migri:no-transaction")
+
+            try:
+                await self._execute_block(options, statements, number, tag)
+            except MigrationFailed:
+                raise
+            except Exception as e:
+                logger.warning("Error running migration %s: %s", name, e)
+                raise MigrationFailed from e
+
+            number += len(statements)
+
+        if number == 1:
             raise ValueError("empty migration")
 
+        return True
+
+    async def _apply_online_migration(self, migration: Migration) -> bool:
+        alterations = parse_alterations(migration.statements)
+
+        options = migration.directives["online"]
+
+        try:
+            await create_online_schema_change(
+                self._connection,
+                alterations["table"],
+                alterations["alterations"],
+                chunk_size=int(options.get("chunk_size", DEFAULT_CHUNK_SIZE)),
+                throttle=float(options.get("throttle", 0)),
+                drop_old=options.get("drop_old", "false").lower() == "true",
+                lag_throttle=self.throttle,
+            ).run()
+        except Exception as e:
+            logger.warning("Error running migration %s: %s", migration.abspath, e)
+            raise MigrationFailed from e
+
+        return True
+
+    async def _load_data(self, migration: Migration) -> bool:
+        options = migration.load_options
+        loader = create_bulk_loader(self._connection)
+
         try:
-            for statement in statements:
-                await self._connection.execute(Query(statement))
+            with migration.open() as f:
+                rows = await loader.load(f, **options)
         except Exception as e:
-            logger.warning("Error running migration %s: %s", path, e)
+            logger.warning("Error running migration %s: %s", migration.name, e)
             raise MigrationFailed from e
 
+        logger.info(
+            "%s: loaded %d rows into %s", migration.name, rows, options["table"]
+        )
+
         return True
 
     async def apply_migration(self, migration: Migration) -> bool:
         if migration.file_ext == ".py":
-            return await self._apply_migration_from_module(migration.abspath)
+            return await self._apply_migration_from_module(migration)
+        elif migration.file_ext == ".sql" and "online" in migration.directives:
+            return await self._apply_online_migration(migration)
         elif migration.file_ext == ".sql":
-            return await self._apply_migration_from_sql_file(migration.abspath)
+            return await self._apply_sql_blocks(
+                migration.name, migration.blocks, migration.transactional
+            )
+        elif migration.file_ext in DATA_FILE_EXTENSIONS:
+            return await self._load_data(migration)
 
         return False
 
 
 class Initialize(MigrationApplyMixin, Task):
-    async def run(self):
-        """Create 'applied_migration' table"""
-        transaction = self._connection.transaction()
-        migration_file = APPLIED_MIGRATION_SQL_FILE[self._connection.dialect]
+    async def _add_column(self, name: str, column_type: str):
+        # Tables created before the schema was versioned may already have it
+        columns = await self._connection.fetch_all(
+            Query(APPLIED_MIGRATION_COLUMNS_QUERY[self._connection.dialect])
+        )
+
+        if name not in {c["name"] for c in columns}:
+            await self._connection.execute(
+                Query(
+                    f"ALTER TABLE {MIGRATION_TABLE_NAME} "
+                    f"ADD COLUMN {name} {column_type}"
+                )
+            )
+
+    async def _check_name_length(self):
+        too_long = await self._connection.fetch_all(
+            Query(
+                f"SELECT name FROM {MIGRATION_TABLE_NAME} "
+                f"WHERE CHAR_LENGTH(name) > {MAX_NAME_LENGTH}"
+            )
+        )
+
+        if too_long:
+            raise RuntimeError(
+                f"Can't upgrade {MIGRATION_TABLE_NAME}, migration names are limited "
+                f"to {MAX_NAME_LENGTH} characters: "
+                f"{', '.join(r['name'] for r in too_long)}. Rename these migrations "
+                f"and their rows in {MIGRATION_TABLE_NAME}, then run migri again"
+            )
+
+    async def _deduplicate_names(self):
+        """Remove rows recording a migration that's already recorded (e.g. by runs
+        that raced before names were unique), keeping the first one
+        """
+        duplicates = await self._connection.fetch_all(
+            Query(
+                f"SELECT name FROM {MIGRATION_TABLE_NAME} "
+                f"GROUP BY name HAVING COUNT(*) > 1"
+            )
+        )
+
+        if not duplicates:
+            return
 
-        async with transaction:
+        logger.warning(
+            "Removing duplicate rows of %s from %s",
+            ", ".join(d["name"] for d in duplicates),
+            MIGRATION_TABLE_NAME,
+        )
+        # MySQL can't select from the table it deletes from, except in a derived table
+        await self._connection.execute(
+            Query(
+                f"DELETE FROM {MIGRATION_TABLE_NAME} WHERE id NOT IN ("
+                f"SELECT id FROM (SELECT MIN(id) AS id FROM {MIGRATION_TABLE_NAME} "
+                f"GROUP BY name) AS first_applied)"
+            )
+        )
+
+    async def _index_exists(self, name: str) -> bool:
+        exists = await self._connection.fetch_all(
+            Query(INDEX_EXISTS_QUERY[self._connection.dialect], values={"index": name})
+        )
+
+        return bool(exists)
+
+    async def _schema_version(self) -> int:
+        exists = await self._connection.fetch_all(
+            Query(
+                TABLE_EXISTS_QUERY[self._connection.dialect],
+                values={"table": SCHEMA_VERSION_TABLE_NAME},
+            )
+        )
+
+        if not exists:
+            return 0
+
+        versions = await self._connection.fetch_all(
+            Query(f"SELECT version FROM {SCHEMA_VERSION_TABLE_NAME}")
+        )
+
+        return max((v["version"] for v in versions), default=0)
+
+    async def _upgrade(self, version: int):
+        """Upgrade the bookkeeping schema from `version` to `SCHEMA_VERSION`"""
+        dialect = self._connection.dialect
+
+        if version < 1:
             await self._apply_migration_from_sql_file(
-                APPLICATION_SQL_PATH / migration_file
+                APPLICATION_SQL_PATH / APPLIED_MIGRATION_SQL_FILE[dialect]
+            )
+            await self._connection.execute(
+                Query(
+                    f"CREATE TABLE IF NOT EXISTS {SCHEMA_VERSION_TABLE_NAME} "
+                    f"(version integer NOT NULL)"
+                )
+            )
+        if version < 2:
+            await self._add_column("checksum", "varchar(64)")
+        if version < 3:
+            await self._add_column("duration", DURATION_COLUMN_TYPE[dialect])
+        if version < 4:
+            await self._deduplicate_names()
+
+            if dialect == "mysql":
+                await self._check_name_length()
+                # text columns can only be indexed by prefix
+                await self._connection.execute(
+                    Query(
+                        f"ALTER TABLE {MIGRATION_TABLE_NAME} "
+                        f"MODIFY name varchar({MAX_NAME_LENGTH}) NOT NULL"
+                    )
+                )
+
+            # DDL commits implicitly with MySQL, an upgrade that failed after it
+            # has already created the index
+            if not await self._index_exists(f"{MIGRATION_TABLE_NAME}_name_idx"):
+                await self._connection.execute(
+                    Query(
+                        f"CREATE UNIQUE INDEX {MIGRATION_TABLE_NAME}_name_idx "
+                        f"ON {MIGRATION_TABLE_NAME} (name)"
+                    )
+                )
+
+        await self._connection.execute(
+            Query(f"DELETE FROM {SCHEMA_VERSION_TABLE_NAME}")
+        )
+        await self._connection.execute(
+            Query(
+                f"INSERT INTO {SCHEMA_VERSION_TABLE_NAME} (version) VALUES ($version)",
+                values={"version": SCHEMA_VERSION},
+            )
+        )
+
+    async def check(self):
+        """Check the bookkeeping schema without changing it, for tasks that only read
+        the database. A missing 'applied_migration' table is fine, nothing was
+        applied yet, but an outdated one must be upgraded by applying migrations.
+        """
+        version = await self._schema_version()
+
+        if version >= SCHEMA_VERSION:
+            return
+
+        # Tables created before the schema was versioned have no version
+        exists = await self._connection.fetch_all(
+            Query(
+                TABLE_EXISTS_QUERY[self._connection.dialect],
+                values={"table": MIGRATION_TABLE_NAME},
+            )
+        )
+
+        if exists:
+            raise RuntimeError(
+                f"Bookkeeping schema is at version {version}, apply migrations "
+                f"(e.g. `migri migrate`) to upgrade it to {SCHEMA_VERSION} first"
             )
-            await transaction.commit()
 
+    async def run(self):
+        """Create or upgrade the 'applied_migration' table, nothing is executed when
+        the bookkeeping schema is current
+        """
+        start = time.perf_counter()
+
+        with self.tracer.span("migri.initialize"):
+            version = await self._schema_version()
+
+            if version < SCHEMA_VERSION:
+                logger.info("Upgrading bookkeeping schema to %s", SCHEMA_VERSION)
+                transaction = self._connection.transaction()
+
+                async with transaction:
+                    await self._upgrade(version)
+                    await transaction.commit()
+
+        self.metrics.observe_bookkeeping(time.perf_counter() - start)
+
+
+class Migrate(MigrationApplyMixin, MigrationFilesMixin, MigrationPendingMixin, Task):
+    """
+    :param session_settings: Session settings to apply while each migration runs,
+        settings declared by a migration take precedence
+    :type session_settings: dict, optional
+    :param account_resources: Measure database resources used by each migration,
+        see `migri.accounting`, and tag its SQL statements with its name
+    :type account_resources: bool
+    :param watchdog: Cancels migrations that block other sessions for too long,
+        see `migri.watchdog`
+    :type watchdog: LockWatchdog, optional
+    :param analyze: Refresh statistics of tables touched by applied migrations at
+        the end of the run, see `migri.analyze`
+    :type analyze: bool
+    :param analyze_jobs: Tables to analyze concurrently
+    :type analyze_jobs: int
+    :param coalesce_alters: Combine consecutive ALTER TABLE statements on the same
+        table within a SQL migration, see `migri.coalesce`
+    :type coalesce_alters: bool
+    """
 
-class Migrate(MigrationApplyMixin, MigrationFilesMixin, Task):
     class RollbackTransaction(Exception):
         ...
 
+    def __init__(
+        self,
+        connection: ConnectionBackend,
+        metrics: Optional[MetricsRecorder] = None,
+        tracer: Optional[Tracer] = None,
+        throttle: Optional[Throttle] = None,
+        session_settings: Optional[Dict[str, str]] = None,
+        account_resources: bool = False,
+        watchdog: Optional[LockWatchdog] = None,
+        analyze: bool = False,
+        analyze_jobs: int = 1,
+        coalesce_alters: bool = False,
+    ):
+        super().__init__(connection, metrics, tracer, throttle, watchdog=watchdog)
+        self._coalesce_alters = coalesce_alters
+        # Only worth changing the statements' text when their usage is accounted
+        self._tag_statements = account_resources
+        self.analyzer = (
+            create_table_analyzer(connection, analyze_jobs) if analyze else None
+        )
+        self.session_settings = parse_settings(session_settings or {})
+        self.accounting = (
+            create_resource_accounting(connection)
+            if account_resources
+            else ResourceAccounting(connection)
+        )
+
     async def _apply(self, migration: Migration) -> MigrationResult:
         migration_message = "unknown error"
         status = MigrationStatus.FAILURE
+        start = time.perf_counter()
+        lock_wait = self.watchdog.lock_wait_seconds
 
-        try:
-            # Apply migrations
-            migrate_success = await self.apply_migration(migration)
-        except (ImportError, RuntimeError, ValueError) as e:
-            migration_message = str(e)
-        except Exception as e:
-            logger.exception("Rolled back migration due to an error.")
-            migration_message = str(e)
-        else:
-            # Update migration record
-            if migrate_success:
-                await self._record_migration(migration)
-                migration_message = "ok"
-                status = MigrationStatus.SUCCESS
+        with self.tracer.span("migri.migration", migration=migration.name) as span:
+            try:
+                self._migration_settings = {
+                    **self.session_settings,
+                    **migration.session_settings,
+                }
+
+                async with self._session_settings(
+                    self._connection,
+                    self._migration_settings,
+                    local=migration.transactional,
+                ), self.watchdog.watch():
+                    # Apply migrations
+                    migrate_success = await self.apply_migration(migration)
+            except (ImportError, RuntimeError, ValueError) as e:
+                migration_message = str(e)
+            except Exception as e:
+                logger.exception("Rolled back migration due to an error.")
+                migration_message = str(e)
+            else:
+                # Update migration record
+                if migrate_success:
+                    async with self._optional_transaction(not migration.transactional):
+                        await self._record_migration(
+                            migration, time.perf_counter() - start
+                        )
+
+                    migration_message = "ok"
+                    status = MigrationStatus.SUCCESS
+
+            if span is not None:
+                span.set_attribute("status", status.value)
+
+        duration = time.perf_counter() - start
+        self.metrics.observe_lock_wait(self.watchdog.lock_wait_seconds - lock_wait)
+        self.metrics.observe_migration(
+            migration.name, duration, status == MigrationStatus.SUCCESS
+        )
 
         return MigrationResult(
-            migration_name=migration.name, message=migration_message, status=status
+            migration_name=migration.name,
+            message=migration_message,
+            status=status,
+            duration=duration,
         )
 
     @asynccontextmanager
@@ -194,7 +989,24 @@ class Migrate(MigrationApplyMixin, MigrationFilesMixin, Task):
                         status=MigrationStatus.FAILURE,
                     )
                 else:
-                    async with self._optional_transaction(not dry_run):
+                    try:
+                        await self.throttle.wait(self._connection)
+                    except TimeoutError as e:
+                        logger.error("Gave up waiting for replication lag: %s", e)
+                        migration_failed = True
+                        yield MigrationResult(
+                            migration_name=migration.name,
+                            message="replication lag above --max-lag",
+                            status=MigrationStatus.FAILURE,
+                        )
+                        continue
+
+                    # Taken outside the transaction, some counters only move on commit
+                    before = await self.accounting.snapshot()
+
+                    async with self._optional_transaction(
+                        not dry_run and migration.transactional
+                    ):
                         result = await self._apply(migration)
                         migration_failed = (
                             True if result.status == MigrationStatus.FAILURE else False
@@ -203,6 +1015,13 @@ class Migrate(MigrationApplyMixin, MigrationFilesMixin, Task):
                         if migration_failed:
                             raise self.RollbackTransaction
 
+                    if before:
+                        resources = self.accounting.usage(
+                            before, await self.accounting.snapshot()
+                        )
+                        result = replace(result, resources=resources)
+                        self.metrics.observe_resources(migration.name, resources)
+
                     yield result
 
             raise self.RollbackTransaction
@@ -210,59 +1029,76 @@ class Migrate(MigrationApplyMixin, MigrationFilesMixin, Task):
         if dry_run:
             self.echo.info("Successfully applied migrations in dry run mode.")
 
-    async def _migrations_to_apply(
-        self, migrations: List[Migration]
-    ) -> List[Migration]:
-        """Takes migration paths and uses migration file names to search for entries in
-        'applied_migration' table
-        """
-        to_apply = []
-
-        for migration in migrations:
-            query = Query(
-                f"SELECT id FROM {MIGRATION_TABLE_NAME} WHERE name = $migration_name",
-                values={"migration_name": migration.name},
-            )
-            applied_migration = await self._connection.fetch_all(query)
-
-            if not applied_migration:
-                to_apply.append(migration)
-
-        return to_apply
-
-    async def _record_migration(self, migration: Migration):
+    async def _record_migration(self, migration: Migration, duration: float):
+        start = time.perf_counter()
         query = Query(
-            f"INSERT INTO {MIGRATION_TABLE_NAME} (date_applied, name) "
-            f"VALUES ($date, $migration_name)",
+            f"INSERT INTO {MIGRATION_TABLE_NAME} "
+            f"(date_applied, name, checksum, duration) "
+            f"VALUES ($date, $migration_name, $checksum, $duration)",
             values={
                 "date": datetime.now(tz=timezone.utc),
                 "migration_name": migration.name,
+                "checksum": migration.checksum,
+                "duration": duration,
             },
         )
 
         await self._connection.execute(query)
+        self.metrics.observe_bookkeeping(time.perf_counter() - start)
+
+    async def _analyze(
+        self, migrations: List[Migration], results: List[MigrationResult]
+    ):
+        tables = [
+            table
+            for migration, result in zip(migrations, results)
+            if result.status == MigrationStatus.SUCCESS
+            for table in migration.analyze_tables
+        ]
+
+        if not tables:
+            return
+
+        start = time.perf_counter()
+
+        with self.tracer.span("migri.analyze", tables=len(set(tables))):
+            analyzed = await self.analyzer.run(tables)
+
+        failed = [a.table for a in analyzed if a.error]
+        message = f"Analyzed {len(analyzed) - len(failed)} tables"
+
+        if failed:
+            message += f" ({len(failed)} failed: {', '.join(failed)})"
+
+        self.echo.info(f"{message} in {time.perf_counter() - start:.1f}s")
 
     async def run(
         self,
         migrations_dir: str,
         dry_run: Optional[bool] = False,
-    ):
+    ) -> List[MigrationResult]:
         # Check if trying to run dry run mode w/ sqlite or mysql
         # Not currently supported due to a transaction issue
         if self._connection.dialect == "sqlite" and dry_run:
             self.echo.error("Dry run mode is not currently supported with SQLite.")
-            return
+            return []
         if self._connection.dialect == "mysql" and dry_run:
             self.echo.error("Dry run mode is not supported with MySQL.")
-            return
+            return []
 
-        migrations = self.get_migrations(migrations_dir)
+        with self.tracer.span("migri.discover"):
+            migrations = self.get_migrations(migrations_dir)
 
         if not migrations:
             self.echo.info("No migrations to apply. Migrations directory is empty.")
-            return
+            return []
+
+        with self.tracer.span("migri.pending"):
+            migrations = await self._migrations_to_apply(migrations)
 
-        migrations = await self._migrations_to_apply(migrations)
+        self.metrics.set_pending(len(migrations))
+        await self.accounting.prepare()
+        results = []
 
         # Check if there are migrations to apply
         # If so, apply them
@@ -270,14 +1106,35 @@ class Migrate(MigrationApplyMixin, MigrationFilesMixin, Task):
             self.echo.info("All synced! No new migrations to apply! 🥳")
         else:
             self.echo.info("Applying migrations")
+            await self.metrics.progress()
+            await self.watchdog.start(self._connection)
 
-            async for result in self._apply_migrations(migrations, dry_run):
-                message = (
-                    f" [{result.message}]"
-                    if result.status == MigrationStatus.FAILURE
-                    else ""
-                )
+            try:
+                async for result in self._apply_migrations(migrations, dry_run):
+                    results.append(result)
+                    message = (
+                        f" [{result.message}]"
+                        if result.status == MigrationStatus.FAILURE
+                        else ""
+                    )
+
+                    self.echo.info(
+                        f"{result.migration_name}...{result.status.value}{message}"
+                        f"{format_resources(result.resources)}"
+                    )
+                    self.metrics.observe_throttle(self.throttle.throttled_seconds)
+                    await self.metrics.progress()
+            finally:
+                await self.watchdog.stop()
 
+            if self.analyzer and not dry_run:
+                await self._analyze(migrations, results)
+
+            if self.throttle.throttled_seconds:
                 self.echo.info(
-                    f"{result.migration_name}...{result.status.value}{message}"
+                    f"Paused {self.throttle.throttled_seconds:.1f}s for replication lag"
                 )
+
+        self.metrics.observe_throttle(self.throttle.throttled_seconds)
+
+        return results
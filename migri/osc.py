@@ -0,0 +1,708 @@
+import asyncio
+import logging
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from migri.elements import Query
+from migri.interfaces import ConnectionBackend
+from migri.statements import normalize, target_table
+from migri.throttle import Throttle
+
+__all__ = [
+    "MySQLOnlineSchemaChange",
+    "OnlineSchemaChange",
+    "PostgreSQLOnlineSchemaChange",
+    "create_online_schema_change",
+    "parse_alterations",
+]
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_TABLE_NAME = "migri_online_schema_change"
+DEFAULT_CHUNK_SIZE = 1000
+# PostgreSQL truncates longer names
+MAX_IDENTIFIER_LENGTH = 63
+# e.g. CREATE UNIQUE INDEX account_pkey ON public.account USING btree (id)
+INDEX_NAME_PATTERN = re.compile(
+    r'^(CREATE (?:UNIQUE )?INDEX) (?:"(?:[^"]|"")*"|\S+) ON (?:ONLY )?\S+'
+)
+
+STATE_COPYING = "copying"
+
+
+def parse_alterations(statements: List[str]) -> Dict[str, Any]:
+    """Take ALTER TABLE statements for a single table and return the table name and
+    the alterations (everything after the table name) of each statement
+    """
+    table = None
+    alterations = []
+
+    for statement in statements:
+        statement = normalize(statement).rstrip(";").strip()
+        match = re.match(
+            r"^ALTER\s+TABLE\s+[\"`]?(\w+)[\"`]?\s+(.+)$",
+            statement,
+            re.IGNORECASE | re.DOTALL,
+        )
+
+        if not match or (table and target_table(statement) != table):
+            raise RuntimeError(
+                "Online schema change migrations may only contain ALTER TABLE "
+                "statements for a single table"
+            )
+
+        table = target_table(statement)
+        alterations.append(match.group(2))
+
+    if not table:
+        raise ValueError("empty migration")
+
+    return {"table": table, "alterations": alterations}
+
+
+@dataclass
+class OnlineSchemaChange:
+    """Alter a large table without locking it for the duration of the change:
+
+    1. create a shadow table like the table and apply the alterations to it
+    2. keep the shadow table in sync with triggers
+    3. copy rows in primary key order in chunks, each chunk in its own transaction
+       and recorded as a checkpoint so an interrupted copy resumes where it stopped
+    4. swap the tables atomically, the original is kept as `_<table>_old` unless
+       `drop_old` is set. It has to be dropped before the table is altered online
+       again.
+
+    Tables need a single column primary key and can't be referenced by foreign
+    keys. Columns can be added, dropped and changed but not renamed.
+
+    :param connection: Connected backend
+    :type connection: ConnectionBackend
+    :param table: Table to alter
+    :type table: str
+    :param alterations: Alterations, e.g. ["ADD COLUMN zone text"]
+    :type alterations: list
+    :param chunk_size: Rows copied per chunk
+    :type chunk_size: int
+    :param throttle: Seconds to sleep between chunks
+    :type throttle: float
+    :param drop_old: Drop the original table after the swap
+    :type drop_old: bool
+    :param lag_throttle: Checked before each chunk, e.g. to wait for replicas
+    :type lag_throttle: Throttle
+    """
+
+    connection: ConnectionBackend
+    table: str
+    alterations: List[str]
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+    throttle: float = 0.0
+    drop_old: bool = False
+    lag_throttle: Throttle = field(default_factory=Throttle)
+
+    def __post_init__(self):
+        if not re.match(r"^\w+$", self.table):
+            raise ValueError(f"Invalid table name: {self.table}")
+
+    @property
+    def old_table(self) -> str:
+        return f"_{self.table}_old"
+
+    @property
+    def shadow_table(self) -> str:
+        return f"_{self.table}_new"
+
+    @staticmethod
+    def quote(identifier: str) -> str:
+        raise NotImplementedError
+
+    async def _columns(self, table: str) -> List[str]:
+        raise NotImplementedError
+
+    async def _create_shadow_table(self):
+        raise NotImplementedError
+
+    async def _create_triggers(self, columns: List[str], key: str):
+        raise NotImplementedError
+
+    def _key_condition(self, key: str, operator: str, placeholder: str) -> str:
+        return f"{self.quote(key)} {operator} {placeholder}"
+
+    async def _primary_key(self) -> str:
+        raise NotImplementedError
+
+    async def _referenced_by_foreign_keys(self) -> bool:
+        raise NotImplementedError
+
+    async def _swap(self, key: str):
+        raise NotImplementedError
+
+    async def _table_exists(self, table: str) -> bool:
+        return bool(await self._columns(table))
+
+    async def _execute_in_transaction(self, *queries: Query):
+        transaction = self.connection.transaction()
+
+        async with transaction:
+            for query in queries:
+                await self.connection.execute(query)
+
+            await transaction.commit()
+
+    async def _load_checkpoint(self) -> Optional[Dict[str, Any]]:
+        await self.connection.execute(
+            Query(
+                f"CREATE TABLE IF NOT EXISTS {CHECKPOINT_TABLE_NAME} ("
+                "table_name varchar(255) PRIMARY KEY, "
+                "last_key text, "
+                "copied_rows bigint NOT NULL DEFAULT 0, "
+                "state varchar(16) NOT NULL)"
+            )
+        )
+        checkpoints = await self.connection.fetch_all(
+            Query(
+                f"SELECT last_key, copied_rows, state FROM {CHECKPOINT_TABLE_NAME} "
+                "WHERE table_name = $table",
+                values={"table": self.table},
+            )
+        )
+
+        return checkpoints[0] if checkpoints else None
+
+    def _save_checkpoint_queries(self, last_key: Optional[str], copied_rows: int):
+        return (
+            Query(
+                f"DELETE FROM {CHECKPOINT_TABLE_NAME} WHERE table_name = $table",
+                values={"table": self.table},
+            ),
+            Query(
+                f"INSERT INTO {CHECKPOINT_TABLE_NAME} "
+                "(table_name, last_key, copied_rows, state) "
+                "VALUES ($table, $last_key, $copied_rows, $state)",
+                values={
+                    "table": self.table,
+                    "last_key": last_key,
+                    "copied_rows": copied_rows,
+                    "state": STATE_COPYING,
+                },
+            ),
+        )
+
+    async def _next_upper_key(self, key: str, last_key: Optional[str]) -> Any:
+        where = ""
+        values = None
+
+        if last_key is not None:
+            where = f"WHERE {self._key_condition(key, '>', '$last_key')} "
+            values = {"last_key": last_key}
+
+        result = await self.connection.fetch_all(
+            Query(
+                f"SELECT MAX(k) AS upper_key FROM (SELECT {self.quote(key)} AS k "
+                f"FROM {self.quote(self.table)} {where}"
+                f"ORDER BY {self.quote(key)} LIMIT {int(self.chunk_size)}) chunk",
+                values=values,
+            )
+        )
+
+        return result[0]["upper_key"] if result else None
+
+    def _copy_query(
+        self, columns: List[str], key: str, last_key: Optional[str], upper_key: str
+    ) -> Query:
+        raise NotImplementedError
+
+    async def run(self):
+        if await self._referenced_by_foreign_keys():
+            raise RuntimeError(
+                f"Online schema change isn't supported for {self.table}, it's "
+                f"referenced by foreign keys"
+            )
+
+        if await self._table_exists(self.old_table):
+            # The swap would fail after the whole table has been copied
+            raise RuntimeError(
+                f"{self.old_table} is left from a previous online schema change of "
+                f"{self.table}, drop it before altering {self.table} again"
+            )
+
+        key = await self._primary_key()
+        checkpoint = await self._load_checkpoint()
+
+        if checkpoint and checkpoint["state"] == STATE_COPYING:
+            last_key, copied_rows = checkpoint["last_key"], checkpoint["copied_rows"]
+            logger.info("Resuming copy of %s after key %s", self.table, last_key)
+        else:
+            await self._create_shadow_table()
+            last_key, copied_rows = None, 0
+            await self._execute_in_transaction(
+                *self._save_checkpoint_queries(last_key, copied_rows)
+            )
+
+        source_columns = await self._columns(self.table)
+        shadow_columns = set(await self._columns(self.shadow_table))
+        columns = [c for c in source_columns if c in shadow_columns]
+
+        if key not in columns:
+            raise RuntimeError("Online schema change can't drop the primary key")
+
+        await self._create_triggers(columns, key)
+        start = time.perf_counter()
+
+        while True:
+            await self.lag_throttle.wait(self.connection)
+            upper_key = await self._next_upper_key(key, last_key)
+
+            if upper_key is None:
+                break
+
+            upper_key = str(upper_key)
+            copied_rows = await self._copy_chunk(
+                columns, key, last_key, upper_key, copied_rows
+            )
+            last_key = upper_key
+            logger.info(
+                "Copied %s rows of %s (%.0f rows/s)",
+                copied_rows,
+                self.table,
+                copied_rows / max(time.perf_counter() - start, 1e-9),
+            )
+
+            if self.throttle:
+                await asyncio.sleep(self.throttle)
+
+        await self._swap(key)
+
+        if self.drop_old:
+            await self.connection.execute(
+                Query(f"DROP TABLE {self.quote(self.old_table)}")
+            )
+
+    async def _copy_chunk(
+        self,
+        columns: List[str],
+        key: str,
+        last_key: Optional[str],
+        upper_key: str,
+        copied_rows: int,
+    ) -> int:
+        """Copy the rows after `last_key` up to `upper_key` and checkpoint the total
+        in the same transaction
+
+        :return: Rows copied so far, including this chunk
+        """
+        transaction = self.connection.transaction()
+
+        async with transaction:
+            # Rows the triggers already copied are skipped and not counted
+            copied = await self.connection.execute(
+                self._copy_query(columns, key, last_key, upper_key)
+            )
+            copied_rows += copied or 0
+
+            for query in self._save_checkpoint_queries(upper_key, copied_rows):
+                await self.connection.execute(query)
+
+            await transaction.commit()
+
+        return copied_rows
+
+
+@dataclass
+class PostgreSQLOnlineSchemaChange(OnlineSchemaChange):
+    key_type: str = "bigint"
+
+    @staticmethod
+    def quote(identifier: str) -> str:
+        return f'"{identifier}"'
+
+    @property
+    def sync_function(self) -> str:
+        return f"{self.shadow_table}_sync"
+
+    def _key_condition(self, key: str, operator: str, placeholder: str) -> str:
+        # Keys are passed as text so checkpoints work for any key type
+        return f"{self.quote(key)} {operator} ({placeholder}::text)::{self.key_type}"
+
+    async def _columns(self, table: str) -> List[str]:
+        rows = await self.connection.fetch_all(
+            Query(
+                "SELECT attname AS name FROM pg_attribute "
+                "WHERE attrelid = to_regclass($table) AND attnum > 0 "
+                "AND NOT attisdropped ORDER BY attnum",
+                values={"table": table},
+            )
+        )
+
+        return [r["name"] for r in rows]
+
+    async def _create_shadow_table(self):
+        shadow = self.quote(self.shadow_table)
+
+        await self._execute_in_transaction(
+            Query(f"DROP TABLE IF EXISTS {shadow}"),
+            Query(
+                f"CREATE TABLE {shadow} (LIKE {self.quote(self.table)} INCLUDING ALL)"
+            ),
+            *(Query(f"ALTER TABLE {shadow} {a}") for a in self.alterations),
+        )
+
+    async def _create_triggers(self, columns: List[str], key: str):
+        shadow = self.quote(self.shadow_table)
+        column_list = ", ".join(self.quote(c) for c in columns)
+        new_values = ", ".join(f"NEW.{self.quote(c)}" for c in columns)
+        updates = ", ".join(
+            f"{self.quote(c)} = EXCLUDED.{self.quote(c)}" for c in columns if c != key
+        )
+        on_conflict = f"DO UPDATE SET {updates}" if updates else "DO NOTHING"
+        k = self.quote(key)
+
+        await self._execute_in_transaction(
+            Query(
+                f"CREATE OR REPLACE FUNCTION {self.quote(self.sync_function)}() "
+                "RETURNS trigger AS $$\n"
+                "BEGIN\n"
+                "  IF TG_OP IN ('DELETE', 'UPDATE') THEN\n"
+                f"    DELETE FROM {shadow} WHERE {k} = OLD.{k};\n"
+                "  END IF;\n"
+                "  IF TG_OP = 'DELETE' THEN\n"
+                "    RETURN OLD;\n"
+                "  END IF;\n"
+                f"  INSERT INTO {shadow} ({column_list}) VALUES ({new_values}) "
+                f"ON CONFLICT ({k}) {on_conflict};\n"
+                "  RETURN NEW;\n"
+                "END\n"
+                "$$ LANGUAGE plpgsql"
+            ),
+            Query(
+                f"DROP TRIGGER IF EXISTS {self.quote(self.sync_function)} "
+                f"ON {self.quote(self.table)}"
+            ),
+            Query(
+                f"CREATE TRIGGER {self.quote(self.sync_function)} "
+                f"AFTER INSERT OR UPDATE OR DELETE ON {self.quote(self.table)} "
+                f"FOR EACH ROW EXECUTE PROCEDURE {self.quote(self.sync_function)}()"
+            ),
+        )
+
+    def _copy_query(
+        self, columns: List[str], key: str, last_key: Optional[str], upper_key: str
+    ) -> Query:
+        column_list = ", ".join(self.quote(c) for c in columns)
+        lower = f"{self._key_condition(key, '>', '$last_key')} AND " if last_key else ""
+
+        return Query(
+            f"INSERT INTO {self.quote(self.shadow_table)} ({column_list}) "
+            f"SELECT {column_list} FROM {self.quote(self.table)} "
+            f"WHERE {lower}{self._key_condition(key, '<=', '$upper_key')} "
+            f"ON CONFLICT DO NOTHING",
+            values={"last_key": last_key, "upper_key": upper_key}
+            if last_key
+            else {"upper_key": upper_key},
+        )
+
+    async def _primary_key(self) -> str:
+        rows = await self.connection.fetch_all(
+            Query(
+                "SELECT a.attname AS name, "
+                "format_type(a.atttypid, a.atttypmod) AS type "
+                "FROM pg_index i JOIN pg_attribute a "
+                "ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey) "
+                "WHERE i.indrelid = to_regclass($table) AND i.indisprimary",
+                values={"table": self.table},
+            )
+        )
+
+        if len(rows) != 1:
+            raise RuntimeError(
+                f"Online schema change requires {self.table} to have a single "
+                f"column primary key"
+            )
+
+        self.key_type = rows[0]["type"]
+        return rows[0]["name"]
+
+    async def _referenced_by_foreign_keys(self) -> bool:
+        rows = await self.connection.fetch_all(
+            Query(
+                "SELECT 1 FROM pg_constraint "
+                "WHERE confrelid = to_regclass($table) AND contype = 'f'",
+                values={"table": self.table},
+            )
+        )
+
+        return bool(rows)
+
+    @staticmethod
+    def _renamed(name: str, prefix: str, new_prefix: str) -> str:
+        # Names PostgreSQL generated for the table, e.g. account_pkey
+        if name.startswith(f"{prefix}_"):
+            name = name[len(prefix) :]
+        else:
+            name = f"_{name}"
+
+        return f"{new_prefix}{name}"[:MAX_IDENTIFIER_LENGTH]
+
+    async def _indexes(self, table: str) -> List[Dict[str, Any]]:
+        return await self.connection.fetch_all(
+            Query(
+                "SELECT c.relname AS name, pg_get_indexdef(i.indexrelid) AS definition "
+                "FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                "WHERE i.indrelid = to_regclass($table) ORDER BY c.relname",
+                values={"table": table},
+            )
+        )
+
+    async def _rename_queries(self) -> List[Query]:
+        """Give the shadow table's indexes and constraints the names of the
+        table's, they're named after the shadow table when created by `LIKE`. The
+        table's move to `_<table>_old...` names. Indexes are matched by definition,
+        ones added by the alterations and other constraints are named like
+        PostgreSQL would name them for the table.
+        """
+        queries = []
+        definitions: Dict[str, List[str]] = {}
+
+        # Renaming an index also renames the constraint it belongs to
+        for index in await self._indexes(self.table):
+            definition = INDEX_NAME_PATTERN.sub(r"\1", index["definition"])
+            definitions.setdefault(definition, []).append(index["name"])
+            name = self._renamed(index["name"], self.table, self.old_table)
+            queries.append(
+                Query(
+                    f"ALTER INDEX {self.quote(index['name'])} "
+                    f"RENAME TO {self.quote(name)}"
+                )
+            )
+
+        for index in await self._indexes(self.shadow_table):
+            definition = INDEX_NAME_PATTERN.sub(r"\1", index["definition"])
+
+            if definitions.get(definition):
+                name = definitions[definition].pop(0)
+            elif index["name"].startswith(f"{self.shadow_table}_"):
+                name = self._renamed(index["name"], self.shadow_table, self.table)
+            else:
+                continue
+
+            queries.append(
+                Query(
+                    f"ALTER INDEX {self.quote(index['name'])} "
+                    f"RENAME TO {self.quote(name)}"
+                )
+            )
+
+        # e.g. check and foreign key constraints added by the alterations
+        constraints = await self.connection.fetch_all(
+            Query(
+                "SELECT conname AS name FROM pg_constraint "
+                "WHERE conrelid = to_regclass($table) "
+                "AND contype NOT IN ('p', 'u', 'x') ORDER BY conname",
+                values={"table": self.shadow_table},
+            )
+        )
+
+        for constraint in constraints:
+            if constraint["name"].startswith(f"{self.shadow_table}_"):
+                name = self._renamed(constraint["name"], self.shadow_table, self.table)
+                queries.append(
+                    Query(
+                        f"ALTER TABLE {self.quote(self.shadow_table)} "
+                        f"RENAME CONSTRAINT {self.quote(constraint['name'])} "
+                        f"TO {self.quote(name)}"
+                    )
+                )
+
+        return queries
+
+    async def _swap(self, key: str):
+        table, shadow = self.quote(self.table), self.quote(self.shadow_table)
+        sequences = await self.connection.fetch_all(
+            Query(
+                "SELECT attname AS name, "
+                "pg_get_serial_sequence($table, attname) AS sequence "
+                "FROM pg_attribute WHERE attrelid = to_regclass($table) "
+                "AND attnum > 0 AND NOT attisdropped",
+                values={"table": self.table},
+            )
+        )
+        shadow_columns = await self._columns(self.shadow_table)
+        renames = await self._rename_queries()
+
+        await self._execute_in_transaction(
+            Query(f"LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE"),
+            Query(f"DROP TRIGGER {self.quote(self.sync_function)} ON {table}"),
+            Query(f"DROP FUNCTION {self.quote(self.sync_function)}()"),
+            *renames,
+            # Sequences follow the columns that own them, keep them with the data
+            *(
+                Query(
+                    f"ALTER SEQUENCE {s['sequence']} "
+                    f"OWNED BY {shadow}.{self.quote(s['name'])}"
+                )
+                for s in sequences
+                if s["sequence"] and s["name"] in shadow_columns
+            ),
+            Query(f"ALTER TABLE {table} RENAME TO {self.quote(self.old_table)}"),
+            Query(f"ALTER TABLE {shadow} RENAME TO {table}"),
+            Query(
+                f"DELETE FROM {CHECKPOINT_TABLE_NAME} WHERE table_name = $table",
+                values={"table": self.table},
+            ),
+        )
+
+
+@dataclass
+class MySQLOnlineSchemaChange(OnlineSchemaChange):
+    @staticmethod
+    def quote(identifier: str) -> str:
+        return f"`{identifier}`"
+
+    def _trigger(self, event: str) -> str:
+        return self.quote(f"{self.shadow_table}_{event}")
+
+    async def _columns(self, table: str) -> List[str]:
+        rows = await self.connection.fetch_all(
+            Query(
+                "SELECT column_name AS name FROM information_schema.columns "
+                "WHERE table_schema = DATABASE() AND table_name = $table "
+                "ORDER BY ordinal_position",
+                values={"table": table},
+            )
+        )
+
+        return [r["name"] for r in rows]
+
+    async def _create_shadow_table(self):
+        shadow = self.quote(self.shadow_table)
+
+        # DDL commits implicitly in MySQL, so there's no point in a transaction
+        await self.connection.execute(Query(f"DROP TABLE IF EXISTS {shadow}"))
+        await self.connection.execute(
+            Query(f"CREATE TABLE {shadow} LIKE {self.quote(self.table)}")
+        )
+
+        for alteration in self.alterations:
+            await self.connection.execute(Query(f"ALTER TABLE {shadow} {alteration}"))
+
+    async def _create_triggers(self, columns: List[str], key: str):
+        table, shadow, k = (
+            self.quote(self.table),
+            self.quote(self.shadow_table),
+            self.quote(key),
+        )
+        column_list = ", ".join(self.quote(c) for c in columns)
+        new_values = ", ".join(f"NEW.{self.quote(c)}" for c in columns)
+        replace = f"REPLACE INTO {shadow} ({column_list}) VALUES ({new_values})"
+
+        for event in ("insert", "update", "delete"):
+            await self.connection.execute(
+                Query(f"DROP TRIGGER IF EXISTS {self._trigger(event)}")
+            )
+
+        await self.connection.execute(
+            Query(
+                f"CREATE TRIGGER {self._trigger('insert')} AFTER INSERT ON {table} "
+                f"FOR EACH ROW {replace}"
+            )
+        )
+        await self.connection.execute(
+            Query(
+                f"CREATE TRIGGER {self._trigger('update')} AFTER UPDATE ON {table} "
+                f"FOR EACH ROW BEGIN "
+                f"DELETE IGNORE FROM {shadow} WHERE {k} = OLD.{k}; {replace}; END"
+            )
+        )
+        await self.connection.execute(
+            Query(
+                f"CREATE TRIGGER {self._trigger('delete')} AFTER DELETE ON {table} "
+                f"FOR EACH ROW DELETE IGNORE FROM {shadow} WHERE {k} = OLD.{k}"
+            )
+        )
+
+    def _copy_query(
+        self, columns: List[str], key: str, last_key: Optional[str], upper_key: str
+    ) -> Query:
+        column_list = ", ".join(self.quote(c) for c in columns)
+        lower = f"{self._key_condition(key, '>', '$last_key')} AND " if last_key else ""
+
+        return Query(
+            f"INSERT IGNORE INTO {self.quote(self.shadow_table)} ({column_list}) "
+            f"SELECT {column_list} FROM {self.quote(self.table)} "
+            f"WHERE {lower}{self._key_condition(key, '<=', '$upper_key')} "
+            f"LOCK IN SHARE MODE",
+            values={"last_key": last_key, "upper_key": upper_key}
+            if last_key
+            else {"upper_key": upper_key},
+        )
+
+    async def _primary_key(self) -> str:
+        rows = await self.connection.fetch_all(
+            Query(
+                "SELECT column_name AS name FROM information_schema.key_column_usage "
+                "WHERE table_schema = DATABASE() AND table_name = $table "
+                "AND constraint_name = 'PRIMARY'",
+                values={"table": self.table},
+            )
+        )
+
+        if len(rows) != 1:
+            raise RuntimeError(
+                f"Online schema change requires {self.table} to have a single "
+                f"column primary key"
+            )
+
+        return rows[0]["name"]
+
+    async def _referenced_by_foreign_keys(self) -> bool:
+        rows = await self.connection.fetch_all(
+            Query(
+                "SELECT 1 FROM information_schema.referential_constraints "
+                "WHERE constraint_schema = DATABASE() "
+                "AND referenced_table_name = $table",
+                values={"table": self.table},
+            )
+        )
+
+        return bool(rows)
+
+    async def _swap(self, key: str):
+        # Triggers move with the renamed table, drop them once writes go to the new one
+        await self.connection.execute(
+            Query(
+                f"RENAME TABLE {self.quote(self.table)} TO "
+                f"{self.quote(self.old_table)}, {self.quote(self.shadow_table)} TO "
+                f"{self.quote(self.table)}"
+            )
+        )
+
+        for event in ("insert", "update", "delete"):
+            await self.connection.execute(
+                Query(f"DROP TRIGGER IF EXISTS {self._trigger(event)}")
+            )
+
+        await self._execute_in_transaction(
+            Query(
+                f"DELETE FROM {CHECKPOINT_TABLE_NAME} WHERE table_name = $table",
+                values={"table": self.table},
+            )
+        )
+
+
+ONLINE_SCHEMA_CHANGES = {
+    "mysql": MySQLOnlineSchemaChange,
+    "postgresql": PostgreSQLOnlineSchemaChange,
+}
+
+
+def create_online_schema_change(
+    connection: ConnectionBackend, table: str, alterations: List[str], **options
+) -> OnlineSchemaChange:
+    try:
+        online_schema_change = ONLINE_SCHEMA_CHANGES[connection.dialect]
+    except KeyError:
+        raise RuntimeError(
+            f"Online schema changes aren't supported with {connection.dialect}"
+        )
+
+    return online_schema_change(connection, table, alterations, **options)
@@ -0,0 +1,293 @@
+import json
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from migri.elements import Query
+from migri.interfaces import ConnectionBackend, Task
+from migri.migration import Migration, MigrationFilesMixin, MigrationPendingMixin
+from migri.statements import normalize, statement_type
+
+__all__ = ["MigrationPlan", "Plan", "StatementPlan", "format_plans"]
+logger = logging.getLogger(__name__)
+
+DML_STATEMENT_TYPES = ("DELETE", "INSERT", "REPLACE", "UPDATE")
+DEFAULT_SEQ_SCAN_THRESHOLD = 10000
+
+
+@dataclass(frozen=True)
+class StatementPlan:
+    statement_number: int
+    statement: str
+    estimated_rows: Optional[int] = None
+    cost: Optional[float] = None
+    # Tables read with a sequential/full scan that are at or above the threshold
+    sequential_scans: Tuple[str, ...] = ()
+    error: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "statement": self.statement_number,
+            "sql": self.statement,
+            "estimated_rows": self.estimated_rows,
+            "cost": self.cost,
+            "sequential_scans": list(self.sequential_scans),
+            "error": self.error,
+        }
+
+
+@dataclass(frozen=True)
+class MigrationPlan:
+    migration_name: str
+    statements: List[StatementPlan] = field(default_factory=list)
+    message: Optional[str] = None
+
+    @property
+    def estimated_rows(self) -> Optional[int]:
+        rows = [
+            s.estimated_rows for s in self.statements if s.estimated_rows is not None
+        ]
+        return sum(rows) if rows else None
+
+    @property
+    def cost(self) -> Optional[float]:
+        costs = [s.cost for s in self.statements if s.cost is not None]
+        return sum(costs) if costs else None
+
+    def to_dict(self) -> dict:
+        return {
+            "migration": self.migration_name,
+            "estimated_rows": self.estimated_rows,
+            "cost": self.cost,
+            "message": self.message,
+            "statements": [s.to_dict() for s in self.statements],
+        }
+
+
+def _walk_postgresql_plan(node: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    yield node
+
+    for child in node.get("Plans", []):
+        yield from _walk_postgresql_plan(child)
+
+
+def parse_postgresql_plan(explain_output: Any) -> Tuple[int, float, List[str]]:
+    """Parse `EXPLAIN (FORMAT JSON)` output into estimated rows, total cost and the
+    relations read with a sequential scan
+    """
+    if isinstance(explain_output, str):
+        explain_output = json.loads(explain_output)
+
+    root = explain_output[0]["Plan"]
+    rows_node = root
+
+    # Rows touched by UPDATE/DELETE/INSERT are estimated by the node feeding ModifyTable
+    if root["Node Type"] == "ModifyTable" and root.get("Plans"):
+        rows_node = root["Plans"][0]
+
+    seq_scans = [
+        n["Relation Name"]
+        for n in _walk_postgresql_plan(root)
+        if n["Node Type"] == "Seq Scan"
+    ]
+
+    return int(rows_node["Plan Rows"]), float(root["Total Cost"]), seq_scans
+
+
+def parse_mysql_plan(explain_rows: List[Dict[str, Any]]) -> Tuple[int, List[str]]:
+    """Parse `EXPLAIN` output into estimated rows examined and tables read with a
+    full table scan
+    """
+    rows = sum(int(r.get("rows") or 0) for r in explain_rows)
+    full_scans = [r["table"] for r in explain_rows if r.get("type") == "ALL"]
+
+    return rows, full_scans
+
+
+def parse_sqlite_plan(explain_rows: List[Dict[str, Any]]) -> List[str]:
+    """Parse `EXPLAIN QUERY PLAN` output into tables read with a full scan"""
+    scans = []
+
+    for row in explain_rows:
+        words = row["detail"].split()
+
+        if words and words[0] == "SCAN":
+            # Older SQLite versions output "SCAN TABLE name"
+            table = words[2] if len(words) > 2 and words[1] == "TABLE" else words[1]
+            scans.append(table)
+
+    return scans
+
+
+async def _explain_postgresql(
+    connection: ConnectionBackend, statement: str, threshold: int
+) -> Dict[str, Any]:
+    result = await connection.fetch(Query(f"EXPLAIN (FORMAT JSON) {statement}"))
+    rows, cost, seq_scans = parse_postgresql_plan(result["QUERY PLAN"])
+    large_scans = []
+
+    for relation in seq_scans:
+        tables = await connection.fetch_all(
+            Query(
+                "SELECT reltuples FROM pg_class WHERE oid = to_regclass($relation)",
+                values={"relation": relation},
+            )
+        )
+        reltuples = tables[0]["reltuples"] if tables else None
+
+        # reltuples is -1 (or 0 before PostgreSQL 14) for tables never analyzed
+        if reltuples is None or not 0 < reltuples < threshold:
+            large_scans.append(relation)
+
+    return {"estimated_rows": rows, "cost": cost, "sequential_scans": large_scans}
+
+
+async def _explain_mysql(
+    connection: ConnectionBackend, statement: str, threshold: int
+) -> Dict[str, Any]:
+    explain_rows = await connection.fetch_all(Query(f"EXPLAIN {statement}"))
+    rows, full_scans = parse_mysql_plan(explain_rows)
+    large_scans = [
+        r["table"]
+        for r in explain_rows
+        if r["table"] in full_scans and int(r.get("rows") or 0) >= threshold
+    ]
+
+    return {"estimated_rows": rows, "sequential_scans": large_scans}
+
+
+async def _explain_sqlite(
+    connection: ConnectionBackend, statement: str, threshold: int
+) -> Dict[str, Any]:
+    explain_rows = await connection.fetch_all(Query(f"EXPLAIN QUERY PLAN {statement}"))
+    large_scans = []
+    estimated_rows = None
+
+    for table in parse_sqlite_plan(explain_rows):
+        rows = await _sqlite_table_rows(connection, table)
+
+        if rows is not None:
+            estimated_rows = (estimated_rows or 0) + rows
+
+        # Without ANALYZE statistics the table size is unknown, so flag the scan
+        if rows is None or rows >= threshold:
+            large_scans.append(table)
+
+    return {"estimated_rows": estimated_rows, "sequential_scans": large_scans}
+
+
+async def _sqlite_table_rows(
+    connection: ConnectionBackend, table: str
+) -> Optional[int]:
+    try:
+        stats = await connection.fetch_all(
+            Query(
+                "SELECT stat FROM sqlite_stat1 WHERE tbl = $table",
+                values={"table": table},
+            )
+        )
+    except Exception:
+        # sqlite_stat1 only exists once ANALYZE has been run
+        return None
+
+    if not stats:
+        return None
+
+    return int(stats[0]["stat"].split()[0])
+
+
+EXPLAIN_FUNCTIONS = {
+    "mysql": _explain_mysql,
+    "postgresql": _explain_postgresql,
+    "sqlite": _explain_sqlite,
+}
+
+
+def format_plans(plans: List[MigrationPlan], output_format: str = "text") -> str:
+    if output_format == "json":
+        return json.dumps([p.to_dict() for p in plans], indent=2)
+
+    lines = []
+
+    for plan in plans:
+        cost = f", cost {plan.cost:.2f}" if plan.cost is not None else ""
+        rows = "?" if plan.estimated_rows is None else plan.estimated_rows
+        summary = plan.message or f"~{rows} rows{cost}"
+        lines.append(f"{plan.migration_name}: {summary}")
+
+        for s in plan.statements:
+            if s.error:
+                details = f"not explained [{s.error}]"
+            else:
+                rows = "?" if s.estimated_rows is None else s.estimated_rows
+                details = f"~{rows} rows"
+                details += f", cost {s.cost:.2f}" if s.cost is not None else ""
+
+                if s.sequential_scans:
+                    details += f" [seq scan: {', '.join(s.sequential_scans)}]"
+
+            lines.append(f"  #{s.statement_number} {details}")
+
+    return "\n".join(lines)
+
+
+class Plan(MigrationFilesMixin, MigrationPendingMixin, Task):
+    async def _explain(
+        self, number: int, statement: str, threshold: int
+    ) -> StatementPlan:
+        explain = EXPLAIN_FUNCTIONS[self._connection.dialect]
+        transaction = self._connection.transaction()
+
+        # EXPLAIN doesn't run the statement but keep anything it might do from
+        # sticking around, a failed EXPLAIN also won't abort later ones
+        async with transaction:
+            try:
+                result = await explain(self._connection, statement, threshold)
+            except Exception as e:
+                logger.info("Unable to explain statement %s: %s", number, e)
+                return StatementPlan(number, statement, error=str(e))
+
+        return StatementPlan(
+            statement_number=number,
+            statement=statement,
+            estimated_rows=result.get("estimated_rows"),
+            cost=result.get("cost"),
+            sequential_scans=tuple(result.get("sequential_scans", ())),
+        )
+
+    async def plan_migration(
+        self, migration: Migration, threshold: int
+    ) -> MigrationPlan:
+        if migration.file_ext != ".sql":
+            return MigrationPlan(migration.name, message="not a SQL migration")
+
+        plans = []
+
+        for number, statement in enumerate(migration.statements, start=1):
+            statement = normalize(statement).rstrip(";")
+
+            if statement_type(statement) in DML_STATEMENT_TYPES:
+                plans.append(await self._explain(number, statement, threshold))
+
+        return MigrationPlan(
+            migration.name, plans, message=None if plans else "no DML statements"
+        )
+
+    async def run(
+        self,
+        migrations_dir: str,
+        seq_scan_threshold: int = DEFAULT_SEQ_SCAN_THRESHOLD,
+    ) -> List[MigrationPlan]:
+        """Estimate the rows and cost of DML statements in pending migrations
+
+        :param migrations_dir: Migrations directory
+        :type migrations_dir: str
+        :param seq_scan_threshold: Flag sequential scans of tables with at least
+            this many (estimated) rows
+        :type seq_scan_threshold: int
+        """
+        migrations = await self._migrations_to_apply(
+            self.get_migrations(migrations_dir)
+        )
+
+        return [await self.plan_migration(m, seq_scan_threshold) for m in migrations]
@@ -0,0 +1,238 @@
+import asyncio
+import hashlib
+import logging
+import os
+import re
+from typing import List, Optional
+
+from migri.clone import backup_sqlite
+from migri.elements import Query
+from migri.interfaces import ConnectionBackend, Task
+from migri.migration import (
+    Initialize,
+    Migrate,
+    Migration,
+    MigrationFilesMixin,
+    MigrationStatus,
+)
+
+__all__ = ["create_provision", "fingerprint_migrations", "Provision"]
+logger = logging.getLogger(__name__)
+
+FINGERPRINT_PREFIX = "migri:"
+TEMPLATE_SUFFIX = "_migri_template"
+
+
+def fingerprint_migrations(migrations: List[Migration]) -> str:
+    """Hash the names and contents of migrations, changes when a migration is added,
+    removed, renamed or edited
+    """
+    fingerprint = hashlib.sha256()
+
+    for migration in migrations:
+        fingerprint.update(f"{migration.name}{migration.file_ext}\0".encode())
+        fingerprint.update(bytes.fromhex(migration.checksum))
+
+    return fingerprint.hexdigest()
+
+
+class Provision(MigrationFilesMixin, Task):
+    """Migrate a template database once per set of migrations and create copies of
+    it, e.g. one database per test worker
+    """
+
+    def copy_name(self, index: int) -> str:
+        raise NotImplementedError
+
+    @property
+    def template_name(self) -> str:
+        raise NotImplementedError
+
+    async def _copy(self, name: str):
+        raise NotImplementedError
+
+    async def _create_template(self):
+        raise NotImplementedError
+
+    async def _drop(self, name: str):
+        raise NotImplementedError
+
+    async def _fingerprint(self) -> Optional[str]:
+        raise NotImplementedError
+
+    async def _set_fingerprint(self, fingerprint: str):
+        raise NotImplementedError
+
+    async def _build_template(self, migrations_dir: str, fingerprint: str):
+        await self._drop(self.template_name)
+        await self._create_template()
+
+        async with self._connection.spawn(db_name=self.template_name) as template:
+            await Initialize(template, self.metrics, self.tracer).run()
+            results = await Migrate(template, self.metrics, self.tracer).run(
+                migrations_dir
+            )
+
+        if any(r.status == MigrationStatus.FAILURE for r in results):
+            await self._drop(self.template_name)
+            raise RuntimeError("Migrations failed, the template wasn't created")
+
+        await self._set_fingerprint(fingerprint)
+
+    async def run(
+        self, migrations_dir: str, copies: int, rebuild: bool = False
+    ) -> List[ConnectionBackend]:
+        """Rebuild the template if the migrations changed and create copies of it
+
+        :param migrations_dir: Migrations directory
+        :type migrations_dir: str
+        :param copies: Number of copies
+        :type copies: int
+        :param rebuild: Rebuild the template even if the migrations didn't change
+        :type rebuild: bool
+        :return: Unconnected backends for the copies
+        """
+        fingerprint = fingerprint_migrations(self.get_migrations(migrations_dir))
+
+        with self.tracer.span("migri.template"):
+            if rebuild or await self._fingerprint() != fingerprint:
+                self.echo.info(f"Building template {self.template_name}")
+                await self._build_template(migrations_dir, fingerprint)
+            else:
+                logger.info("Template %s is up to date", self.template_name)
+
+        names = [self.copy_name(i) for i in range(copies)]
+
+        for name in names:
+            with self.tracer.span("migri.copy", database=name):
+                await self._drop(name)
+                await self._copy(name)
+
+        return [self._connection.spawn(db_name=name) for name in names]
+
+
+class PostgreSQLProvision(Provision):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        if not re.match(r"^\w+$", self._connection.db_name):
+            raise ValueError(f"Invalid database name: {self._connection.db_name}")
+
+    def copy_name(self, index: int) -> str:
+        return f"{self._connection.db_name}_{index}"
+
+    @property
+    def template_name(self) -> str:
+        return f"{self._connection.db_name}{TEMPLATE_SUFFIX}"
+
+    def _admin(self) -> ConnectionBackend:
+        return self._connection.spawn(db_name="postgres")
+
+    async def _copy(self, name: str):
+        async with self._admin() as admin:
+            await admin.execute(
+                Query(f'CREATE DATABASE "{name}" TEMPLATE "{self.template_name}"')
+            )
+
+    async def _create_template(self):
+        async with self._admin() as admin:
+            await admin.execute(Query(f'CREATE DATABASE "{self.template_name}"'))
+
+    async def _drop(self, name: str):
+        async with self._admin() as admin:
+            await admin.execute(Query(f'DROP DATABASE IF EXISTS "{name}"'))
+
+    async def _fingerprint(self) -> Optional[str]:
+        async with self._admin() as admin:
+            rows = await admin.fetch_all(
+                Query(
+                    "SELECT shobj_description(oid, 'pg_database') AS comment "
+                    "FROM pg_database WHERE datname = $name",
+                    values={"name": self.template_name},
+                )
+            )
+
+        comment = rows[0]["comment"] if rows else None
+
+        if comment and comment.startswith(FINGERPRINT_PREFIX):
+            return comment[len(FINGERPRINT_PREFIX) :]
+
+        return None
+
+    async def _set_fingerprint(self, fingerprint: str):
+        async with self._admin() as admin:
+            await admin.execute(
+                Query(
+                    f'COMMENT ON DATABASE "{self.template_name}" '
+                    f"IS '{FINGERPRINT_PREFIX}{fingerprint}'"
+                )
+            )
+
+
+class SQLiteProvision(Provision):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        if self._connection.db_name == ":memory:":
+            raise RuntimeError("Can't provision in-memory databases")
+
+    def _path(self, suffix: str) -> str:
+        root, ext = os.path.splitext(self._connection.db_name)
+        return f"{root}{suffix}{ext or '.db'}"
+
+    def copy_name(self, index: int) -> str:
+        return self._path(f"_{index}")
+
+    @property
+    def fingerprint_path(self) -> str:
+        return f"{self.template_name}.fingerprint"
+
+    @property
+    def template_name(self) -> str:
+        return self._path(TEMPLATE_SUFFIX)
+
+    async def _copy(self, name: str):
+        await asyncio.get_running_loop().run_in_executor(
+            None, backup_sqlite, self.template_name, name
+        )
+
+    async def _create_template(self):
+        # Created on connect
+        return
+
+    async def _drop(self, name: str):
+        for path in (name, f"{name}-wal", f"{name}-shm"):
+            if os.path.exists(path):
+                os.unlink(path)
+
+        if name == self.template_name and os.path.exists(self.fingerprint_path):
+            os.unlink(self.fingerprint_path)
+
+    async def _fingerprint(self) -> Optional[str]:
+        if not os.path.exists(self.template_name):
+            return None
+
+        try:
+            with open(self.fingerprint_path, "r") as f:
+                return f.read().strip()
+        except FileNotFoundError:
+            return None
+
+    async def _set_fingerprint(self, fingerprint: str):
+        with open(self.fingerprint_path, "w") as f:
+            f.write(fingerprint)
+
+
+PROVISION_TASKS = {
+    "postgresql": PostgreSQLProvision,
+    "sqlite": SQLiteProvision,
+}
+
+
+def create_provision(connection: ConnectionBackend, **kwargs) -> Provision:
+    try:
+        provision = PROVISION_TASKS[connection.dialect]
+    except KeyError:
+        raise RuntimeError(f"Provisioning isn't supported with {connection.dialect}")
+
+    return provision(connection, **kwargs)
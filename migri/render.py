@@ -0,0 +1,106 @@
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from migri.elements import Query
+from migri.interfaces import ConnectionBackend
+from migri.migration import (
+    MIGRATION_TABLE_NAME,
+    Migrate,
+    Migration,
+    MigrationResult,
+    MigrationStatus,
+)
+from migri.session import SessionSettings
+from migri.utils import ErrEcho
+
+__all__ = ["Render", "RenderedScript", "ScriptSessionSettings"]
+
+
+@dataclass(frozen=True)
+class RenderedScript:
+    sql: str
+    results: List[MigrationResult]
+
+    @property
+    def ok(self) -> bool:
+        return all(r.status == MigrationStatus.SUCCESS for r in self.results)
+
+
+class ScriptSessionSettings(SessionSettings):
+    """Session settings written to the script as statements. The values they
+    replace aren't known when the script is rendered, so settings are reset to the
+    server's defaults afterwards rather than restored.
+    """
+
+    def _set_statement(self, name: str) -> str:
+        dialect = self.connection.dialect
+
+        if dialect == "postgresql":
+            return f"SET {'LOCAL ' if self.local else ''}{name} = $value"
+        if dialect == "mysql":
+            return f"SET SESSION {name} = $value"
+
+        return f"PRAGMA {name} = $value"
+
+    def _reset_statement(self, name: str) -> Optional[str]:
+        dialect = self.connection.dialect
+
+        if dialect == "postgresql":
+            # SET LOCAL ends with the transaction
+            return None if self.local else f"RESET {name}"
+        if dialect == "mysql":
+            return f"SET SESSION {name} = DEFAULT"
+
+        # Pragmas have no default to go back to
+        return None
+
+    async def apply(self):
+        for name, value in self.settings.items():
+            # Numeric settings reject quoted values on MySQL
+            if isinstance(value, str) and re.match(r"^-?\d+$", value):
+                value = int(value)
+
+            await self.connection.execute(
+                Query(self._set_statement(name), values={"value": value})
+            )
+
+    async def restore(self):
+        for name in reversed(list(self.settings)):
+            statement = self._reset_statement(name)
+
+            if statement:
+                await self.connection.execute(Query(statement))
+
+
+class Render(Migrate):
+    """Apply pending migrations to a `RecordingConnection`, which renders them into a
+    script instead of executing them. The script records each migration in
+    `applied_migration` when it runs. Progress is echoed to stderr, so the script
+    can be written to stdout.
+    """
+
+    def __init__(self, connection: ConnectionBackend, **kwargs):
+        super().__init__(connection, **kwargs)
+        self.echo = ErrEcho
+
+    def _session_settings(
+        self,
+        connection: ConnectionBackend,
+        settings: Dict[str, str],
+        local: bool = False,
+    ) -> SessionSettings:
+        return ScriptSessionSettings(connection, settings, local)
+
+    async def _record_migration(self, migration: Migration, duration: float):
+        # When and how long the script runs isn't known yet
+        await self._connection.execute(
+            Query(
+                f"INSERT INTO {MIGRATION_TABLE_NAME} (date_applied, name, checksum) "
+                f"VALUES (CURRENT_TIMESTAMP, $migration_name, $checksum)",
+                values={
+                    "migration_name": migration.name,
+                    "checksum": migration.checksum,
+                },
+            )
+        )
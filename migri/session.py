@@ -0,0 +1,160 @@
+import logging
+import re
+from typing import Any, Dict, Optional
+
+from migri.elements import Query
+from migri.interfaces import ConnectionBackend
+
+__all__ = ["SessionSettings", "create_session_settings", "parse_settings"]
+logger = logging.getLogger(__name__)
+
+
+def parse_settings(settings: Any) -> Dict[str, str]:
+    """Validate settings from a directive or the command line
+
+    :param settings: Setting values keyed by name
+    :type settings: dict
+    """
+    if not isinstance(settings, dict):
+        raise ValueError("Expected session settings to be a dict")
+
+    for name in settings:
+        # Names can't be bound as parameters, so only allow plain (dotted) names
+        if not re.match(r"^[a-z_][\w.]*$", str(name), re.IGNORECASE):
+            raise ValueError(f"Invalid session setting: {name}")
+
+    return {str(k): str(v) for k, v in settings.items()}
+
+
+class SessionSettings:
+    """Apply settings to a connection's session for the duration of a block and
+    restore the previous values afterwards
+
+    :param connection: Connected backend
+    :type connection: ConnectionBackend
+    :param settings: Setting values keyed by name
+    :type settings: dict
+    :param local: Whether the block runs in a transaction that reverts the
+        settings when it's rolled back
+    :type local: bool
+    """
+
+    # Whether local settings end with the transaction, so a rolled back block has
+    # nothing to restore
+    transaction_scoped = False
+
+    def __init__(
+        self,
+        connection: ConnectionBackend,
+        settings: Dict[str, str],
+        local: bool = False,
+    ):
+        self.connection = connection
+        self.settings = settings
+        self.local = local
+        self._previous: Dict[str, Any] = {}
+
+    async def _get(self, name: str) -> Any:
+        raise NotImplementedError
+
+    async def _set(self, name: str, value: Any):
+        raise NotImplementedError
+
+    async def apply(self):
+        for name, value in self.settings.items():
+            self._previous[name] = await self._get(name)
+            await self._set(name, value)
+            logger.debug("Set %s to %s", name, value)
+
+    async def restore(self):
+        for name, value in reversed(list(self._previous.items())):
+            await self._set(name, value)
+
+        self._previous.clear()
+
+    async def __aenter__(self) -> "SessionSettings":
+        await self.apply()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        # The failed transaction is rolled back along with the settings, statements
+        # would be refused until then
+        if exc_type is not None and self.local and self.transaction_scoped:
+            self._previous.clear()
+            return
+
+        await self.restore()
+
+
+class PostgreSQLSessionSettings(SessionSettings):
+    transaction_scoped = True
+
+    async def _get(self, name: str) -> Any:
+        row = await self.connection.fetch(
+            Query("SELECT current_setting($name) AS value", values={"name": name})
+        )
+        return row["value"]
+
+    async def _set(self, name: str, value: Any):
+        # Same as SET (LOCAL), but takes the value as a parameter
+        await self.connection.fetch(
+            Query(
+                "SELECT set_config($name, $value, $local)",
+                values={"name": name, "value": str(value), "local": self.local},
+            )
+        )
+
+
+class MySQLSessionSettings(SessionSettings):
+    async def _get(self, name: str) -> Any:
+        row = await self.connection.fetch(Query(f"SELECT @@SESSION.{name} AS value"))
+        return row["value"]
+
+    async def _set(self, name: str, value: Any):
+        # Numeric variables reject quoted values
+        if isinstance(value, str) and re.match(r"^-?\d+$", value):
+            value = int(value)
+
+        await self.connection.execute(
+            Query(f"SET SESSION {name} = $value", values={"value": value})
+        )
+
+
+class SQLitePragmaSettings(SessionSettings):
+    async def _get(self, name: str) -> Any:
+        rows = await self.connection.fetch_all(
+            Query(self.connection._pragma_statement(name))
+        )
+        return list(rows[0].values())[0] if rows else None
+
+    async def _set(self, name: str, value: Any):
+        if value is not None:
+            await self.connection.fetch_all(
+                Query(self.connection._pragma_statement(name, value))
+            )
+
+
+SESSION_SETTINGS = {
+    "mysql": MySQLSessionSettings,
+    "postgresql": PostgreSQLSessionSettings,
+    "sqlite": SQLitePragmaSettings,
+}
+
+
+def create_session_settings(
+    connection: ConnectionBackend,
+    settings: Optional[Dict[str, str]],
+    local: bool = False,
+) -> SessionSettings:
+    if not settings:
+        # Nothing to apply or restore
+        return SessionSettings(connection, {}, local)
+
+    try:
+        session_settings = SESSION_SETTINGS[connection.dialect]
+    except KeyError:
+        raise RuntimeError(
+            f"Session settings aren't supported with {connection.dialect}"
+        )
+
+    return session_settings(connection, settings, local)
@@ -0,0 +1,193 @@
+import re
+from typing import List, Optional
+
+import sqlparse
+from sqlparse import engine, lexer
+
+__all__ = [
+    "StatementSplitter",
+    "normalize",
+    "quote_identifier",
+    "split_statements",
+    "statement_type",
+    "target_table",
+]
+
+IDENTIFIER = r'(?:"[^"]+"|`[^`]+`|[\w$]+)(?:\.(?:"[^"]+"|`[^`]+`|[\w$]+))?'
+TARGET_TABLE_PATTERNS = [
+    rf"^INSERT\s+(?:IGNORE\s+)?INTO\s+({IDENTIFIER})",
+    rf"^REPLACE\s+INTO\s+({IDENTIFIER})",
+    rf"^UPDATE\s+(?:ONLY\s+)?({IDENTIFIER})",
+    rf"^DELETE\s+FROM\s+(?:ONLY\s+)?({IDENTIFIER})",
+    rf"^ALTER\s+TABLE\s+(?:IF\s+EXISTS\s+)?(?:ONLY\s+)?({IDENTIFIER})",
+    (
+        r"^CREATE\s+(?:(?:GLOBAL|LOCAL)\s+)?(?:(?:TEMP|TEMPORARY|UNLOGGED)\s+)?"
+        rf"TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?({IDENTIFIER})"
+    ),
+    (
+        r"^CREATE\s+(?:UNIQUE\s+)?INDEX\s+(?:CONCURRENTLY\s+)?"
+        rf"(?:IF\s+NOT\s+EXISTS\s+)?(?:{IDENTIFIER}\s+)?ON\s+(?:ONLY\s+)?"
+        rf"({IDENTIFIER})"
+    ),
+    rf"^TRUNCATE\s+(?:TABLE\s+)?(?:ONLY\s+)?({IDENTIFIER})",
+    rf"^COPY\s+({IDENTIFIER})",
+]
+
+
+def normalize(statement: str) -> str:
+    """Strip comments and surrounding whitespace from a statement"""
+    return sqlparse.format(statement, strip_comments=True).strip()
+
+
+def quote_identifier(name: str, quote: str = '"') -> str:
+    """Quote each part of an optionally schema qualified name"""
+    return ".".join(
+        quote + part.replace(quote, quote * 2) + quote for part in name.split(".")
+    )
+
+
+def split_statements(contents: str) -> List[str]:
+    """Split SQL into statements the same way migrations are applied"""
+    return [s for s in sqlparse.split(contents) if s != ""]
+
+
+# Tokens that open or close quotes and comments, and the ends of statements
+SCAN_PATTERN = re.compile(r"'|\"|`|--|# |/\*|\*/|\$(?:[A-Za-z_]\w*)?\$|;|\n")
+# Closing token of each opening token
+QUOTE_ENDS = {"'": "'", '"': '"', "`": "`", "--": "\n", "# ": "\n", "/*": "*/"}
+
+
+class StatementSplitter:
+    """Split SQL read in pieces, e.g. line by line from a large file, into the same
+    statements as `split_statements`. Text is tokenized once, up to the last
+    semicolon outside of quotes and comments, and the tokens are passed to a
+    single sqlparse splitter, which holds back only the statement that may still
+    continue (e.g. a trigger's BEGIN ... END block).
+    """
+
+    def __init__(self):
+        self._splitter = engine.StatementSplitter()
+        # Complete lines not tokenized yet, the last one started after a semicolon
+        self._pending: List[str] = []
+        # Text of the last line, scanned once it's complete so no token is cut in two
+        self._partial: List[str] = []
+        # Closing token of the quote or comment the scanned text ends in
+        self._quote: Optional[str] = None
+
+    def _escaped(self, text: str, position: int) -> bool:
+        """Whether the quote at `position` is escaped with a backslash"""
+        if self._quote not in ("'", '"'):
+            return False
+
+        start = position
+
+        while start > 0 and text[start - 1] == "\\":
+            start -= 1
+
+        return (position - start) % 2 == 1
+
+    def _last_end(self, text: str) -> int:
+        """Position after the last semicolon outside of quotes and comments in
+        `text`, or -1
+        """
+        end = -1
+
+        for match in SCAN_PATTERN.finditer(text):
+            token = match.group()
+
+            if self._quote is None:
+                if token == ";":
+                    end = match.end()
+                elif token.startswith("$"):
+                    self._quote = token
+                else:
+                    self._quote = QUOTE_ENDS.get(token)
+            elif token == self._quote and not self._escaped(text, match.start()):
+                self._quote = None
+
+        return end
+
+    def _split(self, text: str, final: bool = False) -> List[str]:
+        """Pass the tokens of `text` to the splitter and return the statements that
+        ended
+        """
+        exhausted = False
+
+        def tokens():
+            nonlocal exhausted
+            yield from lexer.tokenize(text)
+            exhausted = True
+
+        statements = []
+
+        for statement in self._splitter.process(tokens()):
+            if exhausted and not final:
+                # The statement in progress, its tokens stay with the splitter
+                break
+
+            statements.append(str(statement).strip())
+
+        return [s for s in statements if s != ""]
+
+    def feed(self, text: str) -> List[str]:
+        """Add text and return the statements that ended"""
+        lines_end = text.rfind("\n") + 1
+
+        if not lines_end:
+            self._partial.append(text)
+            return []
+
+        lines = "".join(self._partial) + text[:lines_end]
+        self._partial = [text[lines_end:]] if lines_end < len(text) else []
+        end = self._last_end(lines)
+
+        if end < 0:
+            self._pending.append(lines)
+            return []
+
+        ended = "".join(self._pending) + lines[:end]
+        self._pending = [lines[end:]]
+
+        return self._split(ended)
+
+    def close(self) -> List[str]:
+        """Return the remaining statements"""
+        statements = self._split("".join(self._pending + self._partial), final=True)
+        self._splitter = engine.StatementSplitter()
+        self._pending, self._partial = [], []
+        self._quote = None
+
+        return statements
+
+
+def statement_type(statement: str) -> str:
+    """Return the statement's type (e.g. 'ALTER', 'UPDATE'), or 'UNKNOWN'"""
+    parsed = sqlparse.parse(statement)
+
+    if not parsed:
+        return "UNKNOWN"
+
+    return parsed[0].get_type()
+
+
+def target_table(statement: str) -> Optional[str]:
+    """Return the name of the table a statement writes to or alters, if any.
+    Quoted identifiers are unquoted, unquoted identifiers are lowercased.
+
+    :param statement: SQL statement
+    :type statement: str
+    """
+    normalized = normalize(statement)
+
+    for pattern in TARGET_TABLE_PATTERNS:
+        match = re.match(pattern, normalized, re.IGNORECASE)
+
+        if match:
+            return _unquote(match.group(1))
+
+    return None
+
+
+def _unquote(identifier: str) -> str:
+    parts = re.findall(r'"[^"]+"|`[^`]+`|[\w$]+', identifier)
+    return ".".join(p[1:-1] if p[0] in '"`' else p.lower() for p in parts)
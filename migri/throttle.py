@@ -0,0 +1,145 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Iterable, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from migri.interfaces import ConnectionBackend
+
+from migri.elements import Query
+
+__all__ = [
+    "LAG_QUERIES",
+    "LagThrottle",
+    "SimulatedLagProbe",
+    "Throttle",
+    "sql_lag_probe",
+]
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHECK_INTERVAL = 1.0
+LAG_QUERIES = {
+    # Lag of the slowest replica, 0 without replicas (PostgreSQL 10+)
+    "postgresql": (
+        "SELECT COALESCE(EXTRACT(EPOCH FROM MAX(replay_lag)), 0) AS lag "
+        "FROM pg_stat_replication"
+    ),
+}
+
+# Called with a connection to use, returns the replication lag in seconds (or None
+# if it's unknown)
+LagProbe = Callable[["ConnectionBackend"], Awaitable[Optional[float]]]
+
+
+def sql_lag_probe(
+    query: str,
+    column: Optional[str] = None,
+    connection: Optional["ConnectionBackend"] = None,
+) -> LagProbe:
+    """Create a probe that reads replication lag in seconds with a query, e.g.
+    `SHOW REPLICA STATUS` with `column="Seconds_Behind_Source"` on a MySQL replica
+
+    :param query: Query returning the lag
+    :type query: str
+    :param column: Column to read, defaults to the first column
+    :type column: str, optional
+    :param connection: Connected backend to query (e.g. a replica) instead of the
+        migration's connection
+    :type connection: ConnectionBackend, optional
+    """
+
+    async def probe(migration_connection: "ConnectionBackend") -> Optional[float]:
+        rows = await (connection or migration_connection).fetch_all(Query(query))
+
+        if not rows:
+            return None
+
+        value = rows[0][column] if column else list(rows[0].values())[0]
+        return float(value) if value is not None else None
+
+    return probe
+
+
+class SimulatedLagProbe:
+    """Stand-in probe that reports the given lags in order and the last one after
+    that, for testing throttling without replicas
+
+    :param lags: Lag in seconds to report on each check
+    :type lags: Iterable[float]
+    """
+
+    def __init__(self, lags: Iterable[Optional[float]]):
+        self.lags = list(lags)
+        self.checks = 0
+
+    async def __call__(self, connection: "ConnectionBackend") -> Optional[float]:
+        lag = self.lags[min(self.checks, len(self.lags) - 1)] if self.lags else None
+        self.checks += 1
+        return lag
+
+
+class Throttle:
+    """Never pauses. Migrations and chunked operations call `wait` unconditionally,
+    so throttling costs nothing when it's turned off.
+    """
+
+    throttled_seconds = 0.0
+
+    async def wait(self, connection: "ConnectionBackend"):
+        pass
+
+
+class LagThrottle(Throttle):
+    """Pauses while replication lag is above a ceiling
+
+    :param probe: Returns the current lag, see `sql_lag_probe`
+    :type probe: Callable
+    :param max_lag: Highest acceptable lag in seconds
+    :type max_lag: float
+    :param interval: Seconds between checks while lag is too high
+    :type interval: float
+    :param timeout: Give up with a `TimeoutError` after pausing this long at once
+    :type timeout: float, optional
+    """
+
+    def __init__(
+        self,
+        probe: LagProbe,
+        max_lag: float,
+        interval: float = DEFAULT_CHECK_INTERVAL,
+        timeout: Optional[float] = None,
+    ):
+        self.probe = probe
+        self.max_lag = max_lag
+        self.interval = interval
+        self.timeout = timeout
+        self.throttled_seconds = 0.0
+
+    async def wait(self, connection: "ConnectionBackend"):
+        paused = None
+
+        try:
+            while True:
+                lag = await self.probe(connection)
+
+                if lag is None or lag <= self.max_lag:
+                    return
+
+                if paused is None:
+                    paused = time.perf_counter()
+
+                waited = time.perf_counter() - paused
+
+                if self.timeout is not None and waited >= self.timeout:
+                    raise TimeoutError(
+                        f"Replication lag of {lag}s still above {self.max_lag}s "
+                        f"after {waited:.1f}s"
+                    )
+
+                logger.info(
+                    "Replication lag %.1fs above %ss, pausing", lag, self.max_lag
+                )
+                await asyncio.sleep(self.interval)
+        finally:
+            if paused is not None:
+                self.throttled_seconds += time.perf_counter() - paused
@@ -0,0 +1,200 @@
+import json
+import os
+import re
+import secrets
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+__all__ = [
+    "JSONLinesTracer",
+    "OpenTelemetryTracer",
+    "Span",
+    "Tracer",
+    "create_tracer",
+    "parse_traceparent",
+]
+
+TRACEPARENT_PATTERN = re.compile(r"^[\da-f]{2}-([\da-f]{32})-([\da-f]{16})-[\da-f]{2}$")
+
+
+def parse_traceparent(traceparent: str) -> Tuple[str, str]:
+    """Parse a W3C traceparent header value into trace ID and parent span ID
+
+    :param traceparent: e.g. "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"
+    :type traceparent: str
+    """
+    match = TRACEPARENT_PATTERN.match(traceparent.strip().lower())
+
+    if not match:
+        raise ValueError(f"Invalid traceparent: {traceparent}")
+
+    return match.group(1), match.group(2)
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_span_id: Optional[str] = None
+    start_time: int = field(default_factory=time.time_ns)
+    end_time: Optional[int] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    status: str = "ok"
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_span_id,
+            "start_time_unix_nano": self.start_time,
+            "end_time_unix_nano": self.end_time,
+            "attributes": self.attributes,
+            "status": self.status,
+        }
+
+
+class Tracer:
+    """Doesn't record anything, used when tracing is off"""
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Optional[Span]]:
+        yield None
+
+    def close(self):
+        pass
+
+
+class JSONLinesTracer(Tracer):
+    """Writes finished spans to a file, one JSON object per line
+
+    :param path: File to append spans to
+    :type path: str
+    :param traceparent: W3C traceparent of the span to attach the run to
+    :type traceparent: str, optional
+    """
+
+    def __init__(self, path: str, traceparent: Optional[str] = None):
+        self.path = path
+        self.parent_span_id = None
+        self.trace_id = secrets.token_hex(16)
+        self._current: ContextVar[Optional[Span]] = ContextVar(
+            "migri_current_span", default=None
+        )
+        self._file = None
+
+        if traceparent:
+            self.trace_id, self.parent_span_id = parse_traceparent(traceparent)
+
+    def _export(self, span: Span):
+        if self._file is None:
+            self._file = open(self.path, "a")
+
+        self._file.write(json.dumps(span.to_dict(), default=str) + "\n")
+        self._file.flush()
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Optional[Span]]:
+        parent = self._current.get()
+        span = Span(
+            name=name,
+            trace_id=self.trace_id,
+            span_id=secrets.token_hex(8),
+            parent_span_id=parent.span_id if parent else self.parent_span_id,
+            attributes=attributes,
+        )
+        token = self._current.set(span)
+
+        try:
+            yield span
+        except BaseException as e:
+            span.status = "error"
+            span.set_attribute("error.message", str(e))
+            raise
+        finally:
+            span.end_time = time.time_ns()
+            self._current.reset(token)
+            self._export(span)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class OpenTelemetryTracer(Tracer):
+    """Emits spans through the OpenTelemetry API. Exporting is up to the tracer
+    provider configured by the application (or e.g. `opentelemetry-instrument`).
+
+    :param traceparent: W3C traceparent of the span to attach the run to
+    :type traceparent: str, optional
+    """
+
+    def __init__(self, traceparent: Optional[str] = None):
+        from opentelemetry import trace
+        from opentelemetry.trace.propagation.tracecontext import (
+            TraceContextTextMapPropagator,
+        )
+
+        self._tracer = trace.get_tracer("migri")
+        self._context = None
+        self._in_span: ContextVar[bool] = ContextVar("migri_in_span", default=False)
+
+        if traceparent:
+            parse_traceparent(traceparent)
+            self._context = TraceContextTextMapPropagator().extract(
+                {"traceparent": traceparent}
+            )
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Optional[Span]]:
+        # Only root spans need the remote parent, children use the current context
+        context = None if self._in_span.get() else self._context
+        token = self._in_span.set(True)
+
+        try:
+            with self._tracer.start_as_current_span(
+                name, context=context, attributes=attributes
+            ) as span:
+                yield span
+        finally:
+            self._in_span.reset(token)
+
+
+def create_tracer(
+    trace_file: Optional[str] = None,
+    traceparent: Optional[str] = None,
+    opentelemetry: bool = False,
+) -> Tracer:
+    """Create a tracer for a migration run
+
+    :param trace_file: Write spans as JSON lines to this file
+    :type trace_file: str, optional
+    :param traceparent: W3C traceparent to link spans to, defaults to the
+        TRACEPARENT environment variable
+    :type traceparent: str, optional
+    :param opentelemetry: Emit spans with OpenTelemetry instead, requires the
+        opentelemetry-api package
+    :type opentelemetry: bool
+    """
+    traceparent = traceparent or os.getenv("TRACEPARENT")
+
+    if opentelemetry:
+        try:
+            return OpenTelemetryTracer(traceparent)
+        except ImportError:
+            raise RuntimeError(
+                "OpenTelemetry tracing requires opentelemetry-api to be installed"
+            )
+
+    if trace_file:
+        return JSONLinesTracer(trace_file, traceparent)
+
+    return Tracer()
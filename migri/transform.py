@@ -0,0 +1,349 @@
+import asyncio
+import importlib
+import importlib.util
+import logging
+import marshal
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from types import ModuleType
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Union
+
+from migri.elements import Query
+from migri.interfaces import ConnectionBackend
+from migri.throttle import Throttle
+
+__all__ = ["TransformResult", "transform_rows"]
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 1000
+# SQLite locks the whole database for writes, a second connection reading the
+# table would keep the writer from committing
+SHARED_CONNECTION_DIALECTS = {"sqlite"}
+
+Row = Dict[str, Any]
+# Called in a worker process per row, returns the row to write or None to skip it
+RowFunction = Callable[[Row], Optional[Row]]
+# Writes a batch of transformed rows
+WriteFunction = Callable[[ConnectionBackend, List[Row]], Awaitable[None]]
+
+_DONE = object()
+_transform: Optional[RowFunction] = None
+
+
+@dataclass
+class TransformResult:
+    rows_read: int = 0
+    rows_written: int = 0
+    batches: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows_read / self.seconds if self.seconds else 0.0
+
+
+def _resolve(
+    module_name: str, path: Optional[str], code: Optional[bytes], qualname: str
+) -> RowFunction:
+    module = sys.modules.get(module_name)
+
+    if module is None:
+        try:
+            module = importlib.import_module(module_name)
+        except ImportError:
+            if path is None and code is None:
+                raise
+
+            # Migration modules aren't importable by name, load them like migri does
+            if path is not None:
+                spec = importlib.util.spec_from_file_location(module_name, path)
+                module = importlib.util.module_from_spec(spec)
+                sys.modules[module_name] = module
+                spec.loader.exec_module(module)
+            else:
+                module = ModuleType(module_name)
+                sys.modules[module_name] = module
+                exec(marshal.loads(code), module.__dict__)
+
+    function = module
+
+    for name in qualname.split("."):
+        function = getattr(function, name)
+
+    return function
+
+
+def _init_worker(
+    module_name: str, path: Optional[str], code: Optional[bytes], qualname: str
+):
+    global _transform
+    _transform = _resolve(module_name, path, code, qualname)
+
+
+def _transform_batch(rows: List[Row]) -> List[Row]:
+    transformed = (_transform(row) for row in rows)
+    return [row for row in transformed if row is not None]
+
+
+def _locate(function: RowFunction) -> tuple:
+    """Module name, file, code and qualified name to load `function` in a worker
+    with. Workers load it themselves instead of unpickling it, so functions defined
+    in migration files work with any multiprocessing start method. Modules without a
+    file, e.g. migrations read from a bundle, are sent to workers as marshalled
+    code.
+    """
+    qualname = getattr(function, "__qualname__", "")
+
+    if not qualname or "<" in qualname:
+        raise ValueError(
+            "transform must be a module-level function (not a lambda or closure)"
+        )
+
+    module = sys.modules.get(function.__module__)
+    path = getattr(module, "__file__", None)
+    code = None
+
+    if path is None:
+        loader = getattr(getattr(module, "__spec__", None), "loader", None)
+
+        if hasattr(loader, "get_code"):
+            code = marshal.dumps(loader.get_code(function.__module__))
+
+    return function.__module__, path, code, qualname
+
+
+class _Pipeline:
+    def __init__(
+        self,
+        reader: ConnectionBackend,
+        writer: ConnectionBackend,
+        executor: ProcessPoolExecutor,
+        write: Union[str, WriteFunction],
+        queue_size: int,
+        throttle: Throttle,
+        result: TransformResult,
+    ):
+        self.reader = reader
+        self.writer = writer
+        self.executor = executor
+        self.write = write
+        self.throttle = throttle
+        self.result = result
+        # Bounded, so reading pauses while transforming or writing falls behind
+        self.batches = asyncio.Queue(maxsize=queue_size)
+        self.transformed = asyncio.Queue(maxsize=queue_size)
+
+    async def _batches(
+        self, query: Query, batch_size: int, key: str
+    ) -> AsyncIterator[List[Row]]:
+        if self.reader is not self.writer:
+            async for rows in self.reader.iterate(query, batch_size):
+                yield rows
+
+            return
+
+        # A cursor left open on the connection would read the table while batches
+        # are written to it, so each batch is read with a query of its own, after
+        # the last key of the previous one. Rows with keys past the largest one at
+        # the start, e.g. inserted by the writes, aren't read.
+        source = f"({query.statement.strip().rstrip(';')}) AS source"
+        values = dict(query.values or {})
+        row = await self.reader.fetch(
+            Query(f"SELECT MAX({key}) AS last_key FROM {source}", values or None)
+        )
+        upper = row["last_key"] if row else None
+        last = None
+
+        while upper is not None and (last is None or last < upper):
+            bounds = {"_upper_key": upper}
+            condition = f"{key} <= $_upper_key"
+
+            if last is not None:
+                bounds["_last_key"] = last
+                condition = f"{key} > $_last_key AND {condition}"
+
+            rows = await self.reader.fetch_all(
+                Query(
+                    f"SELECT * FROM {source} WHERE {condition} "
+                    f"ORDER BY {key} LIMIT {int(batch_size)}",
+                    {**values, **bounds},
+                )
+            )
+
+            if not rows:
+                break
+
+            last = rows[-1][key]
+            yield rows
+
+    async def read(self, query: Query, batch_size: int, key: str):
+        try:
+            async for rows in self._batches(query, batch_size, key):
+                self.result.rows_read += len(rows)
+                await self.batches.put(rows)
+        finally:
+            await self.batches.put(_DONE)
+
+    async def transform(self):
+        loop = asyncio.get_running_loop()
+
+        try:
+            while True:
+                rows = await self.batches.get()
+
+                if rows is _DONE:
+                    break
+
+                # Futures are queued in read order, at most `queue_size` batches
+                # are in the workers at once
+                await self.transformed.put(
+                    loop.run_in_executor(self.executor, _transform_batch, rows)
+                )
+        finally:
+            await self.transformed.put(_DONE)
+
+    async def _write_batch(self, rows: List[Row]):
+        if callable(self.write):
+            await self.write(self.writer, rows)
+        else:
+            await self.writer.execute_many(Query(self.write), rows)
+
+    async def write_all(self):
+        while True:
+            future = await self.transformed.get()
+
+            if future is _DONE:
+                break
+
+            rows = await future
+
+            if rows:
+                await self.throttle.wait(self.writer)
+                await self._write_batch(rows)
+
+            self.result.rows_written += len(rows)
+            self.result.batches += 1
+
+    async def run(self, query: Query, batch_size: int, key: str):
+        stages = [
+            asyncio.ensure_future(self.read(query, batch_size, key)),
+            asyncio.ensure_future(self.transform()),
+            asyncio.ensure_future(self.write_all()),
+        ]
+
+        try:
+            await asyncio.gather(*stages)
+        finally:
+            # A failed stage would leave the others waiting on a queue forever
+            for stage in stages:
+                stage.cancel()
+
+            await asyncio.gather(*stages, return_exceptions=True)
+
+
+async def transform_rows(
+    backend: ConnectionBackend,
+    query: Union[str, Query],
+    transform: RowFunction,
+    write: Union[str, WriteFunction],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    workers: Optional[int] = None,
+    queue_size: Optional[int] = None,
+    reader: Optional[ConnectionBackend] = None,
+    throttle: Optional[Throttle] = None,
+    key: str = "id",
+) -> TransformResult:
+    """Stream rows of a query through a CPU-heavy transform in worker processes and
+    write the results back in bulk. Reading, transforming and writing run
+    concurrently, connected by bounded queues, so at most a few batches are held in
+    memory and the event loop isn't blocked by the transform.
+
+    `transform` is called with each row as a dict and returns the row to write or
+    None to skip it. It must be a module-level function, e.g. defined in the
+    migration file itself. `write` is either a statement with placeholders for the
+    transformed row's keys, e.g. `UPDATE account SET data = $data WHERE id = $id`,
+    executed with `execute_many` per batch, or an async function called with the
+    writing connection and a batch of rows.
+
+    Writes use `backend`, so they are part of the migration's transaction if it has
+    one. Rows are read on a second connection, which doesn't see uncommitted changes
+    of the migration. With SQLite, or when `reader` is `backend`, reads and writes
+    share the connection instead and batches are read by `key`, one query per batch
+    (`WHERE key > last ORDER BY key LIMIT batch_size`), so `key` must be a unique
+    column of the query's rows. Rows with a key past the largest one when reading
+    starts aren't read.
+
+    :param backend: Connected backend to write with, e.g. the `backend` a migration
+        receives
+    :type backend: ConnectionBackend
+    :param query: Query returning the rows to transform
+    :type query: Union[str, Query]
+    :param transform: Function to call per row in a worker process
+    :type transform: Callable
+    :param write: Statement or async function to write a batch with
+    :type write: Union[str, Callable]
+    :param batch_size: Rows per batch
+    :type batch_size: int
+    :param workers: Number of worker processes, defaults to the number of CPUs
+    :type workers: int, optional
+    :param queue_size: Batches each stage may queue, defaults to twice the number
+        of workers
+    :type queue_size: int, optional
+    :param reader: Connected backend to read with instead of opening a connection
+    :type reader: ConnectionBackend, optional
+    :param throttle: Checked before each write, e.g. the `throttle` a migration
+        receives to pause while replicas lag behind
+    :type throttle: Throttle, optional
+    :param key: Unique column to read batches by when reads and writes share a
+        connection
+    :type key: str
+    """
+    if isinstance(query, str):
+        query = Query(query)
+
+    location = _locate(transform)
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    result = TransformResult()
+    owned = None
+
+    if reader is None:
+        if backend.dialect in SHARED_CONNECTION_DIALECTS:
+            reader = backend
+        else:
+            reader = owned = backend.spawn()
+            await owned.connect()
+
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=location,
+        ) as executor:
+            pipeline = _Pipeline(
+                reader,
+                backend,
+                executor,
+                write,
+                queue_size or 2 * workers,
+                throttle or Throttle(),
+                result,
+            )
+            await pipeline.run(query, batch_size, key)
+    finally:
+        if owned is not None:
+            await owned.disconnect()
+
+    result.seconds = time.perf_counter() - start
+    logger.info(
+        "Transformed %s rows (%s written) in %.1fs (%.0f rows/s)",
+        result.rows_read,
+        result.rows_written,
+        result.seconds,
+        result.rows_per_second,
+    )
+
+    return result
@@ -5,17 +5,25 @@ import click
 
 
 class Echo:
+    err = False
+
     @classmethod
     def error(cls, message: str):
-        click.secho(message, bold=True, fg="red")
+        click.secho(message, bold=True, fg="red", err=cls.err)
 
     @classmethod
     def info(cls, message: str):
-        click.echo(message)
+        click.echo(message, err=cls.err)
 
     @classmethod
     def success(cls, message: str):
-        click.secho(message, bold=True)
+        click.secho(message, bold=True, err=cls.err)
+
+
+class ErrEcho(Echo):
+    """Echo to stderr, e.g. when a command writes its output to stdout"""
+
+    err = True
 
 
 def deprecated(message: str, end_of_life: Optional[str] = None):
@@ -0,0 +1,316 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, Optional
+
+from migri.elements import Query
+from migri.interfaces import ConnectionBackend
+
+__all__ = [
+    "LockQueueExceeded",
+    "LockQueueWatchdog",
+    "LockSample",
+    "LockWatchdog",
+    "MySQLLockQueueWatchdog",
+    "PostgreSQLLockQueueWatchdog",
+    "create_lock_watchdog",
+]
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHECK_INTERVAL = 0.5
+
+
+class LockQueueExceeded(RuntimeError):
+    ...
+
+
+@dataclass(frozen=True)
+class LockSample:
+    # Sessions waiting on locks held or requested by the migration
+    blocked: int
+    # Longest time one of them has been waiting in seconds
+    max_wait: float
+    # Whether the migration itself is waiting on a lock
+    waiting: bool = False
+
+
+class LockWatchdog:
+    """Doesn't watch. Migrations are wrapped in `watch` unconditionally, so the
+    watchdog costs nothing when it's turned off.
+    """
+
+    lock_wait_seconds = 0.0
+
+    def fresh(self) -> "LockWatchdog":
+        """Watchdog with the same limits that hasn't watched anything yet"""
+        return LockWatchdog()
+
+    async def start(self, connection: ConnectionBackend):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def add(self, connection: ConnectionBackend):
+        pass
+
+    def remove(self, connection: ConnectionBackend):
+        pass
+
+    @asynccontextmanager
+    async def watch(self) -> AsyncIterator[None]:
+        yield
+
+
+class LockQueueWatchdog(LockWatchdog):
+    """Polls lock waits from a second connection while a migration runs and cancels
+    the migration's statement once it blocks too many sessions or blocks them for
+    too long. The migration then fails with `LockQueueExceeded`. Other connections
+    running the migration's statements (e.g. of parallel groups) are watched once
+    they're added.
+
+    :param max_blocked: Cancel when more sessions than this are blocked
+    :type max_blocked: int, optional
+    :param max_wait: Cancel when a blocked session has waited longer than this many
+        seconds
+    :type max_wait: float, optional
+    :param interval: Seconds between checks
+    :type interval: float
+    """
+
+    def __init__(
+        self,
+        max_blocked: Optional[int] = None,
+        max_wait: Optional[float] = None,
+        interval: float = DEFAULT_CHECK_INTERVAL,
+    ):
+        if max_blocked is None and max_wait is None:
+            raise ValueError("Expected max_blocked or max_wait")
+
+        self.max_blocked = max_blocked
+        self.max_wait = max_wait
+        self.interval = interval
+        self.lock_wait_seconds = 0.0
+        self.tripped: Optional[str] = None
+        self._connection: Optional[ConnectionBackend] = None
+        self._monitor: Optional[ConnectionBackend] = None
+        # Session ids keyed by id() of watched connections, backends are
+        # dataclasses that compare equal to their spawned copies
+        self._backends: Dict[int, int] = {}
+
+    def fresh(self) -> "LockQueueWatchdog":
+        return type(self)(
+            max_blocked=self.max_blocked, max_wait=self.max_wait, interval=self.interval
+        )
+
+    async def _backend_id(self, connection: ConnectionBackend) -> int:
+        """Id of a connection's session, read on the connection itself"""
+        raise NotImplementedError
+
+    async def _sample(self, backend: int) -> LockSample:
+        raise NotImplementedError
+
+    async def _cancel(self, backend: int):
+        raise NotImplementedError
+
+    def _exceeded(self, sample: LockSample) -> Optional[str]:
+        if self.max_blocked is not None and sample.blocked > self.max_blocked:
+            return f"blocked {sample.blocked} sessions (limit {self.max_blocked})"
+        if self.max_wait is not None and sample.max_wait > self.max_wait:
+            return (
+                f"blocked a session for {sample.max_wait:.1f}s "
+                f"(limit {self.max_wait}s)"
+            )
+
+        return None
+
+    async def start(self, connection: ConnectionBackend):
+        if getattr(connection, "connection", None) is not None:
+            raise RuntimeError("Can't watch locks of a provided connection")
+
+        self._connection = connection
+        self._backends = {id(connection): await self._backend_id(connection)}
+        self._monitor = connection.spawn()
+        await self._monitor.connect()
+
+    async def stop(self):
+        self._backends.clear()
+
+        if self._monitor is not None:
+            await self._monitor.disconnect()
+            self._monitor = None
+
+    async def add(self, connection: ConnectionBackend):
+        """Watch another connection running the migration's statements"""
+        if self._monitor is not None:
+            self._backends[id(connection)] = await self._backend_id(connection)
+
+    def remove(self, connection: ConnectionBackend):
+        self._backends.pop(id(connection), None)
+
+    async def _poll(self, stopping: asyncio.Event):
+        while True:
+            try:
+                await asyncio.wait_for(stopping.wait(), self.interval)
+                return
+            except asyncio.TimeoutError:
+                pass
+
+            samples = {
+                backend: await self._sample(backend)
+                for backend in list(self._backends.values())
+            }
+
+            # The migration finished while sampling, its connection may have moved
+            # on to other statements
+            if stopping.is_set():
+                return
+
+            sample = LockSample(
+                sum(s.blocked for s in samples.values()),
+                max((s.max_wait for s in samples.values()), default=0.0),
+                any(s.waiting for s in samples.values()),
+            )
+
+            if sample.waiting:
+                self.lock_wait_seconds += self.interval
+
+            reason = self._exceeded(sample)
+
+            if reason:
+                logger.warning("Cancelling migration statement, it %s", reason)
+                self.tripped = reason
+
+                for backend, backend_sample in samples.items():
+                    if backend_sample.blocked or backend_sample.waiting:
+                        await self._cancel(backend)
+
+                return
+
+    @asynccontextmanager
+    async def watch(self) -> AsyncIterator[None]:
+        self.tripped = None
+        stopping = asyncio.Event()
+        poll = asyncio.ensure_future(self._poll(stopping))
+
+        try:
+            yield
+        except Exception as e:
+            if self.tripped:
+                raise LockQueueExceeded(
+                    f"cancelled by lock watchdog: migration {self.tripped}"
+                ) from e
+            raise
+        finally:
+            # Cancelling a check midway would leave the monitor connection with a
+            # reply it never read, wait for it instead
+            stopping.set()
+            (error,) = await asyncio.gather(poll, return_exceptions=True)
+
+            if isinstance(error, Exception):
+                logger.warning("Lock watchdog stopped: %s", error)
+
+
+class PostgreSQLLockQueueWatchdog(LockQueueWatchdog):
+    """Counts sessions whose `pg_blocking_pids()` include the migration's backend,
+    i.e. that wait on a lock it holds or queue behind a lock it's waiting for.
+    Waits are measured from `pg_locks.waitstart` with PostgreSQL 14 or newer. Older
+    servers don't record it, so a wait is approximated by the time since the
+    blocked session's statement started (`query_start`), which overstates it for
+    statements that ran for a while before they had to wait.
+    """
+
+    SAMPLE_QUERY = (
+        "WITH blocked AS (SELECT now() - {since} AS waited "
+        "FROM pg_stat_activity a WHERE $pid = ANY(pg_blocking_pids(a.pid))) "
+        "SELECT COUNT(*) AS blocked, "
+        "COALESCE(EXTRACT(EPOCH FROM MAX(waited)), 0)::float AS max_wait, "
+        "EXISTS (SELECT 1 FROM pg_stat_activity "
+        "WHERE pid = $pid AND wait_event_type = 'Lock') AS waiting "
+        "FROM blocked"
+    )
+    # Set shortly after the wait starts, until then it hasn't waited yet
+    WAIT_START = (
+        "COALESCE((SELECT MIN(l.waitstart) FROM pg_locks l "
+        "WHERE l.pid = a.pid AND NOT l.granted), now())"
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._sample_query = self.SAMPLE_QUERY.format(since="a.query_start")
+
+    async def start(self, connection: ConnectionBackend):
+        await super().start(connection)
+        row = await self._monitor.fetch(
+            Query("SELECT current_setting('server_version_num')::int AS version")
+        )
+
+        if row["version"] >= 140000:
+            self._sample_query = self.SAMPLE_QUERY.format(since=self.WAIT_START)
+
+    async def _backend_id(self, connection: ConnectionBackend) -> int:
+        row = await connection.fetch(Query("SELECT pg_backend_pid() AS pid"))
+        return row["pid"]
+
+    async def _sample(self, backend: int) -> LockSample:
+        row = await self._monitor.fetch(
+            Query(self._sample_query, values={"pid": backend})
+        )
+        return LockSample(row["blocked"], row["max_wait"], row["waiting"])
+
+    async def _cancel(self, backend: int):
+        await self._monitor.fetch(
+            Query("SELECT pg_cancel_backend($pid)", values={"pid": backend})
+        )
+
+
+class MySQLLockQueueWatchdog(LockQueueWatchdog):
+    """Counts InnoDB row lock waits on the migration's connection from
+    `performance_schema.data_lock_waits` (MySQL 8.0). Metadata lock waits, e.g.
+    behind an `ALTER TABLE`, aren't included.
+    """
+
+    SAMPLE_QUERY = (
+        "SELECT COUNT(DISTINCT CASE WHEN b.PROCESSLIST_ID = p.id "
+        "THEN w.REQUESTING_THREAD_ID END) AS blocked, "
+        "COALESCE(MAX(CASE WHEN b.PROCESSLIST_ID = p.id "
+        "THEN r.PROCESSLIST_TIME END), 0) AS max_wait, "
+        "COUNT(CASE WHEN r.PROCESSLIST_ID = p.id THEN 1 END) > 0 AS waiting "
+        "FROM (SELECT $pid AS id) p "
+        "LEFT JOIN performance_schema.data_lock_waits w ON TRUE "
+        "LEFT JOIN performance_schema.threads b "
+        "ON b.THREAD_ID = w.BLOCKING_THREAD_ID "
+        "LEFT JOIN performance_schema.threads r "
+        "ON r.THREAD_ID = w.REQUESTING_THREAD_ID"
+    )
+
+    async def _backend_id(self, connection: ConnectionBackend) -> int:
+        row = await connection.fetch(Query("SELECT CONNECTION_ID() AS id"))
+        return row["id"]
+
+    async def _sample(self, backend: int) -> LockSample:
+        row = await self._monitor.fetch(
+            Query(self.SAMPLE_QUERY, values={"pid": backend})
+        )
+        return LockSample(
+            int(row["blocked"]), float(row["max_wait"]), bool(row["waiting"])
+        )
+
+    async def _cancel(self, backend: int):
+        await self._monitor.execute(Query("KILL QUERY $pid", values={"pid": backend}))
+
+
+LOCK_QUEUE_WATCHDOGS = {
+    "mysql": MySQLLockQueueWatchdog,
+    "postgresql": PostgreSQLLockQueueWatchdog,
+}
+
+
+def create_lock_watchdog(dialect: str, **options) -> LockQueueWatchdog:
+    try:
+        watchdog = LOCK_QUEUE_WATCHDOGS[dialect]
+    except KeyError:
+        raise RuntimeError(f"Lock queue watchdogs aren't supported with {dialect}")
+
+    return watchdog(**options)
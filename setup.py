@@ -15,6 +15,7 @@ setup(
         "mysql": ["aiomysql"],
         "postgresql": ["asyncpg"],
         "sqlite": ["aiosqlite"],
+        "zstd": ["zstandard"],
     },
     install_requires=[
         "asyncpg",  # TODO remove in 1.1.0
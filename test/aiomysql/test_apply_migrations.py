@@ -5,6 +5,7 @@ from freezegun import freeze_time
 
 from migri import apply_migrations
 from migri.elements import Query
+from migri.migration import Initialize
 
 pytestmark = pytest.mark.asyncio
 
@@ -32,6 +33,7 @@ async def test_apply_migrations_successful(
         "animal",
         "applied_migration",
         "exhibit",
+        "migri_schema_version",
     ]
 
     # Check for animal entries
@@ -91,8 +93,11 @@ async def test_apply_migrations_dry_run(
         )
         tables = await conn.fetch_all(table_query)
 
-    assert len(tables) == 1  # applied_migration expected
-    assert tables[0]["table_name"] == "applied_migration"
+    # Only bookkeeping tables expected
+    assert sorted(t["table_name"] for t in tables) == [
+        "applied_migration",
+        "migri_schema_version",
+    ]
 
     # Check output
     captured = capsys.readouterr()
@@ -107,3 +112,47 @@ async def test_apply_migrations_dry_run(
 
     assert captured.out == expected_output
     assert captured.err == ""
+
+
+async def test_initialize_upgrade_checks_name_length(mysql_conn_factory):
+    conn = mysql_conn_factory()
+
+    async with conn:
+        # Table created by a version of migri without a versioned schema
+        await conn.execute(
+            Query(
+                "CREATE TABLE applied_migration (id integer NOT NULL AUTO_INCREMENT, "
+                "date_applied datetime NOT NULL, name text NOT NULL, "
+                "PRIMARY KEY (id))"
+            )
+        )
+        await conn.execute(
+            Query(
+                "INSERT INTO applied_migration (date_applied, name) "
+                "VALUES (NOW(), $name)",
+                values={"name": "0001_" + "x" * 300},
+            )
+        )
+        await conn.database.commit()
+
+        with pytest.raises(RuntimeError, match="limited to 255 characters"):
+            await Initialize(conn).run()
+
+        await conn.execute(Query("UPDATE applied_migration SET name = '0001_initial'"))
+        await conn.database.commit()
+        await Initialize(conn).run()
+        # Each DDL statement commits, running the upgrade again must not fail on
+        # the index it already created
+        await conn.execute(Query("UPDATE migri_schema_version SET version = 3"))
+        await conn.database.commit()
+        await Initialize(conn).run()
+
+        indexes = await conn.fetch_all(
+            Query(
+                "SELECT DISTINCT index_name AS name FROM information_schema.statistics "
+                "WHERE table_schema = DATABASE() AND table_name = 'applied_migration' "
+                "ORDER BY index_name"
+            )
+        )
+
+    assert [i["name"] for i in indexes] == ["applied_migration_name_idx", "PRIMARY"]
@@ -1,6 +1,7 @@
 import pytest
 
 from migri.backends.mysql import MySQLConnection
+from migri.elements import Query
 from test import QUERIES
 
 
@@ -24,3 +25,46 @@ def test_compile(query_element, expected_query, expected_values):
         "query": expected_query,
         "values": expected_values,
     }
+
+
+@pytest.mark.asyncio
+async def test_execute_many_and_iterate(mysql_conn_factory):
+    conn = mysql_conn_factory()
+
+    async with conn:
+        await conn.execute(
+            Query("CREATE TABLE animal (id integer NOT NULL, name text NOT NULL)")
+        )
+        await conn.execute_many(
+            Query("INSERT INTO animal (id, name) VALUES ($id, $name)"),
+            [{"id": i, "name": f"animal {i}"} for i in range(250)],
+        )
+        await conn.database.commit()
+
+        batches = [
+            [r["id"] for r in rows]
+            async for rows in conn.iterate(
+                Query("SELECT id FROM animal ORDER BY id"), batch_size=100
+            )
+        ]
+
+        # Connection is usable again once iteration is done
+        count = await conn.fetch(Query("SELECT COUNT(*) AS total FROM animal"))
+
+    assert [len(b) for b in batches] == [100, 100, 50]
+    assert batches[-1][-1] == 249
+    assert count["total"] == 250
+
+
+@pytest.mark.asyncio
+async def test_execute_reuses_cursor(mysql_conn_factory):
+    conn = mysql_conn_factory()
+
+    async with conn:
+        await conn.execute(Query("SELECT 1"))
+        cursor = conn._cursor
+        await conn.execute(Query("SELECT DATE_FORMAT(NOW(), '%Y')"))
+
+        assert conn._cursor is cursor
+
+    assert conn._cursor is None
@@ -0,0 +1,170 @@
+import pytest
+
+from migri.elements import Query
+from migri.osc import MySQLOnlineSchemaChange
+from migri.throttle import Throttle
+
+pytestmark = pytest.mark.asyncio
+
+
+class ChunkHook(Throttle):
+    """Counts the checks before each chunk and runs `hook` at the given one"""
+
+    def __init__(self, chunk: int = 0, hook=None):
+        self.chunk = chunk
+        self.hook = hook
+        self.checks = 0
+
+    async def wait(self, connection):
+        self.checks += 1
+
+        if self.checks == self.chunk:
+            await self.hook(connection)
+
+
+async def interrupt(connection):
+    raise RuntimeError("interrupted")
+
+
+async def create_accounts(conn, rows: int = 25):
+    await conn.execute(
+        Query(
+            "CREATE TABLE account (id integer AUTO_INCREMENT PRIMARY KEY, "
+            "name varchar(64) NOT NULL, UNIQUE KEY account_name (name))"
+        )
+    )
+    await conn.execute_many(
+        Query("INSERT INTO account (name) VALUES ($name)"),
+        [{"name": f"account {i}"} for i in range(1, rows + 1)],
+    )
+
+
+async def test_online_schema_change(mysql_conn_factory):
+    conn = mysql_conn_factory()
+
+    async with conn:
+        await create_accounts(conn)
+        await MySQLOnlineSchemaChange(
+            conn, "account", ["ADD COLUMN zone text"], chunk_size=10
+        ).run()
+
+        accounts = await conn.fetch_all(Query("SELECT * FROM account ORDER BY id"))
+        tables = await conn.fetch_all(
+            Query(
+                "SELECT table_name AS name FROM information_schema.tables "
+                "WHERE table_schema = DATABASE() ORDER BY table_name"
+            )
+        )
+        triggers = await conn.fetch_all(
+            Query(
+                "SELECT trigger_name FROM information_schema.triggers "
+                "WHERE trigger_schema = DATABASE()"
+            )
+        )
+        checkpoints = await conn.fetch_all(
+            Query("SELECT * FROM migri_online_schema_change")
+        )
+        await conn.execute(Query("INSERT INTO account (name) VALUES ('account 26')"))
+        last = await conn.fetch(Query("SELECT max(id) AS id FROM account"))
+
+    assert len(accounts) == 25
+    assert accounts[0] == {"id": 1, "name": "account 1", "zone": None}
+    assert [t["name"] for t in tables] == [
+        "_account_old",
+        "account",
+        "migri_online_schema_change",
+    ]
+    assert triggers == []
+    assert checkpoints == []
+    assert last["id"] == 26
+
+
+async def test_online_schema_change_syncs_writes(mysql_conn_factory):
+    async def write(connection):
+        # Rows already copied and rows yet to be copied
+        await connection.execute(Query("UPDATE account SET name = 'one' WHERE id = 1"))
+        await connection.execute(Query("DELETE FROM account WHERE id IN (2, 20)"))
+        await connection.execute(Query("UPDATE account SET name = 'x' WHERE id = 21"))
+        await connection.execute(Query("INSERT INTO account (name) VALUES ('new')"))
+
+    conn = mysql_conn_factory()
+
+    async with conn:
+        await create_accounts(conn)
+        await MySQLOnlineSchemaChange(
+            conn,
+            "account",
+            ["ADD COLUMN zone text"],
+            chunk_size=10,
+            lag_throttle=ChunkHook(2, write),
+        ).run()
+
+        accounts = await conn.fetch_all(Query("SELECT id, name FROM account"))
+        old = await conn.fetch_all(Query("SELECT id, name FROM _account_old"))
+
+    assert len(accounts) == 24
+    assert sorted(accounts, key=lambda a: a["id"]) == sorted(old, key=lambda a: a["id"])
+    assert {"id": 1, "name": "one"} in accounts
+    assert {"id": 21, "name": "x"} in accounts
+    assert {"id": 26, "name": "new"} in accounts
+
+
+async def test_online_schema_change_resumes(mysql_conn_factory):
+    conn = mysql_conn_factory()
+
+    async with conn:
+        await create_accounts(conn)
+
+        with pytest.raises(RuntimeError, match="interrupted"):
+            await MySQLOnlineSchemaChange(
+                conn,
+                "account",
+                ["ADD COLUMN zone text"],
+                chunk_size=10,
+                lag_throttle=ChunkHook(3, interrupt),
+            ).run()
+
+        checkpoint = await conn.fetch(
+            Query("SELECT last_key, copied_rows, state FROM migri_online_schema_change")
+        )
+        # Written while the copy was interrupted
+        await conn.execute(Query("UPDATE account SET name = 'one' WHERE id = 1"))
+
+        throttle = ChunkHook()
+        await MySQLOnlineSchemaChange(
+            conn,
+            "account",
+            ["ADD COLUMN zone text"],
+            chunk_size=10,
+            lag_throttle=throttle,
+        ).run()
+
+        accounts = await conn.fetch_all(Query("SELECT * FROM account ORDER BY id"))
+
+    assert checkpoint == {"last_key": "20", "copied_rows": 20, "state": "copying"}
+    # The last chunk and the check that finds no more rows
+    assert throttle.checks == 2
+    assert len(accounts) == 25
+    assert accounts[0] == {"id": 1, "name": "one", "zone": None}
+
+
+async def test_online_schema_change_old_table_exists(mysql_conn_factory):
+    conn = mysql_conn_factory()
+
+    async with conn:
+        await create_accounts(conn)
+        await MySQLOnlineSchemaChange(conn, "account", ["ADD COLUMN zone text"]).run()
+
+        with pytest.raises(RuntimeError, match="_account_old is left from a previous"):
+            await MySQLOnlineSchemaChange(
+                conn, "account", ["ADD COLUMN region text"]
+            ).run()
+
+        tables = await conn.fetch_all(
+            Query(
+                "SELECT table_name AS name FROM information_schema.tables "
+                "WHERE table_schema = DATABASE() AND table_name = '_account_new'"
+            )
+        )
+
+    assert tables == []
@@ -1,10 +1,20 @@
+import bz2
+import gzip
+import json
+import lzma
 from datetime import datetime
 
 import pytest
 from freezegun import freeze_time
 
-from migri import apply_migrations
+from migri import apply_migrations, get_connection
+from migri.backends.sqlite import FAST_PRAGMAS
+from migri.checksums import hash_file
 from migri.elements import Query
+from migri.metrics import OpenMetricsRecorder
+from migri.migration import Initialize, Migrate, MigrationStatus, SCHEMA_VERSION
+from migri.throttle import LagThrottle, SimulatedLagProbe
+from migri.tracing import JSONLinesTracer
 
 pytestmark = pytest.mark.asyncio
 
@@ -22,7 +32,12 @@ async def test_apply_migrations_successful(capsys, migrations, sqlite_conn_facto
         table_query = Query("SELECT name FROM sqlite_master WHERE type='table'")
         tables = await conn.fetch_all(table_query)
 
-    assert [t["name"] for t in tables] == ["applied_migration", "account", "record"]
+    assert [t["name"] for t in tables] == [
+        "applied_migration",
+        "migri_schema_version",
+        "account",
+        "record",
+    ]
 
     # Check that account has records
     conn = sqlite_conn_factory()
@@ -73,8 +88,11 @@ async def test_apply_migrations_dry_run(capsys, migrations, sqlite_conn_factory)
         table_query = Query("SELECT name FROM sqlite_master WHERE type='table'")
         tables = await conn.fetch_all(table_query)
 
-    assert len(tables) == 1  # applied_migration expected
-    assert tables[0]["name"] == "applied_migration"
+    # Only bookkeeping tables expected
+    assert sorted(t["name"] for t in tables) == [
+        "applied_migration",
+        "migri_schema_version",
+    ]
 
     # Check output
     captured = capsys.readouterr()
@@ -88,3 +106,629 @@ async def test_apply_migrations_dry_run(capsys, migrations, sqlite_conn_factory)
 
     assert captured.out == expected_output
     assert captured.err == ""
+
+
+async def test_apply_migrations_metrics(migrations, sqlite_conn_factory, tmp_path):
+    metrics_file = tmp_path / "migri.prom"
+    conn = sqlite_conn_factory()
+    metrics = OpenMetricsRecorder(path=str(metrics_file))
+    results = await apply_migrations(migrations["sqlite_a"], conn, metrics=metrics)
+
+    assert [r.status for r in results] == [MigrationStatus.SUCCESS] * 3
+    assert all(r.duration is not None for r in results)
+
+    lines = metrics_file.read_text().splitlines()
+
+    assert "migri_migrations_pending 3" in lines
+    assert "migri_migrations_applied 3" in lines
+    assert "migri_migrations_failed 0" in lines
+    assert "migri_migration_duration_seconds_count 3" in lines
+    assert metrics.bookkeeping_seconds > 0
+    assert metrics.run_seconds > 0
+
+
+async def test_apply_migrations_metrics_progress(
+    migrations, sqlite_conn_factory, tmp_path
+):
+    metrics_file = tmp_path / "migri.prom"
+    exported = []
+
+    class Snapshots(OpenMetricsRecorder):
+        async def export(self):
+            await super().export()
+            exported.append(metrics_file.read_text().splitlines())
+
+    await apply_migrations(
+        migrations["sqlite_a"],
+        sqlite_conn_factory(),
+        metrics=Snapshots(path=str(metrics_file)),
+    )
+
+    # Before the first migration, after each one and at the end of the run
+    assert len(exported) == 5
+    assert "migri_run_in_progress 1" in exported[0]
+    assert "migri_migrations_pending 3" in exported[0]
+    assert "migri_migrations_applied 1" in exported[1]
+    assert not any(
+        line.startswith("migri_last_run_timestamp_seconds") for line in exported[3]
+    )
+    assert "migri_run_in_progress 0" in exported[4]
+    assert "migri_migrations_applied 3" in exported[4]
+
+
+async def test_apply_migrations_trace(migrations, sqlite_conn_factory, tmp_path):
+    trace_file = tmp_path / "trace.jsonl"
+    conn = sqlite_conn_factory()
+    await apply_migrations(
+        migrations["sqlite_a"], conn, tracer=JSONLinesTracer(str(trace_file))
+    )
+
+    spans = [json.loads(line) for line in trace_file.read_text().splitlines()]
+    names = [s["name"] for s in spans]
+    run = spans[-1]
+
+    assert run["name"] == "migri.run"
+    assert run["parent_span_id"] is None
+    assert names.count("migri.migration") == 3
+    assert {"migri.connect", "migri.initialize", "migri.discover", "migri.pending"} <= (
+        set(names)
+    )
+
+    migration_ids = {
+        s["span_id"]: s["attributes"]["migration"]
+        for s in spans
+        if s["name"] == "migri.migration"
+    }
+    statements = [
+        migration_ids.get(s["parent_span_id"])
+        for s in spans
+        if s["name"] == "migri.statement"
+    ]
+
+    # Statements of SQL migrations are nested in their migration's span
+    assert "0001_initial" in statements
+    assert "0003_record" in statements
+
+
+@pytest.mark.parametrize("pragmas", [None, FAST_PRAGMAS])
+async def test_apply_migrations_native(
+    migrations, sqlite_conn_factory, sqlite_connection_details, pragmas
+):
+    conn = get_connection(
+        sqlite_connection_details["db_name"], dialect="sqlite3", pragmas=pragmas
+    )
+    results = await apply_migrations(migrations["sqlite_a"], conn)
+
+    assert [r.status for r in results] == [MigrationStatus.SUCCESS] * 3
+
+    conn = sqlite_conn_factory()
+
+    async with conn:
+        accounts = await conn.fetch_all(Query("SELECT * FROM account"))
+        applied_migrations = await conn.fetch_all(
+            Query("SELECT * FROM applied_migration")
+        )
+
+    assert [a["name"] for a in accounts] == ["A Star", "B East", "C Me"]
+    assert len(applied_migrations) == 3
+
+
+async def test_apply_migrations_verify_on_clone(
+    capsys, migrations, sqlite_conn_factory
+):
+    conn = sqlite_conn_factory()
+    results = await apply_migrations(migrations["sqlite_a"], conn, verify_on_clone=True)
+
+    assert [r.status for r in results] == [MigrationStatus.SUCCESS] * 3
+
+    conn = sqlite_conn_factory()
+
+    async with conn:
+        applied_migrations = await conn.fetch_all(
+            Query("SELECT * FROM applied_migration")
+        )
+
+    assert len(applied_migrations) == 3
+
+    captured = capsys.readouterr()
+
+    assert captured.out.startswith("Verifying migrations on a clone of the database\n")
+    assert "0001_initial took " in captured.out
+
+
+async def test_apply_migrations_verify_on_clone_options(
+    migrations, sqlite_conn_factory
+):
+    probe = SimulatedLagProbe([0.0])
+    throttle = LagThrottle(probe, max_lag=1.0, interval=0.01)
+    results = await apply_migrations(
+        migrations["sqlite_a"],
+        sqlite_conn_factory(),
+        verify_on_clone=True,
+        throttle=throttle,
+    )
+
+    assert [r.status for r in results] == [MigrationStatus.SUCCESS] * 3
+    # Only the database itself is throttled
+    assert probe.checks == 3
+    assert throttle.throttled_seconds == 0.0
+
+
+async def test_apply_migrations_verify_on_clone_failure(
+    migrations, sqlite_conn_factory, tmp_path
+):
+    (tmp_path / "0001_initial.sql").write_text("CREATE TABLE account (id int);")
+    (tmp_path / "0002_broken.sql").write_text("INSERT INTO nope VALUES (1);")
+
+    conn = sqlite_conn_factory()
+    results = await apply_migrations(str(tmp_path), conn, verify_on_clone=True)
+
+    assert [r.status for r in results] == [
+        MigrationStatus.SUCCESS,
+        MigrationStatus.FAILURE,
+    ]
+
+    # Nothing was applied to the database itself
+    conn = sqlite_conn_factory()
+
+    async with conn:
+        tables = await conn.fetch_all(
+            Query("SELECT name FROM sqlite_master WHERE type='table'")
+        )
+
+    assert tables == []
+
+
+async def test_apply_migrations_upgrades_bookkeeping_schema(
+    migrations, monkeypatch, sqlite_conn_factory
+):
+    conn = sqlite_conn_factory()
+
+    # Table created by a version of migri without a versioned schema
+    async with conn:
+        await conn.execute(
+            Query(
+                "CREATE TABLE applied_migration (id integer PRIMARY KEY, "
+                "date_applied timestamp NOT NULL, name text NOT NULL)"
+            )
+        )
+        # Recorded twice, e.g. by runs that raced
+        for date_applied in ("2020-07-12", "2020-07-13"):
+            await conn.execute(
+                Query(
+                    "INSERT INTO applied_migration (date_applied, name) "
+                    "VALUES ($date_applied, '0001_initial')",
+                    values={"date_applied": date_applied},
+                )
+            )
+
+        await conn.database.commit()
+
+    results = await apply_migrations(migrations["sqlite_a"], sqlite_conn_factory())
+
+    assert [r.migration_name for r in results] == ["0002_add_accounts", "0003_record"]
+
+    conn = sqlite_conn_factory()
+
+    async with conn:
+        columns = await conn.fetch_all(
+            Query("SELECT name FROM pragma_table_info('applied_migration')")
+        )
+        indexes = await conn.fetch_all(
+            Query("SELECT name FROM pragma_index_list('applied_migration')")
+        )
+        applied = await conn.fetch_all(
+            Query(
+                "SELECT name, date_applied, duration FROM applied_migration "
+                "ORDER BY id"
+            )
+        )
+        version = await conn.fetch(Query("SELECT version FROM migri_schema_version"))
+
+    assert [c["name"] for c in columns] == [
+        "id",
+        "date_applied",
+        "name",
+        "checksum",
+        "duration",
+    ]
+    assert [i["name"] for i in indexes] == ["applied_migration_name_idx"]
+    # The first of the duplicates is kept
+    assert [a["date_applied"] for a in applied if a["name"] == "0001_initial"] == [
+        "2020-07-12"
+    ]
+    assert applied[0]["duration"] is None
+    assert all(a["duration"] is not None for a in applied[1:])
+    assert version["version"] == SCHEMA_VERSION
+
+    # Nothing to upgrade once the schema is current
+    async def fail(*args):
+        raise AssertionError("upgraded current schema")
+
+    monkeypatch.setattr(Initialize, "_upgrade", fail)
+    await apply_migrations(migrations["sqlite_a"], sqlite_conn_factory())
+
+
+async def test_initialize_upgrade_can_be_run_again(sqlite_conn_factory):
+    conn = sqlite_conn_factory()
+
+    async with conn:
+        await Initialize(conn).run()
+        # As if an upgrade failed after creating the index, e.g. with MySQL where
+        # each DDL statement commits
+        await conn.execute(Query("UPDATE migri_schema_version SET version = 3"))
+        await conn.database.commit()
+
+        await Initialize(conn).run()
+        version = await conn.fetch(Query("SELECT version FROM migri_schema_version"))
+
+    assert version["version"] == SCHEMA_VERSION
+
+
+async def test_apply_migrations_throttle(
+    capsys, migrations, sqlite_conn_factory, tmp_path
+):
+    probe = SimulatedLagProbe([3.0, 0.0])
+    metrics = OpenMetricsRecorder(path=str(tmp_path / "migri.prom"))
+    results = await apply_migrations(
+        migrations["sqlite_a"],
+        sqlite_conn_factory(),
+        metrics=metrics,
+        throttle=LagThrottle(probe, max_lag=1.0, interval=0.01),
+    )
+
+    assert [r.status for r in results] == [MigrationStatus.SUCCESS] * 3
+    # Checked before each migration, paused once before the first
+    assert probe.checks == 4
+    assert metrics.throttled_seconds > 0
+    assert "for replication lag" in capsys.readouterr().out.splitlines()[-1]
+
+
+async def test_apply_migrations_throttle_timeout(migrations, sqlite_conn_factory):
+    probe = SimulatedLagProbe([0.0, 10.0])
+    results = await apply_migrations(
+        migrations["sqlite_a"],
+        sqlite_conn_factory(),
+        throttle=LagThrottle(probe, max_lag=1.0, interval=0.01, timeout=0.03),
+    )
+
+    assert [r.status for r in results] == [
+        MigrationStatus.SUCCESS,
+        MigrationStatus.FAILURE,
+        MigrationStatus.FAILURE,
+    ]
+    assert results[1].message == "replication lag above --max-lag"
+    assert results[2].message == "previous migration failed"
+
+
+@pytest.mark.parametrize(
+    "header,expected_status",
+    [
+        ("-- migri:no-transaction\n", MigrationStatus.SUCCESS),
+        ("", MigrationStatus.FAILURE),
+    ],
+)
+async def test_apply_migrations_parallel_group(
+    sqlite_conn_factory, tmp_path, header, expected_status
+):
+    (tmp_path / "0001_initial.sql").write_text(
+        "CREATE TABLE account (id int, name text);\n"
+        "CREATE TABLE record (id int, date text);\n"
+    )
+    (tmp_path / "0002_indexes.sql").write_text(
+        f"{header}"
+        "-- migri:parallel jobs=2\n"
+        "CREATE INDEX account_name_idx ON account (name);\n"
+        "CREATE INDEX record_date_idx ON record (date);\n"
+        "-- migri:end-parallel\n"
+        "CREATE INDEX account_id_idx ON account (id);\n"
+    )
+
+    results = await apply_migrations(str(tmp_path), sqlite_conn_factory())
+
+    assert [r.status for r in results] == [MigrationStatus.SUCCESS, expected_status]
+
+    if expected_status == MigrationStatus.FAILURE:
+        assert results[1].message == "parallel groups require -- migri:no-transaction"
+        return
+
+    conn = sqlite_conn_factory()
+
+    async with conn:
+        indexes = await conn.fetch_all(
+            Query(
+                "SELECT name FROM sqlite_master WHERE type = 'index' "
+                "AND tbl_name IN ('account', 'record') ORDER BY name"
+            )
+        )
+
+    assert [i["name"] for i in indexes] == [
+        "account_id_idx",
+        "account_name_idx",
+        "record_date_idx",
+    ]
+
+
+@pytest.mark.parametrize("dialect", ["sqlite", "sqlite3"])
+async def test_apply_migrations_in_memory(tmp_path, dialect):
+    (tmp_path / "0001_initial.sql").write_text("CREATE TABLE account (id int);")
+    (tmp_path / "0002_accounts.sql").write_text("INSERT INTO account VALUES (1);")
+    db_name = str(tmp_path / "test.db")
+
+    # Previously applied migrations are loaded with the database
+    results = await apply_migrations(
+        str(tmp_path), get_connection(db_name, dialect=dialect, pragmas=FAST_PRAGMAS)
+    )
+    (tmp_path / "0003_more.sql").write_text("INSERT INTO account VALUES (2);")
+    results = await apply_migrations(
+        str(tmp_path), get_connection(db_name, dialect=dialect), in_memory=True
+    )
+
+    assert [r.migration_name for r in results] == ["0003_more"]
+    assert [r.status for r in results] == [MigrationStatus.SUCCESS]
+    assert [p.name for p in tmp_path.iterdir() if p.name.startswith(".")] == []
+
+    async with get_connection(db_name) as conn:
+        accounts = await conn.fetch_all(Query("SELECT id FROM account"))
+        journal_mode = await conn.fetch(Query("PRAGMA journal_mode"))
+
+    assert [a["id"] for a in accounts] == [1, 2]
+    # Restored after the run, so the file isn't switched to WAL mode
+    assert journal_mode["journal_mode"] == "delete"
+
+
+async def test_apply_migrations_in_memory_failure(tmp_path):
+    (tmp_path / "0001_initial.sql").write_text("CREATE TABLE account (id int);")
+    db_file = tmp_path / "test.db"
+    await apply_migrations(str(tmp_path), get_connection(str(db_file)))
+    before = db_file.read_bytes()
+
+    (tmp_path / "0002_accounts.sql").write_text("INSERT INTO account VALUES (1);")
+    (tmp_path / "0003_broken.sql").write_text("INSERT INTO nope VALUES (1);")
+    results = await apply_migrations(
+        str(tmp_path), get_connection(str(db_file)), in_memory=True
+    )
+
+    assert [r.status for r in results] == [
+        MigrationStatus.SUCCESS,
+        MigrationStatus.FAILURE,
+    ]
+    assert db_file.read_bytes() == before
+
+
+async def test_apply_migrations_in_memory_new_database(migrations, tmp_path):
+    db_name = str(tmp_path / "new.db")
+    results = await apply_migrations(
+        migrations["sqlite_a"], get_connection(db_name), in_memory=True
+    )
+
+    assert [r.status for r in results] == [MigrationStatus.SUCCESS] * 3
+
+    async with get_connection(db_name) as conn:
+        accounts = await conn.fetch_all(Query("SELECT * FROM account"))
+
+    assert len(accounts) == 3
+
+
+async def test_apply_migrations_session_settings(sqlite_conn_factory, tmp_path):
+    (tmp_path / "0001_default.py").write_text(
+        "async def migrate(conn):\n"
+        "    cursor = await conn.execute('PRAGMA cache_size')\n"
+        "    return (await cursor.fetchone())[0] == -1000\n"
+    )
+    (tmp_path / "0002_declared.sql").write_text(
+        "-- migri:set cache_size=-3000\n"
+        "CREATE TABLE pragma_value AS SELECT * FROM pragma_cache_size;\n"
+    )
+
+    conn = sqlite_conn_factory()
+    results = await apply_migrations(
+        str(tmp_path),
+        conn,
+        force_close_conn=False,
+        session_settings={"cache_size": -1000},
+    )
+
+    assert [r.status for r in results] == [MigrationStatus.SUCCESS] * 2
+    # Migrations see their settings, the previous value is restored afterwards
+    assert await conn.fetch(Query("SELECT * FROM pragma_value")) == {
+        "cache_size": -3000
+    }
+    assert await conn.fetch(Query("PRAGMA cache_size")) == {"cache_size": -2000}
+
+    await conn.disconnect()
+
+
+async def test_apply_migrations_session_settings_restored_on_failure(
+    sqlite_conn_factory, tmp_path
+):
+    (tmp_path / "0001_failure.sql").write_text(
+        "-- migri:set cache_size=-3000\n" "INSERT INTO no_such_table VALUES (1);\n"
+    )
+
+    conn = sqlite_conn_factory()
+    results = await apply_migrations(str(tmp_path), conn, force_close_conn=False)
+
+    # Pragmas aren't rolled back with the transaction
+    assert [r.status for r in results] == [MigrationStatus.FAILURE]
+    assert await conn.fetch(Query("PRAGMA cache_size")) == {"cache_size": -2000}
+
+    await conn.disconnect()
+
+
+async def test_apply_migrations_account_resources(
+    capsys, migrations, sqlite_conn_factory
+):
+    results = await apply_migrations(
+        migrations["sqlite_a"], sqlite_conn_factory(), account_resources=True
+    )
+
+    assert [r.status for r in results] == [MigrationStatus.SUCCESS] * 3
+    # Three accounts and the migration's own applied_migration row
+    assert results[1].resources["rows"] == 4
+    assert results[0].resources["size_bytes"] > 0
+    assert results[1].to_dict()["resources"] == results[1].resources
+    assert "0002_add_accounts...ok (rows=4, size_bytes=" in capsys.readouterr().out
+
+
+async def test_apply_migrations_tags_statements(tmp_path):
+    (tmp_path / "0001_initial.sql").write_text(
+        "CREATE TABLE account (id int);\nINSERT INTO account VALUES (1);\n"
+    )
+    statements = []
+    conn = get_connection(str(tmp_path / "test.db"), dialect="sqlite3")
+    await conn.connect()
+    conn.database.connection.set_trace_callback(statements.append)
+
+    await Initialize(conn).run()
+    await Migrate(conn, account_resources=True).run(str(tmp_path))
+    await conn.disconnect()
+
+    assert "/* migri:0001_initial */ CREATE TABLE account (id int);" in statements
+    assert "/* migri:0001_initial */ INSERT INTO account VALUES (1);" in statements
+
+
+async def test_apply_migrations_untagged_statements(tmp_path):
+    (tmp_path / "0001_initial.sql").write_text("CREATE TABLE account (id int);\n")
+    statements = []
+    conn = get_connection(str(tmp_path / "test.db"), dialect="sqlite3")
+    await conn.connect()
+    conn.database.connection.set_trace_callback(statements.append)
+
+    await Initialize(conn).run()
+    await Migrate(conn).run(str(tmp_path))
+    await conn.disconnect()
+
+    # Statements are executed as they're written without resource accounting
+    assert "CREATE TABLE account (id int);" in statements
+
+
+async def test_migrate_state_per_instance(sqlite_conn_factory):
+    conn = sqlite_conn_factory()
+    first, second = Migrate(conn), Migrate(conn)
+    initialize = Initialize(conn)
+
+    assert first.watchdog is not second.watchdog
+    assert initialize.watchdog is not first.watchdog
+    assert first._migration_settings is not second._migration_settings
+
+
+async def test_apply_migrations_analyze(capsys, tmp_path):
+    (tmp_path / "0001_initial.sql").write_text(
+        "CREATE TABLE account (id int, zone text);\n"
+        "CREATE INDEX account_zone_idx ON account (zone);\n"
+        "CREATE TABLE record (id int);\n"
+        "CREATE INDEX record_id_idx ON record (id);\n"
+    )
+    (tmp_path / "0002_load.sql").write_text(
+        "INSERT INTO account VALUES (1, 'eu'), (2, 'eu'), (3, 'us');\n"
+        "SELECT COUNT(*) FROM record;\n"
+    )
+    (tmp_path / "0003_backfill.py").write_text(
+        'ANALYZE_TABLES = ["record"]\n\n\n'
+        "async def migrate(conn):\n"
+        "    await conn.execute('INSERT INTO record VALUES (1), (2)')\n"
+        "    return True\n"
+    )
+    conn = get_connection(str(tmp_path / "test.db"))
+    results = await apply_migrations(str(tmp_path), conn, analyze=True)
+
+    assert [r.status for r in results] == [MigrationStatus.SUCCESS] * 3
+    assert "Analyzed 2 tables in" in capsys.readouterr().out
+
+    await conn.connect()
+    stats = await conn.fetch_all(Query("SELECT tbl, idx, stat FROM sqlite_stat1"))
+    await conn.disconnect()
+
+    assert sorted((s["tbl"], s["idx"], s["stat"]) for s in stats) == [
+        ("account", "account_zone_idx", "3 2"),
+        ("record", "record_id_idx", "2 1"),
+    ]
+
+
+async def test_apply_migrations_coalesce_alters_unsupported(tmp_path):
+    (tmp_path / "0001_initial.sql").write_text(
+        "CREATE TABLE account (id int);\n"
+        "ALTER TABLE account ADD COLUMN name text;\n"
+        "ALTER TABLE account ADD COLUMN zone text;\n"
+    )
+    results = await apply_migrations(
+        str(tmp_path), get_connection(str(tmp_path / "test.db")), coalesce_alters=True
+    )
+
+    # SQLite takes one action per ALTER TABLE, so statements run as written
+    assert [r.status for r in results] == [MigrationStatus.SUCCESS]
+
+
+@pytest.mark.parametrize(
+    "ext,compress",
+    [(".gz", gzip.compress), (".bz2", bz2.compress), (".xz", lzma.compress)],
+)
+async def test_apply_migrations_compressed(monkeypatch, tmp_path, ext, compress):
+    # Small batches, so statements are read while earlier ones are applied
+    monkeypatch.setattr("migri.directives.BATCH_STATEMENTS", 2)
+    inserts = "".join(f"INSERT INTO account VALUES ({i});\n" for i in range(5))
+    (tmp_path / "0001_initial.sql").write_text("CREATE TABLE account (id int);")
+    (tmp_path / f"0002_seed.sql{ext}").write_bytes(
+        compress(f"{inserts}CREATE INDEX account_id_idx ON account (id);\n".encode())
+    )
+    db_name = str(tmp_path / "test.db")
+
+    results = await apply_migrations(str(tmp_path), get_connection(db_name))
+
+    assert [(r.migration_name, r.status) for r in results] == [
+        ("0001_initial", MigrationStatus.SUCCESS),
+        ("0002_seed", MigrationStatus.SUCCESS),
+    ]
+
+    async with get_connection(db_name) as conn:
+        accounts = await conn.fetch_all(Query("SELECT * FROM account"))
+        applied = await conn.fetch_all(
+            Query("SELECT checksum FROM applied_migration WHERE name = '0002_seed'")
+        )
+
+    assert len(accounts) == 5
+    # Of the compressed file, which is the one deployed
+    assert applied[0]["checksum"] == hash_file(str(tmp_path / f"0002_seed.sql{ext}"))
+
+
+async def test_apply_migrations_data(tmp_path):
+    (tmp_path / "0001_initial.sql").write_text(
+        "CREATE TABLE country (code text PRIMARY KEY, name text, population int);\n"
+        "CREATE TABLE zone (name text);\n"
+    )
+    (tmp_path / "0002_countries.csv").write_text(
+        "# migri:load table=country\n"
+        "code,name,population\n"
+        "nz,New Zealand,5100000\n"
+        "aq,Antarctica,\n"
+    )
+    (tmp_path / "0003_zones.tsv.gz").write_bytes(
+        gzip.compress(b"# migri:load table=zone\nname\nPacific/Auckland\n")
+    )
+    # Without a table, and rolled back
+    (tmp_path / "0004_more_countries.csv").write_text("code\nch\n")
+    db_name = str(tmp_path / "test.db")
+
+    results = await apply_migrations(str(tmp_path), get_connection(db_name))
+
+    assert [r.status for r in results] == [MigrationStatus.SUCCESS] * 3 + [
+        MigrationStatus.FAILURE
+    ]
+    assert results[3].message == "Expected # migri:load table=... in data migration"
+
+    async with get_connection(db_name) as conn:
+        countries = await conn.fetch_all(Query("SELECT * FROM country ORDER BY code"))
+        zones = await conn.fetch_all(Query("SELECT * FROM zone"))
+        applied = await conn.fetch_all(Query("SELECT name FROM applied_migration"))
+
+    assert [tuple(c.values()) for c in countries] == [
+        ("aq", "Antarctica", None),
+        ("nz", "New Zealand", 5100000),
+    ]
+    assert [z["name"] for z in zones] == ["Pacific/Auckland"]
+    assert [a["name"] for a in applied] == [
+        "0001_initial",
+        "0002_countries",
+        "0003_zones",
+    ]
@@ -0,0 +1,89 @@
+import pytest
+
+from migri import apply_migrations, get_connection
+from migri.backfill import parallel_backfill, split_key_range
+from migri.elements import Query
+from migri.migration import MigrationStatus
+
+MIGRATION = """
+from migri.backfill import parallel_backfill
+
+TRANSACTION = False
+
+
+async def migrate(conn, backend):
+    await conn.execute("CREATE TABLE account (id integer PRIMARY KEY, zone text)")
+    await conn.executemany(
+        "INSERT INTO account (id) VALUES (?)", [(i,) for i in range(1, 1001)]
+    )
+    await conn.commit()
+
+    result = await parallel_backfill(
+        backend,
+        "account",
+        "id",
+        "UPDATE account SET zone = 'eu' WHERE id > $lower AND id <= $upper",
+        partitions=3,
+        batch_size=100,
+    )
+
+    return result.rows == 1000
+"""
+
+
+@pytest.mark.parametrize(
+    "lower,upper,partitions,expected",
+    [
+        (1, 10, 2, [(0, 5), (5, 10)]),
+        (1, 10, 3, [(0, 4), (4, 8), (8, 10)]),
+        (5, 5, 4, [(4, 5)]),
+    ],
+)
+def test_split_key_range(lower, upper, partitions, expected):
+    assert split_key_range(lower, upper, partitions) == expected
+
+
+@pytest.mark.asyncio
+async def test_parallel_backfill_migration(tmp_path):
+    migrations_dir = tmp_path / "migrations"
+    migrations_dir.mkdir()
+    (migrations_dir / "0001_backfill.py").write_text(MIGRATION)
+    db_name = str(tmp_path / "test.db")
+
+    results = await apply_migrations(str(migrations_dir), get_connection(db_name))
+
+    assert [r.status for r in results] == [MigrationStatus.SUCCESS]
+
+    async with get_connection(db_name) as conn:
+        zones = await conn.fetch_all(
+            Query("SELECT zone, COUNT(*) AS total FROM account GROUP BY zone")
+        )
+
+    assert zones == [{"zone": "eu", "total": 1000}]
+
+
+@pytest.mark.asyncio
+async def test_parallel_backfill_function(tmp_path):
+    db_name = str(tmp_path / "test.db")
+    batches = []
+
+    async with get_connection(db_name) as conn:
+        await conn.execute(Query("CREATE TABLE account (id integer PRIMARY KEY)"))
+
+        for i in (1, 2, 3, 50, 51, 99):
+            await conn.execute(Query("INSERT INTO account VALUES ($id)", {"id": i}))
+
+        await conn.database.commit()
+
+        async def work(connection, lower, upper):
+            batches.append((lower, upper))
+            return upper - lower
+
+        result = await parallel_backfill(
+            conn, "account", "id", work, partitions=2, batch_size=2
+        )
+
+    # Batches follow the keys that exist, not the key range
+    assert sorted(batches) == [(0, 2), (2, 50), (50, 99)]
+    assert [p.done for p in result.partitions] == [True, True]
+    assert result.rows == sum(upper - lower for lower, upper in batches)
@@ -0,0 +1,116 @@
+import gzip
+import sys
+
+import pytest
+
+from migri import apply_migrations, bundle_migrations, get_connection, verify_migrations
+from migri.bundle import is_bundle, read_bundle
+from migri.elements import Query
+from migri.migration import BundledMigration, MigrationFilesMixin, MigrationStatus
+
+
+@pytest.mark.asyncio
+async def test_apply_migrations_from_bundle(migrations, tmp_path):
+    bundle_path = str(tmp_path / "migrations.zip")
+    db_name = str(tmp_path / "test.db")
+
+    assert bundle_migrations(migrations["sqlite_a"], bundle_path) == 3
+    assert is_bundle(bundle_path) and not is_bundle(migrations["sqlite_a"])
+
+    results = await apply_migrations(bundle_path, get_connection(db_name))
+
+    assert [r.status for r in results] == [MigrationStatus.SUCCESS] * 3
+
+    async with get_connection(db_name) as conn:
+        accounts = await conn.fetch_all(Query("SELECT * FROM account"))
+
+    assert len(accounts) == 3
+    # Checksums of the bundled files match the files themselves
+    assert await verify_migrations(bundle_path, get_connection(db_name)) == []
+    assert (
+        await verify_migrations(migrations["sqlite_a"], get_connection(db_name)) == []
+    )
+
+
+def test_bundle_contents(migrations, tmp_path):
+    bundle_path = str(tmp_path / "migrations.zip")
+    bundle_migrations(migrations["sqlite_a"], bundle_path)
+    files = MigrationFilesMixin().get_migrations(migrations["sqlite_a"])
+    bundled = MigrationFilesMixin().get_migrations(bundle_path)
+
+    assert all(isinstance(m, BundledMigration) for m in bundled)
+    assert [(m.name, m.file_ext, m.checksum) for m in bundled] == [
+        (m.name, m.file_ext, m.checksum) for m in files
+    ]
+    assert bundled[0].blocks == files[0].blocks
+    assert bundled[1].directives == files[1].directives
+    assert bundled[0].abspath == f"{bundle_path}/0001_initial.sql"
+
+
+@pytest.mark.asyncio
+async def test_bundle_compiles_source_of_other_python_versions(
+    migrations, monkeypatch, tmp_path
+):
+    bundle_path = str(tmp_path / "migrations.zip")
+    bundle_migrations(migrations["sqlite_a"], bundle_path)
+    monkeypatch.setattr("migri.bundle.MAGIC_NUMBER", b"\0\0\r\n")
+
+    results = await apply_migrations(
+        bundle_path, get_connection(str(tmp_path / "test.db"))
+    )
+
+    assert [r.status for r in results] == [MigrationStatus.SUCCESS] * 3
+
+
+def test_read_bundle_from_package(migrations, monkeypatch, tmp_path):
+    package = tmp_path / "migri_bundled_app"
+    package.mkdir()
+    (package / "__init__.py").write_text("")
+    bundle_migrations(migrations["sqlite_a"], str(package / "migrations.zip"))
+    monkeypatch.syspath_prepend(str(tmp_path))
+
+    try:
+        bundle = read_bundle("migri_bundled_app:migrations.zip")
+    finally:
+        sys.modules.pop("migri_bundled_app", None)
+
+    assert bundle.source == "migri_bundled_app:migrations.zip"
+    assert [e["name"] for e in bundle.entries] == [
+        "0001_initial",
+        "0002_add_accounts",
+        "0003_record",
+    ]
+
+
+def test_read_bundle_invalid(tmp_path):
+    path = tmp_path / "migrations.zip"
+    path.write_bytes(b"PK\x05\x06" + b"\0" * 18)
+
+    with pytest.raises(ValueError):
+        read_bundle(str(path))
+
+    with pytest.raises(FileNotFoundError):
+        read_bundle(str(tmp_path / "missing.zip"))
+
+
+@pytest.mark.asyncio
+async def test_apply_data_migrations_from_bundle(tmp_path):
+    migrations_dir = tmp_path / "migrations"
+    migrations_dir.mkdir()
+    (migrations_dir / "0001_initial.sql").write_text("CREATE TABLE zone (name text);")
+    (migrations_dir / "0002_zones.csv.gz").write_bytes(
+        gzip.compress(b"# migri:load table=zone\nname\nPacific/Auckland\n")
+    )
+    bundle_path = str(tmp_path / "migrations.zip")
+    db_name = str(tmp_path / "test.db")
+    bundle_migrations(str(migrations_dir), bundle_path)
+
+    results = await apply_migrations(bundle_path, get_connection(db_name))
+
+    assert [r.status for r in results] == [MigrationStatus.SUCCESS] * 2
+
+    async with get_connection(db_name) as conn:
+        zones = await conn.fetch_all(Query("SELECT * FROM zone"))
+
+    assert [z["name"] for z in zones] == ["Pacific/Auckland"]
+    assert await verify_migrations(str(migrations_dir), get_connection(db_name)) == []
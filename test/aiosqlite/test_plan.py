@@ -0,0 +1,35 @@
+import pytest
+
+from migri import plan_migrations
+from migri.elements import Query
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_plan_migrations(migrations, sqlite_conn_factory):
+    conn = sqlite_conn_factory()
+
+    async with conn:
+        await conn.execute(
+            Query("CREATE TABLE account (id integer PRIMARY KEY, name text)")
+        )
+        await conn.database.commit()
+
+    plans = await plan_migrations(migrations["sqlite_b"], sqlite_conn_factory())
+
+    assert len(plans) == 1
+    assert plans[0].migration_name == "0001_update_accounts"
+    assert [
+        (s.statement_number, s.sequential_scans, s.error) for s in plans[0].statements
+    ] == [(1, (), None), (3, ("account",), None)]
+
+    # Nothing was applied
+    conn = sqlite_conn_factory()
+
+    async with conn:
+        tables = await conn.fetch_all(
+            Query("SELECT name FROM sqlite_master WHERE type='table'")
+        )
+
+    # Nor was the bookkeeping schema created
+    assert [t["name"] for t in tables] == ["account"]
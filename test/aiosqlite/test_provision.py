@@ -0,0 +1,56 @@
+import shutil
+
+import pytest
+
+from migri import get_connection, provision_databases
+from migri.elements import Query
+from migri.provision import fingerprint_migrations, SQLiteProvision
+
+
+@pytest.mark.asyncio
+async def test_provision_databases(capsys, migrations, tmp_path):
+    migrations_dir = tmp_path / "migrations"
+    shutil.copytree(migrations["sqlite_a"], migrations_dir)
+    conn = get_connection(str(tmp_path / "test.db"))
+
+    copies = await provision_databases(str(migrations_dir), conn, 2)
+
+    assert [c.db_name for c in copies] == [
+        str(tmp_path / "test_0.db"),
+        str(tmp_path / "test_1.db"),
+    ]
+
+    for copy in copies:
+        async with copy:
+            accounts = await copy.fetch_all(Query("SELECT * FROM account"))
+
+        assert [a["name"] for a in accounts] == ["A Star", "B East", "C Me"]
+
+    assert "Building template" in capsys.readouterr().out
+
+    # Template is reused while migrations don't change
+    await provision_databases(str(migrations_dir), conn, 2)
+    assert "Building template" not in capsys.readouterr().out
+
+    (migrations_dir / "0004_zone.sql").write_text(
+        "ALTER TABLE account ADD COLUMN zone text;"
+    )
+    copies = await provision_databases(str(migrations_dir), conn, 1)
+    assert "Building template" in capsys.readouterr().out
+
+    async with copies[0]:
+        applied = await copies[0].fetch_all(Query("SELECT * FROM applied_migration"))
+
+    assert len(applied) == 4
+
+
+def test_fingerprint_migrations(migrations):
+    task = SQLiteProvision(get_connection("test.db"))
+    migration_files = task.get_migrations(migrations["sqlite_a"])
+
+    assert fingerprint_migrations(migration_files) == fingerprint_migrations(
+        migration_files
+    )
+    assert fingerprint_migrations(migration_files) != fingerprint_migrations(
+        migration_files[:-1]
+    )
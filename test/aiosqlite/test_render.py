@@ -0,0 +1,56 @@
+import sqlite3
+
+import pytest
+
+from migri import apply_migrations, get_connection, render_migrations, verify_migrations
+from migri.elements import Query
+from migri.migration import MigrationStatus
+
+
+@pytest.mark.asyncio
+async def test_render_migrations(tmp_path):
+    migrations_dir = tmp_path / "migrations"
+    migrations_dir.mkdir()
+    db_name = str(tmp_path / "test.db")
+    (migrations_dir / "0001_initial.sql").write_text(
+        "CREATE TABLE account (id integer PRIMARY KEY, name text NOT NULL);"
+    )
+    await apply_migrations(str(migrations_dir), get_connection(db_name))
+    (migrations_dir / "0002_accounts.sql").write_text(
+        "INSERT INTO account (name) VALUES ('A Star');\n"
+        "INSERT INTO account (name) VALUES ('O''Brien');\n"
+    )
+
+    script = await render_migrations(str(migrations_dir), get_connection(db_name))
+
+    # Only the pending migration, nothing is written to the database
+    assert script.ok
+    assert [(r.migration_name, r.status) for r in script.results] == [
+        ("0002_accounts", MigrationStatus.SUCCESS)
+    ]
+    assert "CREATE TABLE account" not in script.sql
+
+    with sqlite3.connect(db_name) as db:
+        assert db.execute("SELECT count(*) FROM account").fetchone() == (0,)
+        db.executescript(script.sql)
+
+    async with get_connection(db_name) as conn:
+        accounts = await conn.fetch_all(Query("SELECT name FROM account"))
+        applied = await conn.fetch_all(Query("SELECT name FROM applied_migration"))
+
+    assert [a["name"] for a in accounts] == ["A Star", "O'Brien"]
+    assert [a["name"] for a in applied] == ["0001_initial", "0002_accounts"]
+    assert await verify_migrations(str(migrations_dir), get_connection(db_name)) == []
+
+
+@pytest.mark.asyncio
+async def test_render_migrations_driver_connection(migrations):
+    script = await render_migrations(migrations["sqlite_a"], dialect="sqlite")
+
+    assert not script.ok
+    assert [r.status for r in script.results] == [
+        MigrationStatus.SUCCESS,
+        MigrationStatus.FAILURE,
+        MigrationStatus.FAILURE,
+    ]
+    assert "can't be recorded" in script.results[1].message
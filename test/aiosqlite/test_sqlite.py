@@ -1,6 +1,11 @@
 import pytest
 
-from migri.backends.sqlite import SQLiteConnection
+from migri.backends.sqlite import (
+    FAST_PRAGMAS,
+    SQLiteConnection,
+    SQLiteNativeConnection,
+)
+from migri.elements import Query
 from test import QUERIES
 
 
@@ -24,3 +29,38 @@ def test_compile(query_element, expected_query, expected_values):
         "query": expected_query,
         "values": expected_values,
     }
+
+
+@pytest.mark.asyncio
+async def test_pragmas_are_restored(sqlite_conn_factory, sqlite_connection_details):
+    conn = SQLiteConnection(sqlite_connection_details["db_name"], pragmas=FAST_PRAGMAS)
+
+    async with conn:
+        journal_mode = await conn.fetch(Query("PRAGMA journal_mode"))
+        synchronous = await conn.fetch(Query("PRAGMA synchronous"))
+        temp_store = await conn.fetch(Query("PRAGMA temp_store"))
+
+    assert journal_mode["journal_mode"] == "wal"
+    assert synchronous["synchronous"] == 1  # NORMAL
+    assert temp_store["temp_store"] == 2  # MEMORY
+
+    conn = sqlite_conn_factory()
+
+    async with conn:
+        journal_mode = await conn.fetch(Query("PRAGMA journal_mode"))
+
+    assert journal_mode["journal_mode"] == "delete"
+
+
+@pytest.mark.asyncio
+async def test_native_fetch_without_row(tmp_path):
+    async with SQLiteNativeConnection(str(tmp_path / "test.db")) as conn:
+        row = await conn.fetch(Query("SELECT 1 AS one WHERE 0"))
+
+    assert row is None
+
+
+@pytest.mark.parametrize("name,value", [("journal_mode; DROP", "wal"), ("x", "1; x")])
+def test_invalid_pragma(name, value):
+    with pytest.raises(ValueError):
+        SQLiteConnection._pragma_statement(name, value)
@@ -0,0 +1,203 @@
+import importlib.util
+import multiprocessing
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from migri import apply_migrations, bundle_migrations, get_connection
+from migri.elements import Query
+from migri.migration import MigrationFilesMixin, MigrationStatus
+from migri.transform import _init_worker, _locate, _transform_batch, transform_rows
+
+MIGRATION = """
+import hashlib
+
+from migri.transform import transform_rows
+
+
+def digest(row):
+    if row["id"] % 10 == 0:
+        return None
+
+    return {"id": row["id"], "digest": hashlib.sha256(row["name"].encode()).hexdigest()}
+
+
+async def migrate(conn, backend):
+    await conn.execute(
+        "CREATE TABLE account (id integer PRIMARY KEY, name text, digest text)"
+    )
+    await conn.executemany(
+        "INSERT INTO account (id, name) VALUES (?, ?)",
+        [(i, f"account {i}") for i in range(1, 501)],
+    )
+
+    result = await transform_rows(
+        backend,
+        "SELECT id, name FROM account ORDER BY id",
+        digest,
+        "UPDATE account SET digest = $digest WHERE id = $id",
+        batch_size=64,
+        workers=2,
+        queue_size=1,
+    )
+
+    return result.rows_read == 500 and result.rows_written == 450
+"""
+
+
+def upper_name(row):
+    return {"id": row["id"], "name": row["name"].upper()}
+
+
+def upper_code(row):
+    return {"code": row["code"], "name": row["name"].upper()}
+
+
+@pytest.mark.asyncio
+async def test_transform_rows_migration(tmp_path):
+    migrations_dir = tmp_path / "migrations"
+    migrations_dir.mkdir()
+    (migrations_dir / "0001_digest.py").write_text(MIGRATION)
+    db_name = str(tmp_path / "test.db")
+
+    results = await apply_migrations(str(migrations_dir), get_connection(db_name))
+
+    assert [r.status for r in results] == [MigrationStatus.SUCCESS]
+
+    async with get_connection(db_name) as conn:
+        rows = await conn.fetch_all(
+            Query("SELECT id, digest FROM account WHERE id IN (1, 10) ORDER BY id")
+        )
+
+    assert len(rows[0]["digest"]) == 64
+    assert rows[1]["digest"] is None
+
+
+@pytest.mark.asyncio
+async def test_transform_rows_write_function(tmp_path):
+    db_name = str(tmp_path / "test.db")
+    batches = []
+
+    async def write(connection, rows):
+        batches.append([r["name"] for r in rows])
+
+    async with get_connection(db_name) as conn:
+        await conn.execute(Query("CREATE TABLE account (id integer, name text)"))
+
+        for i in range(5):
+            await conn.execute(
+                Query("INSERT INTO account VALUES ($id, $name)", {"id": i, "name": "a"})
+            )
+
+        result = await transform_rows(
+            conn, "SELECT * FROM account", upper_name, write, batch_size=2, workers=1
+        )
+
+    assert batches == [["A", "A"], ["A", "A"], ["A"]]
+    assert result.batches == 3
+
+
+@pytest.mark.asyncio
+async def test_transform_rows_rejects_lambda(tmp_path):
+    async with get_connection(str(tmp_path / "test.db")) as conn:
+        with pytest.raises(ValueError):
+            await transform_rows(conn, "SELECT 1", lambda row: row, "SELECT 1")
+
+
+@pytest.mark.asyncio
+async def test_transform_rows_reads_before_writing(tmp_path):
+    async with get_connection(str(tmp_path / "test.db")) as conn:
+        await conn.execute(
+            Query("CREATE TABLE account (id integer PRIMARY KEY, name text)")
+        )
+
+        for i in range(1, 101):
+            await conn.execute(
+                Query("INSERT INTO account (name) VALUES ($name)", {"name": f"a{i}"})
+            )
+
+        # Rows written to the table being read aren't read again
+        result = await transform_rows(
+            conn,
+            "SELECT id, name FROM account ORDER BY id",
+            upper_name,
+            "INSERT INTO account (name) VALUES ($name)",
+            batch_size=2,
+            workers=1,
+            queue_size=1,
+        )
+        count = await conn.fetch(Query("SELECT COUNT(*) AS count FROM account"))
+
+    assert result.rows_read == 100
+    assert count["count"] == 200
+
+
+@pytest.mark.asyncio
+async def test_transform_rows_pages_shared_connection(tmp_path, monkeypatch):
+    async with get_connection(str(tmp_path / "test.db")) as conn:
+        await conn.execute(Query("CREATE TABLE account (code text, name text)"))
+
+        for i in range(7):
+            await conn.execute(
+                Query(
+                    "INSERT INTO account VALUES ($code, $name)",
+                    {"code": f"c{i}", "name": f"a{i}"},
+                )
+            )
+
+        fetch_all = conn.fetch_all
+        fetched = []
+
+        async def counting_fetch_all(query):
+            rows = await fetch_all(query)
+            fetched.append(len(rows))
+            return rows
+
+        monkeypatch.setattr(conn, "fetch_all", counting_fetch_all)
+        names = []
+
+        async def write(connection, rows):
+            names.extend(r["name"] for r in rows)
+
+        result = await transform_rows(
+            conn,
+            Query("SELECT code, name FROM account WHERE name != $skip", {"skip": "a3"}),
+            upper_code,
+            write,
+            batch_size=2,
+            workers=1,
+            reader=conn,
+            key="code",
+        )
+
+    assert result.rows_read == 6
+    assert fetched == [2, 2, 2]
+    assert names == ["A0", "A1", "A2", "A4", "A5", "A6"]
+
+
+def test_transform_worker_loads_bundled_migration(monkeypatch, tmp_path):
+    migrations_dir = tmp_path / "migrations"
+    migrations_dir.mkdir()
+    (migrations_dir / "0001_digest.py").write_text(MIGRATION)
+    bundle_path = str(tmp_path / "migrations.zip")
+    bundle_migrations(str(migrations_dir), bundle_path)
+
+    # Loaded like migri loads migrations, the bundle isn't a file workers can read
+    (migration,) = MigrationFilesMixin().get_migrations(bundle_path)
+    spec = migration.module_spec("migri_migration_0001_digest")
+    module = importlib.util.module_from_spec(spec)
+    monkeypatch.setitem(sys.modules, spec.name, module)
+    spec.loader.exec_module(module)
+
+    with ProcessPoolExecutor(
+        max_workers=1,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=_locate(module.digest),
+    ) as executor:
+        rows = executor.submit(
+            _transform_batch, [{"id": 1, "name": "a"}, {"id": 10, "name": "b"}]
+        ).result()
+
+    assert [r["id"] for r in rows] == [1]
@@ -0,0 +1,72 @@
+import shutil
+
+import pytest
+
+from migri import apply_migrations, get_connection, verify_migrations
+from migri.drift import DriftStatus
+from migri.elements import Query
+
+
+@pytest.mark.asyncio
+async def test_verify_migrations(migrations, tmp_path):
+    migrations_dir = tmp_path / "migrations"
+    shutil.copytree(migrations["sqlite_a"], migrations_dir)
+    db_name = str(tmp_path / "test.db")
+
+    await apply_migrations(str(migrations_dir), get_connection(db_name))
+
+    assert await verify_migrations(str(migrations_dir), get_connection(db_name)) == []
+
+    (migrations_dir / "0001_initial.sql").write_text("CREATE TABLE x (id int);")
+    (migrations_dir / "0002_add_accounts.py").unlink()
+
+    async with get_connection(db_name) as conn:
+        await conn.execute(
+            Query(
+                "UPDATE applied_migration SET checksum = NULL "
+                "WHERE name = '0003_record'"
+            )
+        )
+        await conn.database.commit()
+
+    drift = await verify_migrations(
+        str(migrations_dir),
+        get_connection(db_name),
+        cache_path=str(tmp_path / "checksums.json"),
+    )
+
+    assert [(d.migration_name, d.status) for d in drift] == [
+        ("0001_initial", DriftStatus.CHANGED),
+        ("0002_add_accounts", DriftStatus.MISSING),
+        ("0003_record", DriftStatus.UNKNOWN),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_verify_migrations_new_database(migrations, tmp_path):
+    db_name = str(tmp_path / "test.db")
+
+    assert (
+        await verify_migrations(migrations["sqlite_a"], get_connection(db_name)) == []
+    )
+
+    # Read-only, the bookkeeping schema isn't created
+    async with get_connection(db_name) as conn:
+        tables = await conn.fetch_all(
+            Query("SELECT name FROM sqlite_master WHERE type='table'")
+        )
+
+    assert tables == []
+
+
+@pytest.mark.asyncio
+async def test_verify_migrations_outdated_schema(migrations, tmp_path):
+    db_name = str(tmp_path / "test.db")
+    await apply_migrations(migrations["sqlite_a"], get_connection(db_name))
+
+    async with get_connection(db_name) as conn:
+        await conn.execute(Query("UPDATE migri_schema_version SET version = 3"))
+        await conn.database.commit()
+
+    with pytest.raises(RuntimeError, match="Bookkeeping schema is at version 3"):
+        await verify_migrations(migrations["sqlite_a"], get_connection(db_name))
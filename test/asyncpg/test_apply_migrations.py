@@ -92,8 +92,11 @@ async def test_apply_migrations_none(capsys, migrations, postgresql_conn_factory
         )
         tables = await conn.fetch_all(tables_query)
 
-    assert len(tables) == 1  # applied_migration expected
-    assert tables[0]["table_name"] == "applied_migration"
+    # Only bookkeeping tables expected
+    assert sorted(t["table_name"] for t in tables) == [
+        "applied_migration",
+        "migri_schema_version",
+    ]
 
     # Check output
     captured = capsys.readouterr()
@@ -118,8 +121,11 @@ async def test_apply_migrations_dry_run(capsys, migrations, postgresql_conn_fact
         )
         tables = await conn.fetch_all(tables_query)
 
-    assert len(tables) == 1  # applied_migration expected
-    assert tables[0]["table_name"] == "applied_migration"
+    # Only bookkeeping tables expected
+    assert sorted(t["table_name"] for t in tables) == [
+        "applied_migration",
+        "migri_schema_version",
+    ]
 
     # Check output
     captured = capsys.readouterr()
@@ -155,11 +161,12 @@ async def test_apply_migrations_with_empty_statement_successful(
         )
         tables = await conn.fetch_all(tables_query)
 
-    assert len(tables) == 3
+    assert len(tables) == 4
 
     for table in tables:
         assert table["table_name"] in [
             "applied_migration",
+            "migri_schema_version",
             "state_machine",
             "state_history",
         ]
@@ -177,7 +184,7 @@ async def test_apply_migrations_with_empty_statement_successful(
     [
         (
             "postgresql_d",
-            ["applied_migration", "quote"],
+            ["applied_migration", "migri_schema_version", "quote"],
             (
                 "Applying migrations\n"
                 "0001_initial...ok\n"
@@ -188,7 +195,7 @@ async def test_apply_migrations_with_empty_statement_successful(
         ),
         (
             "postgresql_e",
-            ["applied_migration", "satellite"],
+            ["applied_migration", "migri_schema_version", "satellite"],
             (
                 "Applying migrations\n"
                 "0001_initial...ok\n"
@@ -199,7 +206,7 @@ async def test_apply_migrations_with_empty_statement_successful(
         ),
         (
             "postgresql_f",
-            ["applied_migration", "student"],
+            ["applied_migration", "migri_schema_version", "student"],
             (
                 "Applying migrations\n"
                 "0001_initial...ok\n"
@@ -234,7 +241,7 @@ async def test_apply_migrations_empty_or_invalid_migration(
         )
         tables = await conn.fetch_all(tables_query)
 
-    assert len(tables) == 2
+    assert len(tables) == 3
 
     for table in tables:
         assert table["table_name"] in expected_tables
@@ -274,11 +281,12 @@ async def test_apply_migrations_db_conn(
         )
         tables = await conn.fetch_all(tables_query)
 
-    assert len(tables) == 3
+    assert len(tables) == 4
 
     for table in tables:
         assert table["table_name"] in [
             "applied_migration",
+            "migri_schema_version",
             "state_history",
             "state_machine",
         ]
@@ -362,8 +370,11 @@ async def test_deprecated_run_migrations_dry_run(
         " WHERE table_schema='public' AND table_type='BASE TABLE';"
     )
 
-    assert len(tables) == 1  # applied_migration expected
-    assert tables[0]["table_name"] == "applied_migration"
+    # Only bookkeeping tables expected
+    assert sorted(t["table_name"] for t in tables) == [
+        "applied_migration",
+        "migri_schema_version",
+    ]
 
 
 async def test_deprecated_run_migrations_with_empty_statement_successful(
@@ -381,11 +392,12 @@ async def test_deprecated_run_migrations_with_empty_statement_successful(
         "SELECT table_name FROM information_schema.tables WHERE table_schema='public'"
     )
 
-    assert len(tables) == 3
+    assert len(tables) == 4
 
     for table in tables:
         assert table["table_name"] in [
             "applied_migration",
+            "migri_schema_version",
             "state_machine",
             "state_history",
         ]
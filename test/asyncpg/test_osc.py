@@ -0,0 +1,176 @@
+import pytest
+
+from migri.elements import Query
+from migri.osc import PostgreSQLOnlineSchemaChange
+from migri.throttle import Throttle
+
+pytestmark = pytest.mark.asyncio
+
+
+class ChunkHook(Throttle):
+    """Counts the checks before each chunk and runs `hook` at the given one"""
+
+    def __init__(self, chunk: int = 0, hook=None):
+        self.chunk = chunk
+        self.hook = hook
+        self.checks = 0
+
+    async def wait(self, connection):
+        self.checks += 1
+
+        if self.checks == self.chunk:
+            await self.hook(connection)
+
+
+async def interrupt(connection):
+    raise RuntimeError("interrupted")
+
+
+async def create_accounts(conn, rows: int = 25):
+    await conn.execute(
+        Query("CREATE TABLE account (id serial PRIMARY KEY, name text NOT NULL UNIQUE)")
+    )
+    await conn.execute(Query("CREATE INDEX account_lower_idx ON account (lower(name))"))
+    await conn.execute_many(
+        Query("INSERT INTO account (name) VALUES ($name)"),
+        [{"name": f"account {i}"} for i in range(1, rows + 1)],
+    )
+
+
+async def test_online_schema_change(postgresql_conn_factory):
+    conn = postgresql_conn_factory()
+
+    async with conn:
+        await create_accounts(conn)
+        await PostgreSQLOnlineSchemaChange(
+            conn,
+            "account",
+            ["ADD COLUMN zone text", "ADD CHECK (zone <> '')"],
+            chunk_size=10,
+        ).run()
+
+        accounts = await conn.fetch_all(Query("SELECT * FROM account ORDER BY id"))
+        indexes = await conn.fetch_all(
+            Query(
+                "SELECT tablename, indexname FROM pg_indexes "
+                "WHERE schemaname = 'public' ORDER BY tablename, indexname"
+            )
+        )
+        constraints = await conn.fetch_all(
+            Query(
+                "SELECT conname FROM pg_constraint "
+                "WHERE conrelid = 'account'::regclass AND contype = 'c'"
+            )
+        )
+        checkpoints = await conn.fetch_all(
+            Query("SELECT * FROM migri_online_schema_change")
+        )
+
+        # The sequence stays with the data
+        await conn.execute(Query("DROP TABLE _account_old"))
+        await conn.execute(Query("INSERT INTO account (name) VALUES ('account 26')"))
+        last = await conn.fetch(Query("SELECT max(id) AS id FROM account"))
+
+    assert len(accounts) == 25
+    assert accounts[0] == {"id": 1, "name": "account 1", "zone": None}
+    assert [(i["tablename"], i["indexname"]) for i in indexes] == [
+        ("_account_old", "_account_old_lower_idx"),
+        ("_account_old", "_account_old_name_key"),
+        ("_account_old", "_account_old_pkey"),
+        ("account", "account_lower_idx"),
+        ("account", "account_name_key"),
+        ("account", "account_pkey"),
+    ]
+    assert [c["conname"] for c in constraints] == ["account_zone_check"]
+    assert checkpoints == []
+    assert last["id"] == 26
+
+
+async def test_online_schema_change_syncs_writes(postgresql_conn_factory):
+    async def write(connection):
+        # Rows already copied and rows yet to be copied
+        await connection.execute(Query("UPDATE account SET name = 'one' WHERE id = 1"))
+        await connection.execute(Query("DELETE FROM account WHERE id IN (2, 20)"))
+        await connection.execute(Query("UPDATE account SET name = 'x' WHERE id = 21"))
+        await connection.execute(Query("INSERT INTO account (name) VALUES ('new')"))
+
+    conn = postgresql_conn_factory()
+
+    async with conn:
+        await create_accounts(conn)
+        await PostgreSQLOnlineSchemaChange(
+            conn,
+            "account",
+            ["ADD COLUMN zone text"],
+            chunk_size=10,
+            lag_throttle=ChunkHook(2, write),
+        ).run()
+
+        accounts = await conn.fetch_all(Query("SELECT id, name FROM account"))
+        old = await conn.fetch_all(Query("SELECT id, name FROM _account_old"))
+
+    assert len(accounts) == 24
+    assert sorted(accounts, key=lambda a: a["id"]) == sorted(old, key=lambda a: a["id"])
+    assert {"id": 1, "name": "one"} in accounts
+    assert {"id": 21, "name": "x"} in accounts
+    assert {"id": 26, "name": "new"} in accounts
+
+
+async def test_online_schema_change_resumes(postgresql_conn_factory):
+    conn = postgresql_conn_factory()
+
+    async with conn:
+        await create_accounts(conn)
+
+        with pytest.raises(RuntimeError, match="interrupted"):
+            await PostgreSQLOnlineSchemaChange(
+                conn,
+                "account",
+                ["ADD COLUMN zone text"],
+                chunk_size=10,
+                lag_throttle=ChunkHook(3, interrupt),
+            ).run()
+
+        checkpoint = await conn.fetch(
+            Query("SELECT last_key, copied_rows, state FROM migri_online_schema_change")
+        )
+        # Written while the copy was interrupted
+        await conn.execute(Query("UPDATE account SET name = 'one' WHERE id = 1"))
+
+        throttle = ChunkHook()
+        await PostgreSQLOnlineSchemaChange(
+            conn,
+            "account",
+            ["ADD COLUMN zone text"],
+            chunk_size=10,
+            lag_throttle=throttle,
+        ).run()
+
+        accounts = await conn.fetch_all(Query("SELECT * FROM account ORDER BY id"))
+
+    assert checkpoint == {"last_key": "20", "copied_rows": 20, "state": "copying"}
+    # The last chunk and the check that finds no more rows
+    assert throttle.checks == 2
+    assert len(accounts) == 25
+    assert accounts[0] == {"id": 1, "name": "one", "zone": None}
+
+
+async def test_online_schema_change_old_table_exists(postgresql_conn_factory):
+    conn = postgresql_conn_factory()
+
+    async with conn:
+        await create_accounts(conn)
+        await PostgreSQLOnlineSchemaChange(
+            conn, "account", ["ADD COLUMN zone text"]
+        ).run()
+
+        with pytest.raises(RuntimeError, match="_account_old is left from a previous"):
+            await PostgreSQLOnlineSchemaChange(
+                conn, "account", ["ADD COLUMN region text"]
+            ).run()
+
+        shadow = await conn.fetch(
+            Query("SELECT to_regclass('_account_new') IS NULL AS missing")
+        )
+
+    assert shadow["missing"]
@@ -25,8 +25,12 @@ def migrations() -> dict:
         "postgresql_e": f"{MIGRATIONS_BASE}/postgresql_e",
         # Python migration file has a sync migrate() function
         "postgresql_f": f"{MIGRATIONS_BASE}/postgresql_f",
+        # Has statements flagged by the linter
+        "postgresql_g": f"{MIGRATIONS_BASE}/postgresql_g",
         # OK
         "sqlite_a": f"{MIGRATIONS_BASE}/sqlite_a",
+        # DML statements to plan, expects an existing account table
+        "sqlite_b": f"{MIGRATIONS_BASE}/sqlite_b",
     }
 
 
@@ -63,6 +63,7 @@ async def test_migrate_mysql(migrations, mysql_conn_factory, mysql_connection_de
         "animal",
         "applied_migration",
         "exhibit",
+        "migri_schema_version",
     ]
 
     # Check data
@@ -100,8 +101,11 @@ async def test_migrate_mysql_dry_run(
         )
         tables = await conn.fetch_all(table_query)
 
-    assert len(tables) == 1  # applied_migration expected
-    assert tables[0]["table_name"] == "applied_migration"
+    # Only bookkeeping tables expected
+    assert sorted(t["table_name"] for t in tables) == [
+        "applied_migration",
+        "migri_schema_version",
+    ]
 
 
 async def test_migrate_postgresql(
@@ -136,6 +140,7 @@ async def test_migrate_postgresql(
         "account",
         "app_user",
         "applied_migration",
+        "migri_schema_version",
         "record",
     ]
 
@@ -180,8 +185,11 @@ async def test_migration_postgresql_dry_run(
         )
         tables = await conn.fetch_all(tables_query)
 
-    assert len(tables) == 1  # applied_migration expected
-    assert tables[0]["table_name"] == "applied_migration"
+    # Only bookkeeping tables expected
+    assert sorted(t["table_name"] for t in tables) == [
+        "applied_migration",
+        "migri_schema_version",
+    ]
 
 
 async def test_migrate_sqlite(
@@ -208,7 +216,12 @@ async def test_migrate_sqlite(
         table_query = Query("SELECT name FROM sqlite_master WHERE type='table'")
         tables = await conn.fetch_all(table_query)
 
-    assert [t["name"] for t in tables] == ["applied_migration", "account", "record"]
+    assert [t["name"] for t in tables] == [
+        "applied_migration",
+        "migri_schema_version",
+        "account",
+        "record",
+    ]
 
     # Check for account records
     conn = sqlite_conn_factory()
@@ -238,5 +251,8 @@ async def test_migrate_sqlite_dry_run(
         table_query = Query("SELECT name FROM sqlite_master WHERE type='table'")
         tables = await conn.fetch_all(table_query)
 
-    assert len(tables) == 1  # applied_migration expected
-    assert tables[0]["name"] == "applied_migration"
+    # Only bookkeeping tables expected
+    assert sorted(t["name"] for t in tables) == [
+        "applied_migration",
+        "migri_schema_version",
+    ]
@@ -0,0 +1,7 @@
+CREATE TABLE account (
+    id serial PRIMARY KEY,
+    name text NOT NULL,
+    balance integer
+);
+
+CREATE INDEX account_name_idx ON account (name);
@@ -0,0 +1,5 @@
+ALTER TABLE account ALTER COLUMN balance TYPE bigint;
+
+CREATE INDEX account_balance_idx ON account (balance);
+
+UPDATE account SET balance = 0;
@@ -0,0 +1,8 @@
+UPDATE account SET name = 'Z Top' WHERE id = 1;
+
+CREATE TABLE audit (
+    id integer PRIMARY KEY,
+    note text NOT NULL
+);
+
+UPDATE account SET name = upper(name) WHERE name LIKE 'a%';
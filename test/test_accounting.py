@@ -0,0 +1,49 @@
+import pytest
+
+from migri.accounting import MySQLResourceAccounting
+
+
+class FakeMySQLConnection:
+    """Answers binary log statements like a server that predates `statements`"""
+
+    dialect = "mysql"
+
+    def __init__(self, unsupported=()):
+        self.unsupported = unsupported
+
+    async def fetch_all(self, query):
+        if query.statement in self.unsupported:
+            raise RuntimeError(
+                f"You have an error in your SQL syntax: {query.statement}"
+            )
+        if query.statement == "SHOW BINARY LOGS":
+            return [
+                {"Log_name": "binlog.000001", "File_size": "1000"},
+                {"Log_name": "binlog.000002", "File_size": "400"},
+            ]
+        if query.statement in MySQLResourceAccounting.BINLOG_STATUS_QUERIES:
+            return [{"File": "binlog.000002", "Position": "250"}]
+
+        raise RuntimeError("performance_schema is disabled")
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "unsupported,expected",
+    [
+        ((), "SHOW BINARY LOG STATUS"),
+        # Before MySQL 8.2
+        (("SHOW BINARY LOG STATUS",), "SHOW MASTER STATUS"),
+        (MySQLResourceAccounting.BINLOG_STATUS_QUERIES, None),
+    ],
+)
+async def test_mysql_binlog_status_query(unsupported, expected):
+    accounting = MySQLResourceAccounting(FakeMySQLConnection(unsupported))
+    await accounting.prepare()
+
+    assert accounting.binlog_status_query == expected
+
+    if expected:
+        assert await accounting.snapshot() == {"binlog_bytes": 1250}
+    else:
+        assert accounting.probes == []
@@ -0,0 +1,46 @@
+import pytest
+
+from migri import get_connection
+from migri.analyze import (
+    MySQLTableAnalyzer,
+    PostgreSQLTableAnalyzer,
+    SQLiteTableAnalyzer,
+    create_table_analyzer,
+)
+from migri.elements import Query
+
+
+@pytest.mark.parametrize(
+    "analyzer,table,expected",
+    [
+        (PostgreSQLTableAnalyzer, "public.account", '"public"."account"'),
+        (PostgreSQLTableAnalyzer, 'we"ird', '"we""ird"'),
+        (MySQLTableAnalyzer, "shop.account", "`shop`.`account`"),
+        (SQLiteTableAnalyzer, "account", '"account"'),
+    ],
+)
+def test_table_analyzer_quote(analyzer, table, expected):
+    assert analyzer.quote(table) == expected
+
+
+@pytest.mark.asyncio
+async def test_table_analyzer_run(tmp_path):
+    conn = get_connection(str(tmp_path / "test.db"))
+    await conn.connect()
+    await conn.execute(Query("CREATE TABLE account (id int)"))
+    await conn.execute(Query("CREATE INDEX account_id_idx ON account (id)"))
+
+    # Analyzed sequentially on SQLite, which has a single writer
+    results = await create_table_analyzer(conn, jobs=4).run(
+        ["account", "missing", "account"]
+    )
+    await conn.disconnect()
+
+    assert [r.table for r in results] == ["account", "missing"]
+    assert results[0].error is None
+    assert "no such table" in results[1].error
+
+
+def test_create_table_analyzer_invalid_jobs(tmp_path):
+    with pytest.raises(ValueError):
+        create_table_analyzer(get_connection(str(tmp_path / "test.db")), jobs=0)
@@ -0,0 +1,48 @@
+import hashlib
+
+from migri import checksums
+from migri.checksums import ChecksumCache, checksum_files, hash_file
+
+
+def test_hash_file(tmp_path, monkeypatch):
+    path = tmp_path / "0001_initial.sql"
+    path.write_bytes(b"CREATE TABLE account (id int);")
+    expected = hashlib.sha256(path.read_bytes()).hexdigest()
+
+    assert hash_file(str(path)) == expected
+
+    # Same result when memory mapped
+    monkeypatch.setattr(checksums, "MMAP_THRESHOLD", 1)
+    assert hash_file(str(path)) == expected
+
+
+def test_checksum_files_cache(tmp_path, monkeypatch):
+    paths = []
+
+    for i in range(20):
+        path = tmp_path / f"{i:04}_migration.sql"
+        path.write_text(f"SELECT {i};")
+        paths.append(str(path))
+
+    cache_path = str(tmp_path / "cache" / "checksums.json")
+    cache = ChecksumCache(cache_path)
+    expected = checksum_files(paths, cache)
+    cache.save()
+
+    assert expected[paths[0]] == hash_file(paths[0])
+
+    hashed = []
+    real_hash_file = checksums.hash_file
+    monkeypatch.setattr(
+        checksums, "hash_file", lambda p: hashed.append(p) or real_hash_file(p)
+    )
+
+    # Only files whose stat changed are hashed again
+    assert checksum_files(paths, ChecksumCache(cache_path)) == expected
+    assert hashed == []
+
+    (tmp_path / "0003_migration.sql").write_text("SELECT 'changed';")
+    changed = checksum_files(paths, ChecksumCache(cache_path))
+
+    assert hashed == [paths[3]]
+    assert changed[paths[3]] != expected[paths[3]]
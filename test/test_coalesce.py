@@ -0,0 +1,84 @@
+import pytest
+
+from migri.coalesce import coalesce_alters, parse_alter_table
+
+
+def test_coalesce_alters():
+    statements = [
+        "ALTER TABLE account ADD COLUMN zone text;",
+        "-- Comments are dropped\n"
+        "ALTER TABLE account ALTER COLUMN name SET DEFAULT 'a,b', "
+        "ADD CONSTRAINT zone_check CHECK (zone IN ('eu', 'us'));",
+        "ALTER TABLE account DROP COLUMN legacy;",
+        "UPDATE account SET zone = 'eu';",
+        "ALTER TABLE account ADD COLUMN region text;",
+    ]
+    coalesced, rewrites = coalesce_alters(statements)
+
+    assert coalesced == [
+        "ALTER TABLE account ADD COLUMN zone text, "
+        "ALTER COLUMN name SET DEFAULT 'a,b', "
+        "ADD CONSTRAINT zone_check CHECK (zone IN ('eu', 'us')), "
+        "DROP COLUMN legacy;",
+        "UPDATE account SET zone = 'eu';",
+        "ALTER TABLE account ADD COLUMN region text;",
+    ]
+    assert [(r.table, r.statements) for r in rewrites] == [("account", (1, 2, 3))]
+    assert str(rewrites[0]) == (
+        "combined statements 1, 2, 3 into one ALTER TABLE account"
+    )
+
+
+def test_coalesce_alters_keeps_conflicting_statements():
+    statements = [
+        "ALTER TABLE account ADD COLUMN zone text;",
+        # Changes the same column
+        "ALTER TABLE account ALTER COLUMN zone SET NOT NULL;",
+        # Different table
+        "ALTER TABLE record ADD COLUMN zone text;",
+        # Different modifiers
+        "ALTER TABLE ONLY record ADD COLUMN region text;",
+    ]
+    coalesced, rewrites = coalesce_alters(statements, first=5)
+
+    assert coalesced == statements
+    assert rewrites == []
+
+
+def test_coalesce_alters_numbers_from_first():
+    statements = ["ALTER TABLE a ADD x int;", "ALTER TABLE a ADD y int;"]
+    _, rewrites = coalesce_alters(statements, first=4)
+
+    assert rewrites[0].statements == (4, 5)
+
+
+@pytest.mark.parametrize(
+    "statement",
+    [
+        "ALTER TABLE account RENAME COLUMN zone TO region",
+        "ALTER TABLE account VALIDATE CONSTRAINT zone_check",
+        "ALTER TABLE account ADD PRIMARY KEY (id)",
+        "ALTER TABLE animal ADD INDEX (name)",
+        "ALTER TABLE animal ADD COLUMN age int, ALGORITHM=INSTANT",
+        "ALTER TABLE account ADD COLUMN zone text, DROP COLUMN zone",
+        "ALTER INDEX account_idx RENAME TO account_zone_idx",
+        "CREATE TABLE account (id int)",
+    ],
+)
+def test_parse_alter_table_not_combinable(statement):
+    assert parse_alter_table(statement) is None
+
+
+def test_parse_alter_table():
+    alter = parse_alter_table(
+        'ALTER TABLE IF EXISTS public."Account" '
+        "CHANGE COLUMN name full_name varchar(100), ADD UNIQUE KEY name_key (name);"
+    )
+
+    assert alter.table == 'public."Account"'
+    assert alter.key == 'alter table if exists public."account"'
+    assert alter.subjects == (
+        ("column", "name"),
+        ("column", "full_name"),
+        ("index", "name_key"),
+    )
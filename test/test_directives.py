@@ -0,0 +1,266 @@
+import sys
+
+import pytest
+from sqlparse import lexer
+
+from migri.directives import (
+    iter_blocks,
+    parse_module_directives,
+    parse_sql_directives,
+    split_parallel_groups,
+)
+from migri.migration import Migration, split_blocks
+from migri.statements import StatementSplitter, split_statements
+
+TRICKY_SQL = (
+    "-- header; with a semicolon\n"
+    'CREATE TABLE a (id int, "odd;name" text); /* block ; comment */\n'
+    "INSERT INTO a VALUES (1, 'it''s; fine'), (2, 'back\\'slash;\n"
+    "still; quoted');\n"
+    "CREATE FUNCTION f() RETURNS trigger AS $body$\n"
+    "BEGIN\n"
+    "  NEW.x := 'a;b';\n"
+    "  RETURN NEW;\n"
+    "END;\n"
+    "$body$ LANGUAGE plpgsql;\n"
+    "CREATE TRIGGER t AFTER INSERT ON a BEGIN\n"
+    "  UPDATE a SET id = 1;\n"
+    "  DELETE FROM a;\n"
+    "END;\n"
+    "-- it's a comment\n"
+    "SELECT `x;y` FROM a;\n"
+    "SELECT 1"
+)
+
+
+def test_parse_sql_directives():
+    lines = [
+        "-- Add a zone to every account\n",
+        "-- migri:no-transaction\n",
+        "\n",
+        "-- migri:online chunk_size=500 throttle=0.5\n",
+        "ALTER TABLE account ADD COLUMN zone text;\n",
+        "-- migri:ignored\n",
+    ]
+
+    assert parse_sql_directives(lines) == {
+        "no-transaction": {},
+        "online": {"chunk_size": "500", "throttle": "0.5"},
+    }
+
+
+def test_parse_module_directives():
+    source = "import os\n\nTRANSACTION = False\nname = 'x'\nPATH = os.getcwd()\n"
+    assert parse_module_directives(source) == {"TRANSACTION": False}
+
+
+@pytest.mark.parametrize(
+    "filename,contents,expected",
+    [
+        ("0001_a.sql", "CREATE TABLE a (id int);", True),
+        (
+            "0001_a.sql",
+            "-- migri:no-transaction\nCREATE INDEX CONCURRENTLY ...;",
+            False,
+        ),
+        ("0001_a.sql", "-- migri:online\nALTER TABLE a ADD COLUMN b int;", False),
+        ("0001_a.py", "async def migrate(conn):\n    ...\n", True),
+        ("0001_a.py", "TRANSACTION = False\n", False),
+    ],
+)
+def test_migration_transactional(tmp_path, filename, contents, expected):
+    path = tmp_path / filename
+    path.write_text(contents)
+
+    assert Migration(abspath=str(path)).transactional is expected
+
+
+@pytest.mark.parametrize(
+    "filename,contents,expected",
+    [
+        ("0001_a.sql", "CREATE TABLE a (id int);", {}),
+        (
+            "0001_a.sql",
+            "-- migri:set maintenance_work_mem=1GB work_mem=64MB\nCREATE INDEX ...;",
+            {"maintenance_work_mem": "1GB", "work_mem": "64MB"},
+        ),
+        (
+            "0001_a.py",
+            "SESSION_SETTINGS = {'sort_buffer_size': 4194304}\n",
+            {"sort_buffer_size": "4194304"},
+        ),
+    ],
+)
+def test_migration_session_settings(tmp_path, filename, contents, expected):
+    path = tmp_path / filename
+    path.write_text(contents)
+
+    assert Migration(abspath=str(path)).session_settings == expected
+
+
+def test_migration_session_settings_invalid_name(tmp_path):
+    path = tmp_path / "0001_a.sql"
+    path.write_text("-- migri:set work_mem;DROP=1\nSELECT 1;")
+
+    with pytest.raises(ValueError):
+        Migration(abspath=str(path)).session_settings
+
+
+@pytest.mark.parametrize(
+    "filename,contents,expected",
+    [
+        (
+            "0001_a.sql",
+            "CREATE TABLE a (id int);\n"
+            "INSERT INTO public.b SELECT * FROM c;\n"
+            'UPDATE "A" SET id = 1;\n'
+            "ALTER TABLE a ADD COLUMN name text;\n"
+            "SELECT * FROM d;\n"
+            "DROP TABLE e;",
+            ["a", "public.b", "A"],
+        ),
+        (
+            "0001_a.py",
+            "ANALYZE_TABLES = ['account', 'record']\n",
+            ["account", "record"],
+        ),
+        ("0001_a.py", "async def migrate(conn):\n    return True\n", []),
+    ],
+)
+def test_migration_analyze_tables(tmp_path, filename, contents, expected):
+    path = tmp_path / filename
+    path.write_text(contents)
+
+    assert Migration(abspath=str(path)).analyze_tables == expected
+
+
+def test_migration_compressed_requires_zstandard(monkeypatch, tmp_path):
+    monkeypatch.setitem(sys.modules, "zstandard", None)
+    path = tmp_path / "0001_seed.sql.zst"
+    path.write_bytes(b"")
+    migration = Migration(abspath=str(path))
+
+    assert (migration.name, migration.file_ext) == ("0001_seed", ".sql")
+
+    with pytest.raises(RuntimeError, match="requires zstandard"):
+        migration.directives
+
+
+def test_split_parallel_groups():
+    contents = (
+        "CREATE TABLE a (id int);\n"
+        "-- migri:parallel jobs=2\n"
+        "CREATE INDEX a_idx ON a (id);\n"
+        "CREATE INDEX b_idx ON b (id);\n"
+        "-- migri:end-parallel\n"
+        "DROP TABLE c;\n"
+    )
+
+    assert split_parallel_groups(contents) == [
+        (None, "CREATE TABLE a (id int);\n"),
+        (
+            {"jobs": "2"},
+            "CREATE INDEX a_idx ON a (id);\nCREATE INDEX b_idx ON b (id);\n",
+        ),
+        (None, "DROP TABLE c;\n"),
+    ]
+
+
+@pytest.mark.parametrize(
+    "contents",
+    [
+        "-- migri:parallel\nSELECT 1;\n",
+        "SELECT 1;\n-- migri:end-parallel\n",
+        "-- migri:parallel\n-- migri:parallel\nSELECT 1;\n-- migri:end-parallel\n",
+    ],
+)
+def test_split_parallel_groups_invalid(contents):
+    with pytest.raises(ValueError):
+        split_parallel_groups(contents)
+
+
+@pytest.mark.parametrize("size", [1, 2, 7, 64, None])
+def test_statement_splitter(size):
+    if size is None:
+        pieces = TRICKY_SQL.splitlines(keepends=True)
+    else:
+        pieces = [TRICKY_SQL[i : i + size] for i in range(0, len(TRICKY_SQL), size)]
+
+    splitter = StatementSplitter()
+    statements = [s for piece in pieces for s in splitter.feed(piece)]
+    # Statements are returned once the next one starts, as the last one could
+    # still continue
+    assert len(statements) == 4
+
+    assert statements + splitter.close() == split_statements(TRICKY_SQL)
+
+
+@pytest.mark.parametrize(
+    "contents",
+    [
+        "".join(f"INSERT INTO a VALUES ({i});\n" for i in range(2000)),
+        "INSERT INTO a VALUES\n" + "".join(f"({i}),\n" for i in range(2000)) + "(0);\n",
+        f"{TRICKY_SQL};\n" * 50,
+    ],
+    ids=["statements", "long statement", "blocks"],
+)
+def test_statement_splitter_tokenizes_once(contents, monkeypatch):
+    expected = split_statements(contents)
+    tokenize = lexer.tokenize
+    tokenized = []
+
+    def counting_tokenize(text, *args):
+        tokenized.append(len(text))
+        return tokenize(text, *args)
+
+    monkeypatch.setattr(lexer, "tokenize", counting_tokenize)
+    splitter = StatementSplitter()
+    lines = contents.splitlines(keepends=True)
+    statements = [s for line in lines for s in splitter.feed(line)]
+    statements.extend(splitter.close())
+
+    # Each character is tokenized once, so the cost grows linearly with the file
+    assert sum(tokenized) == len(contents)
+    assert statements == expected
+
+
+def test_iter_blocks(monkeypatch):
+    contents = (
+        "CREATE TABLE a (id int);\n"
+        "INSERT INTO a VALUES (1);\n"
+        "INSERT INTO a VALUES (2);\n"
+        "-- migri:parallel jobs=2\n"
+        "CREATE INDEX a_idx ON a (id);\n"
+        "CREATE INDEX b_idx ON b (id);\n"
+        "CREATE INDEX c_idx ON c (id);\n"
+        "-- migri:end-parallel\n"
+        f"{TRICKY_SQL}\n"
+    )
+    lines = contents.splitlines(keepends=True)
+
+    assert list(iter_blocks(lines)) == split_blocks(contents)
+
+    monkeypatch.setattr("migri.directives.BATCH_STATEMENTS", 2)
+
+    # Sequential statements are batched, parallel groups kept whole
+    assert [len(statements) for _, statements in iter_blocks(lines)] == [
+        2,
+        1,
+        3,
+        2,
+        2,
+        2,
+    ]
+
+
+@pytest.mark.parametrize(
+    "contents",
+    [
+        "-- migri:parallel\nSELECT 1;\n",
+        "SELECT 1;\n-- migri:end-parallel\n",
+        "-- migri:parallel\n-- migri:parallel\nSELECT 1;\n-- migri:end-parallel\n",
+    ],
+)
+def test_iter_blocks_invalid(contents):
+    with pytest.raises(ValueError):
+        list(iter_blocks(contents.splitlines(keepends=True)))
@@ -7,3 +7,12 @@ def test_connection_backend_min_args_not_satisfied():
     """If no db_name or connection is provided, raise an error"""
     with pytest.raises(RuntimeError):
         _ = ConnectionBackend()
+
+
+def test_connection_backend_spawn():
+    backend = ConnectionBackend("db", db_user="user", db="connected")
+    spawned = backend.spawn(db_name="other")
+
+    assert spawned.db_name == "other"
+    assert spawned.db_user == "user"
+    assert spawned.db is None
@@ -0,0 +1,189 @@
+import json
+
+import pytest
+
+from migri import lint_migrations
+from migri.backends.mysql import MySQLConnection
+from migri.backends.postgresql import PostgreSQLConnection
+from migri.backends.sqlite import SQLiteConnection
+from migri.elements import Query
+from migri.lint import format_findings, Lint, LintContext, Severity
+
+
+def _lint(connection, statements, severities=None):
+    task = Lint(connection)
+    context = LintContext(dialect=connection.dialect)
+    findings = task.lint_statements("0001_test", statements, context, severities or {})
+    return [(f.statement_number, f.rule) for f in findings]
+
+
+@pytest.mark.parametrize(
+    "statement,expected_rules",
+    [
+        ("ALTER TABLE account ALTER COLUMN id TYPE bigint", ["alter-column-type"]),
+        (
+            "ALTER TABLE account ADD COLUMN token uuid DEFAULT gen_random_uuid()",
+            ["volatile-default"],
+        ),
+        ("ALTER TABLE account ADD COLUMN created timestamptz DEFAULT now()", []),
+        ("CREATE INDEX account_name_idx ON account (name)", ["index-not-concurrent"]),
+        ("CREATE INDEX CONCURRENTLY account_name_idx ON account (name)", []),
+        (
+            "ALTER TABLE account ALTER COLUMN name SET NOT NULL",
+            ["not-null-without-check"],
+        ),
+        ("UPDATE account SET name = 'x'", ["unbatched-dml"]),
+        ("DELETE FROM account WHERE id < 100", []),
+    ],
+)
+def test_lint_postgresql_rules(statement, expected_rules):
+    rules = _lint(PostgreSQLConnection("db"), [statement])
+    assert [r for _, r in rules] == expected_rules
+
+
+def test_lint_postgresql_not_null_after_check_constraint():
+    statements = [
+        "ALTER TABLE account ADD CONSTRAINT name_nn CHECK (name IS NOT NULL) NOT VALID",
+        "ALTER TABLE account VALIDATE CONSTRAINT name_nn",
+        "ALTER TABLE account ALTER COLUMN name SET NOT NULL",
+    ]
+    assert _lint(PostgreSQLConnection("db"), statements) == []
+
+
+def test_lint_skips_tables_created_in_same_run():
+    statements = [
+        "CREATE TABLE account (id serial PRIMARY KEY, name text)",
+        "CREATE INDEX account_name_idx ON account (name)",
+        "ALTER TABLE account ALTER COLUMN name TYPE varchar(100)",
+        "UPDATE account SET name = 'x'",
+    ]
+    assert _lint(PostgreSQLConnection("db"), statements) == []
+
+
+def test_lint_ignores_created_tables_without_name():
+    task = Lint(MySQLConnection("db"))
+    context = LintContext(dialect="mysql")
+    task.lint_statements(
+        "0001_test", ["CREATE OR REPLACE TABLE animal (id int)"], context, {}
+    )
+
+    assert context.created_tables == set()
+
+
+@pytest.mark.parametrize(
+    "statement,expected_rules",
+    [
+        ("ALTER TABLE animal MODIFY COLUMN name varchar(255)", ["alter-column-type"]),
+        (
+            "ALTER TABLE animal ADD INDEX name_idx (name), ALGORITHM=COPY",
+            ["index-not-concurrent"],
+        ),
+        ("ALTER TABLE animal ADD INDEX name_idx (name)", []),
+        ("DELETE FROM animal", ["unbatched-dml"]),
+    ],
+)
+def test_lint_mysql_rules(statement, expected_rules):
+    rules = _lint(MySQLConnection("db"), [statement])
+    assert [r for _, r in rules] == expected_rules
+
+
+def test_lint_sqlite_only_applies_dialect_rules():
+    statements = [
+        "CREATE INDEX account_name_idx ON account (name)",
+        "UPDATE account SET name = 'x'",
+    ]
+    assert _lint(SQLiteConnection("test.db"), statements) == [(2, "unbatched-dml")]
+
+
+def test_lint_severity_overrides():
+    statements = ["UPDATE account SET name = 'x'", "CREATE INDEX i ON account (a)"]
+    task = Lint(PostgreSQLConnection("db"))
+    findings = task.lint_statements(
+        "0001_test",
+        statements,
+        LintContext(dialect="postgresql"),
+        {"unbatched-dml": Severity.ERROR, "index-not-concurrent": Severity.OFF},
+    )
+
+    assert [(f.rule, f.severity) for f in findings] == [
+        ("unbatched-dml", Severity.ERROR)
+    ]
+
+
+def test_lint_coalescible_alters():
+    task = Lint(MySQLConnection("db"))
+    context = LintContext(dialect="mysql")
+    findings = task.lint_statements(
+        "0001_test",
+        [
+            "ALTER TABLE animal ADD COLUMN name varchar(100)",
+            "ALTER TABLE animal ADD COLUMN age int",
+            "ALTER TABLE animal DROP COLUMN age",
+        ],
+        context,
+        {},
+    )
+    findings += task.lint_statements(
+        "0002_test", ["ALTER TABLE animal ADD COLUMN owner int"], context, {}
+    )
+
+    assert [(f.migration_name, f.statement_number, f.rule) for f in findings] == [
+        ("0001_test", 2, "coalescible-alter"),
+        ("0002_test", 1, "coalescible-alter"),
+    ]
+    assert findings[0].severity == Severity.INFO
+    assert "in 0001_test" in findings[1].message
+
+
+@pytest.mark.asyncio
+async def test_lint_all_migrations(migrations):
+    findings = await lint_migrations(
+        migrations["postgresql_g"], PostgreSQLConnection("db"), all_migrations=True
+    )
+
+    assert [(f.migration_name, f.statement_number, f.rule) for f in findings] == [
+        ("0002_slow", 1, "alter-column-type"),
+        ("0002_slow", 2, "index-not-concurrent"),
+        ("0002_slow", 3, "unbatched-dml"),
+    ]
+
+    output = json.loads(format_findings(findings, "json"))
+    assert output[0] == {
+        "migration": "0002_slow",
+        "statement": 1,
+        "rule": "alter-column-type",
+        "severity": "error",
+        "message": "changing a column type can rewrite the table and block writes",
+        "sql": "ALTER TABLE account ALTER COLUMN balance TYPE bigint;",
+    }
+
+
+@pytest.mark.asyncio
+async def test_lint_unknown_rule(migrations):
+    with pytest.raises(ValueError):
+        await lint_migrations(
+            migrations["postgresql_g"],
+            PostgreSQLConnection("db"),
+            {"no-such-rule": Severity.ERROR},
+            all_migrations=True,
+        )
+
+
+@pytest.mark.asyncio
+async def test_lint_pending_migrations_new_database(tmp_path):
+    (tmp_path / "0001_accounts.sql").write_text("UPDATE account SET name = 'x';")
+    db_name = str(tmp_path / "test.db")
+
+    findings = await lint_migrations(str(tmp_path), SQLiteConnection(db_name))
+
+    assert [(f.migration_name, f.rule) for f in findings] == [
+        ("0001_accounts", "unbatched-dml")
+    ]
+
+    # Read-only, the bookkeeping schema isn't created
+    async with SQLiteConnection(db_name) as conn:
+        tables = await conn.fetch_all(
+            Query("SELECT name FROM sqlite_master WHERE type='table'")
+        )
+
+    assert tables == []
@@ -0,0 +1,86 @@
+import io
+
+import pytest
+
+from migri import get_connection
+from migri.elements import Query
+from migri.interfaces import ConnectionBackend
+from migri.load import PostgreSQLBulkLoader, create_bulk_loader
+
+DATA = (
+    "# migri:load table=country\n"
+    "\n"
+    "code,name,capital\n"
+    'nz,"Aotearoa, New Zealand",Wellington\n'
+    'aq,"Antarctica\n(continent)",\n'
+    "ch,Switzerland,Bern\n"
+)
+
+
+@pytest.mark.asyncio
+async def test_bulk_loader(tmp_path):
+    conn = get_connection(str(tmp_path / "test.db"))
+    await conn.connect()
+    await conn.execute(Query("CREATE TABLE country (code text, name text, capital)"))
+
+    loader = create_bulk_loader(conn, batch_size=2)
+    loaded = await loader.load(io.StringIO(DATA), "country")
+    rows = await conn.fetch_all(Query("SELECT * FROM country ORDER BY code"))
+    await conn.disconnect()
+
+    assert loaded == 3
+    assert [tuple(r.values()) for r in rows] == [
+        ("aq", "Antarctica\n(continent)", None),
+        ("ch", "Switzerland", "Bern"),
+        ("nz", "Aotearoa, New Zealand", "Wellington"),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_bulk_loader_invalid_row(tmp_path):
+    conn = get_connection(str(tmp_path / "test.db"))
+    await conn.connect()
+    await conn.execute(Query("CREATE TABLE country (code text, name text)"))
+
+    with pytest.raises(ValueError, match="row 2 has 3 values, expected 2"):
+        await create_bulk_loader(conn).load(
+            io.StringIO("code,name\nnz,New Zealand\nch,Switzerland,Bern\n"), "country"
+        )
+
+    await conn.disconnect()
+
+
+class RecordingDatabase:
+    async def copy_to_table(self, table_name, source, **kwargs):
+        self.copy = {"table_name": table_name, **kwargs}
+        self.data = b"".join([chunk async for chunk in source])
+
+        return "COPY 3"
+
+
+@pytest.mark.asyncio
+async def test_postgresql_bulk_loader(monkeypatch):
+    monkeypatch.setattr("migri.load.COPY_CHUNK_SIZE", 16)
+    database = RecordingDatabase()
+    connection = ConnectionBackend(db_name="test", db=database)
+
+    loaded = await PostgreSQLBulkLoader(connection).load(
+        io.StringIO(DATA), "public.country", null="\\N"
+    )
+
+    assert loaded == 3
+    assert database.copy == {
+        "table_name": "country",
+        "schema_name": "public",
+        "columns": ["code", "name", "capital"],
+        "format": "csv",
+        "delimiter": ",",
+        "null": "\\N",
+    }
+    # Rows are streamed as they are, for the server to parse
+    assert database.data == DATA.split("capital\n")[1].encode()
+
+
+def test_create_bulk_loader_unsupported():
+    with pytest.raises(RuntimeError):
+        create_bulk_loader(ConnectionBackend(db_name="test"))
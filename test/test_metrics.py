@@ -0,0 +1,70 @@
+from migri.metrics import OpenMetricsRecorder
+
+
+def test_render():
+    recorder = OpenMetricsRecorder(path="metrics.prom")
+    recorder.set_pending(3)
+    recorder.observe_migration("0001_initial", 0.2, ok=True)
+    recorder.observe_migration("0002_add_accounts", 7.5, ok=True)
+    recorder.observe_migration("0003_record", 0.05, ok=False)
+    recorder.observe_bookkeeping(0.25)
+    recorder.observe_bookkeeping(0.25)
+    recorder.observe_run(8.5)
+
+    lines = recorder.render(timestamp=1594589401.0).splitlines()
+
+    assert "migri_run_duration_seconds 8.5" in lines
+    assert "migri_last_run_timestamp_seconds 1594589401.0" in lines
+    assert "migri_migrations_pending 3" in lines
+    assert "migri_migrations_applied 2" in lines
+    assert "migri_migrations_failed 1" in lines
+    assert "migri_bookkeeping_seconds 0.5" in lines
+    assert "migri_lock_wait_seconds 0.0" in lines
+    assert 'migri_migration_duration_seconds_bucket{le="0.1"} 1' in lines
+    assert 'migri_migration_duration_seconds_bucket{le="0.5"} 2' in lines
+    assert 'migri_migration_duration_seconds_bucket{le="10.0"} 3' in lines
+    assert 'migri_migration_duration_seconds_bucket{le="+Inf"} 3' in lines
+    assert "migri_migration_duration_seconds_count 3" in lines
+    assert lines[-1] == "# EOF"
+
+
+def test_render_resources():
+    recorder = OpenMetricsRecorder(path="metrics.prom")
+    recorder.observe_resources("0001_initial", {"wal_bytes": 8192, "rows": 3})
+
+    lines = recorder.render(timestamp=1594589401.0).splitlines()
+
+    assert (
+        'migri_migration_resource_usage{migration="0001_initial",resource="rows"} 3'
+    ) in lines
+    assert (
+        'migri_migration_resource_usage{migration="0001_initial",'
+        'resource="wal_bytes"} 8192'
+    ) in lines
+    assert lines[-1] == "# EOF"
+
+
+def test_render_in_progress():
+    recorder = OpenMetricsRecorder(path="metrics.prom")
+    recorder.running = True
+
+    lines = recorder.render(timestamp=1594589401.0).splitlines()
+
+    # Not known until the run finished
+    assert "migri_run_in_progress 1" in lines
+    assert not any(line.startswith("migri_run_duration_seconds") for line in lines)
+    assert not any(
+        line.startswith("migri_last_run_timestamp_seconds") for line in lines
+    )
+
+
+def test_render_escapes_label_values():
+    recorder = OpenMetricsRecorder(path="metrics.prom")
+    recorder.observe_resources('0001_"odd"\\name\n', {"rows": 1})
+
+    lines = recorder.render(timestamp=1594589401.0).splitlines()
+
+    assert (
+        'migri_migration_resource_usage{migration="0001_\\"odd\\"\\\\name\\n",'
+        'resource="rows"} 1'
+    ) in lines
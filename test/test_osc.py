@@ -0,0 +1,77 @@
+import pytest
+
+from migri.backends.postgresql import PostgreSQLConnection
+from migri.backends.sqlite import SQLiteConnection
+from migri.osc import (
+    INDEX_NAME_PATTERN,
+    create_online_schema_change,
+    parse_alterations,
+    PostgreSQLOnlineSchemaChange,
+)
+
+
+def test_parse_alterations():
+    assert parse_alterations(
+        [
+            "ALTER TABLE account ADD COLUMN zone text;",
+            'ALTER TABLE "account" ALTER COLUMN name SET NOT NULL',
+        ]
+    ) == {
+        "table": "account",
+        "alterations": ["ADD COLUMN zone text", "ALTER COLUMN name SET NOT NULL"],
+    }
+
+
+@pytest.mark.parametrize(
+    "statements",
+    [
+        ["ALTER TABLE account ADD COLUMN zone text", "ALTER TABLE user ADD x int"],
+        ["UPDATE account SET zone = 'eu'"],
+    ],
+)
+def test_parse_alterations_rejects_other_statements(statements):
+    with pytest.raises(RuntimeError):
+        parse_alterations(statements)
+
+
+def test_create_online_schema_change_unsupported_dialect():
+    with pytest.raises(RuntimeError):
+        create_online_schema_change(SQLiteConnection("db"), "account", [])
+
+
+def test_postgresql_copy_query():
+    osc = PostgreSQLOnlineSchemaChange(
+        PostgreSQLConnection("db"), "account", ["ADD COLUMN zone text"]
+    )
+    query = osc._copy_query(["id", "name"], "id", "10", "20")
+
+    assert query.statement == (
+        'INSERT INTO "_account_new" ("id", "name") SELECT "id", "name" '
+        'FROM "account" WHERE "id" > ($last_key::text)::bigint AND '
+        '"id" <= ($upper_key::text)::bigint ON CONFLICT DO NOTHING'
+    )
+    assert query.values == {"last_key": "10", "upper_key": "20"}
+
+
+@pytest.mark.parametrize(
+    "name,prefix,new_prefix,expected",
+    [
+        ("_account_new_pkey", "_account_new", "account", "account_pkey"),
+        ("account_name_key", "account", "_account_old", "_account_old_name_key"),
+        ("unique_name", "account", "_account_old", "_account_old_unique_name"),
+        ("account_" + "x" * 60, "account", "_account_old", "_account_old_" + "x" * 50),
+    ],
+)
+def test_postgresql_renamed(name, prefix, new_prefix, expected):
+    assert PostgreSQLOnlineSchemaChange._renamed(name, prefix, new_prefix) == expected
+
+
+def test_postgresql_index_definition():
+    assert INDEX_NAME_PATTERN.sub(
+        r"\1",
+        'CREATE UNIQUE INDEX "_account_new_Name_key" ON public._account_new '
+        "USING btree (name)",
+    ) == INDEX_NAME_PATTERN.sub(
+        r"\1",
+        "CREATE UNIQUE INDEX account_name_key ON public.account USING btree (name)",
+    )
@@ -0,0 +1,85 @@
+import json
+
+from migri.plan import (
+    format_plans,
+    MigrationPlan,
+    parse_mysql_plan,
+    parse_postgresql_plan,
+    parse_sqlite_plan,
+    StatementPlan,
+)
+
+POSTGRESQL_UPDATE_PLAN = json.dumps(
+    [
+        {
+            "Plan": {
+                "Node Type": "ModifyTable",
+                "Operation": "Update",
+                "Relation Name": "account",
+                "Total Cost": 1693.0,
+                "Plan Rows": 0,
+                "Plans": [
+                    {
+                        "Node Type": "Seq Scan",
+                        "Relation Name": "account",
+                        "Total Cost": 1693.0,
+                        "Plan Rows": 50000,
+                    }
+                ],
+            }
+        }
+    ]
+)
+
+
+def test_parse_postgresql_plan():
+    assert parse_postgresql_plan(POSTGRESQL_UPDATE_PLAN) == (
+        50000,
+        1693.0,
+        ["account"],
+    )
+
+
+def test_parse_mysql_plan():
+    explain_rows = [
+        {"id": 1, "table": "animal", "type": "ALL", "rows": 1200},
+        {"id": 1, "table": "exhibit", "type": "eq_ref", "rows": 1},
+    ]
+    assert parse_mysql_plan(explain_rows) == (1201, ["animal"])
+
+
+def test_parse_sqlite_plan():
+    explain_rows = [
+        {"id": 2, "parent": 0, "notused": 0, "detail": "SCAN account"},
+        {"id": 3, "parent": 0, "notused": 0, "detail": "SCAN TABLE record"},
+        {
+            "id": 4,
+            "parent": 0,
+            "notused": 0,
+            "detail": "SEARCH audit USING INTEGER PRIMARY KEY (rowid=?)",
+        },
+    ]
+    assert parse_sqlite_plan(explain_rows) == ["account", "record"]
+
+
+def test_format_plans():
+    plans = [
+        MigrationPlan(
+            "0002_backfill",
+            [
+                StatementPlan(
+                    1, "UPDATE account SET a = 1", 50000, 1693.0, ("account",)
+                ),
+                StatementPlan(2, "DELETE FROM nope", error="relation does not exist"),
+            ],
+        ),
+        MigrationPlan("0003_load", message="not a SQL migration"),
+    ]
+
+    assert format_plans(plans) == (
+        "0002_backfill: ~50000 rows, cost 1693.00\n"
+        "  #1 ~50000 rows, cost 1693.00 [seq scan: account]\n"
+        "  #2 not explained [relation does not exist]\n"
+        "0003_load: not a SQL migration"
+    )
+    assert json.loads(format_plans(plans, "json"))[0]["estimated_rows"] == 50000
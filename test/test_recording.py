@@ -0,0 +1,117 @@
+import io
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+
+from migri import apply_migrations
+from migri.backends.recording import RecordingConnection, render_literal, render_query
+from migri.elements import Query
+from migri.load import PostgreSQLBulkLoader
+from migri.migration import MigrationStatus
+
+
+@pytest.mark.parametrize(
+    "value,dialect,expected",
+    [
+        (None, "postgresql", "NULL"),
+        (True, "postgresql", "TRUE"),
+        (True, "sqlite", "1"),
+        (Decimal("1.50"), "mysql", "1.50"),
+        ("O'Brien", "postgresql", "'O''Brien'"),
+        ("C:\\path", "postgresql", "'C:\\path'"),
+        ("C:\\path", "mysql", "'C:\\\\path'"),
+        (b"\x00\xff", "postgresql", "'\\x00ff'::bytea"),
+        (b"\x00\xff", "sqlite", "X'00ff'"),
+        (
+            datetime(2021, 5, 1, 12, 30, tzinfo=timezone.utc),
+            "postgresql",
+            "'2021-05-01 12:30:00+00:00'",
+        ),
+    ],
+)
+def test_render_literal(value, dialect, expected):
+    assert render_literal(value, dialect) == expected
+
+
+def test_render_query():
+    query = Query(
+        "SELECT $body$ $a $$ $ab $a $body$ FROM t WHERE a = $a AND b = $ab",
+        values={"a": 1, "ab": "x"},
+    )
+
+    # Only names with values are replaced, and whole names only
+    assert render_query(query, "postgresql") == (
+        "SELECT $body$ 1 $$ 'x' 1 $body$ FROM t WHERE a = 1 AND b = 'x'"
+    )
+
+
+@pytest.mark.asyncio
+async def test_recording_connection():
+    conn = RecordingConnection(target_dialect="mysql")
+    copy = conn.spawn()
+    transaction = conn.transaction()
+
+    await transaction.start()
+    await conn.execute(
+        Query("INSERT INTO t VALUES ($id, $name)", {"id": 1, "name": "a"})
+    )
+    await copy.execute(Query("CREATE TRIGGER t BEGIN SET @a = 1; SET @b = 2; END;"))
+    await conn.execute(Query("SELECT 1 -- trailing comment"))
+    await conn.execute(Query("-- only a comment"))
+    await transaction.commit()
+    # Not started, e.g. an implicit transaction
+    await conn.transaction().rollback()
+
+    assert copy.source is None
+    assert await conn.fetch_all(Query("SELECT name FROM applied_migration")) == []
+    assert conn.script() == (
+        "BEGIN;\n"
+        "INSERT INTO t VALUES (1, 'a');\n"
+        "DELIMITER $$\n"
+        "CREATE TRIGGER t BEGIN SET @a = 1; SET @b = 2; END$$\n"
+        "DELIMITER ;\n"
+        "SELECT 1 -- trailing comment\n"
+        ";\n"
+        "-- only a comment\n"
+        "COMMIT;\n"
+    )
+
+
+def test_recording_connection_requires_dialect():
+    with pytest.raises(RuntimeError):
+        RecordingConnection()
+
+
+@pytest.mark.asyncio
+async def test_recording_connection_copy():
+    conn = RecordingConnection(target_dialect="postgresql")
+
+    loaded = await PostgreSQLBulkLoader(conn).load(
+        io.StringIO('# migri:load table=zone\nname,note\nUTC,"a\nb"\nCET,\n'),
+        "public.zone",
+    )
+
+    assert loaded == 2
+    assert conn.script() == (
+        'COPY "public"."zone" ("name", "note") '
+        "FROM STDIN WITH (FORMAT csv, DELIMITER ',', NULL '');\n"
+        'UTC,"a\nb"\nCET,\n'
+        "\\.\n"
+    )
+
+
+@pytest.mark.asyncio
+async def test_apply_migrations_recording(tmp_path):
+    (tmp_path / "0001_initial.sql").write_text("CREATE TABLE account (id int);")
+    (tmp_path / "0002_accounts.sql").write_text("INSERT INTO account VALUES (1);")
+    conn = RecordingConnection(target_dialect="postgresql")
+
+    # e.g. to measure migri's own overhead, without a database
+    results = await apply_migrations(str(tmp_path), conn)
+
+    assert [r.status for r in results] == [MigrationStatus.SUCCESS] * 2
+    assert "INSERT INTO account VALUES (1);" in conn.statements
+    assert (
+        sum(s.startswith("INSERT INTO applied_migration") for s in conn.statements) == 2
+    )
@@ -0,0 +1,42 @@
+import pytest
+
+from migri.backends.sqlite import SQLiteConnection
+from migri.throttle import LagThrottle, SimulatedLagProbe, sql_lag_probe, Throttle
+
+
+@pytest.mark.asyncio
+async def test_lag_throttle_pauses_while_lag_is_high():
+    probe = SimulatedLagProbe([10.0, 5.0, 0.5, 20.0])
+    throttle = LagThrottle(probe, max_lag=1.0, interval=0.01)
+
+    await throttle.wait(None)
+
+    assert probe.checks == 3
+    assert throttle.throttled_seconds >= 0.02
+
+
+@pytest.mark.asyncio
+async def test_lag_throttle_no_lag():
+    throttle = LagThrottle(SimulatedLagProbe([None]), max_lag=1.0, interval=0.01)
+    await throttle.wait(None)
+
+    assert throttle.throttled_seconds == 0.0
+    assert Throttle().throttled_seconds == 0.0
+
+
+@pytest.mark.asyncio
+async def test_lag_throttle_timeout():
+    throttle = LagThrottle(
+        SimulatedLagProbe([10.0]), max_lag=1.0, interval=0.01, timeout=0.03
+    )
+
+    with pytest.raises(TimeoutError):
+        await throttle.wait(None)
+
+
+@pytest.mark.asyncio
+async def test_sql_lag_probe(tmp_path):
+    async with SQLiteConnection(str(tmp_path / "test.db")) as conn:
+        assert await sql_lag_probe("SELECT 2.5 AS lag")(conn) == 2.5
+        assert await sql_lag_probe("SELECT 1 AS a, 3 AS lag", "lag")(conn) == 3.0
+        assert await sql_lag_probe("SELECT NULL AS lag")(conn) is None
@@ -0,0 +1,59 @@
+import json
+
+import pytest
+
+from migri.tracing import create_tracer, JSONLinesTracer, parse_traceparent, Tracer
+
+TRACEPARENT = "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"
+
+
+def _read_spans(path) -> list:
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_parse_traceparent():
+    assert parse_traceparent(TRACEPARENT) == (
+        "4bf92f3577b34da6a3ce929d0e0e4736",
+        "00f067aa0ba902b7",
+    )
+
+    with pytest.raises(ValueError):
+        parse_traceparent("00-nope-01")
+
+
+def test_json_lines_tracer(tmp_path):
+    path = tmp_path / "trace.jsonl"
+    tracer = JSONLinesTracer(str(path), TRACEPARENT)
+
+    with tracer.span("migri.run"):
+        with tracer.span("migri.migration", migration="0001_initial") as span:
+            span.set_attribute("status", "ok")
+
+        with pytest.raises(RuntimeError):
+            with tracer.span("migri.migration", migration="0002_broken"):
+                raise RuntimeError("boom")
+
+    tracer.close()
+    first, second, run = _read_spans(path)
+
+    assert {s["trace_id"] for s in (first, second, run)} == {
+        "4bf92f3577b34da6a3ce929d0e0e4736"
+    }
+    assert run["name"] == "migri.run"
+    assert run["parent_span_id"] == "00f067aa0ba902b7"
+    assert first["parent_span_id"] == run["span_id"]
+    assert second["parent_span_id"] == run["span_id"]
+    assert first["attributes"] == {"migration": "0001_initial", "status": "ok"}
+    assert second["status"] == "error"
+    assert second["attributes"]["error.message"] == "boom"
+    assert run["end_time_unix_nano"] >= run["start_time_unix_nano"]
+
+
+def test_create_tracer(monkeypatch, tmp_path):
+    monkeypatch.setenv("TRACEPARENT", TRACEPARENT)
+
+    assert type(create_tracer()) is Tracer
+
+    tracer = create_tracer(str(tmp_path / "trace.jsonl"))
+    assert tracer.trace_id == "4bf92f3577b34da6a3ce929d0e0e4736"
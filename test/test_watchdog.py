@@ -0,0 +1,138 @@
+import pytest
+
+from migri import apply_migrations, get_connection
+from migri.metrics import OpenMetricsRecorder
+from migri.migration import MigrationStatus
+from migri.watchdog import LockQueueWatchdog, LockSample, PostgreSQLLockQueueWatchdog
+
+# Runs for several seconds unless it's interrupted
+SLOW_QUERY = (
+    "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c "
+    "WHERE x < 1000000000) SELECT COUNT(*) FROM c;\n"
+)
+
+
+class SimulatedLockQueueWatchdog(LockQueueWatchdog):
+    """Reports the given samples in order for the migration's connection, and
+    `other_sample` for other connections, and interrupts SQLite queries
+    """
+
+    def __init__(self, samples, other_sample=LockSample(0, 0.0), **options):
+        super().__init__(**options)
+        self.samples = samples
+        self.other_sample = other_sample
+        self.checks = 0
+        self.connections = []
+        self.cancelled = []
+
+    async def _backend_id(self, connection) -> int:
+        self.connections.append(connection)
+        return len(self.connections)
+
+    async def _sample(self, backend: int) -> LockSample:
+        if backend > 1:
+            return self.other_sample
+
+        sample = self.samples[min(self.checks, len(self.samples) - 1)]
+        self.checks += 1
+        return sample
+
+    async def _cancel(self, backend: int):
+        self.cancelled.append(backend)
+        await self.connections[backend - 1].database.interrupt()
+
+
+@pytest.mark.parametrize(
+    "sample,expected",
+    [
+        (LockSample(blocked=2, max_wait=1.0), None),
+        (LockSample(blocked=6, max_wait=1.0), "blocked 6 sessions (limit 5)"),
+        (
+            LockSample(blocked=1, max_wait=3.25),
+            "blocked a session for 3.2s (limit 3.0s)",
+        ),
+    ],
+)
+def test_lock_queue_watchdog_thresholds(sample, expected):
+    watchdog = SimulatedLockQueueWatchdog([], max_blocked=5, max_wait=3.0)
+    assert watchdog._exceeded(sample) == expected
+
+
+def test_lock_queue_watchdog_requires_threshold():
+    with pytest.raises(ValueError):
+        SimulatedLockQueueWatchdog([])
+
+
+def test_lock_queue_watchdog_fresh():
+    watchdog = PostgreSQLLockQueueWatchdog(max_wait=3.0, interval=0.1)
+    watchdog.lock_wait_seconds = 1.0
+    fresh = watchdog.fresh()
+
+    assert fresh is not watchdog
+    assert isinstance(fresh, PostgreSQLLockQueueWatchdog)
+    assert (fresh.max_blocked, fresh.max_wait, fresh.interval) == (None, 3.0, 0.1)
+    assert fresh.lock_wait_seconds == 0.0
+
+
+@pytest.mark.asyncio
+async def test_lock_queue_watchdog_cancels_migration(tmp_path):
+    migrations_dir = tmp_path / "migrations"
+    migrations_dir.mkdir()
+    (migrations_dir / "0001_initial.sql").write_text("CREATE TABLE account (id int);")
+    (migrations_dir / "0002_slow.sql").write_text(SLOW_QUERY)
+
+    watchdog = SimulatedLockQueueWatchdog(
+        [
+            LockSample(blocked=0, max_wait=0.0, waiting=True),
+            LockSample(blocked=0, max_wait=0.0, waiting=True),
+            LockSample(blocked=3, max_wait=0.2),
+        ],
+        max_blocked=2,
+        interval=0.05,
+    )
+    metrics = OpenMetricsRecorder(path=str(tmp_path / "migri.prom"))
+    results = await apply_migrations(
+        str(migrations_dir),
+        get_connection(str(tmp_path / "test.db")),
+        metrics=metrics,
+        watchdog=watchdog,
+    )
+
+    assert [r.status for r in results] == [
+        MigrationStatus.SUCCESS,
+        MigrationStatus.FAILURE,
+    ]
+    assert results[1].message == (
+        "cancelled by lock watchdog: migration blocked 3 sessions (limit 2)"
+    )
+    assert metrics.lock_wait_seconds == pytest.approx(0.1)
+    assert watchdog._monitor is None
+
+
+@pytest.mark.asyncio
+async def test_lock_queue_watchdog_watches_parallel_groups(tmp_path):
+    (tmp_path / "0001_slow.sql").write_text(
+        "-- migri:no-transaction\n"
+        "-- migri:parallel\n"
+        f"{SLOW_QUERY}"
+        f"{SLOW_QUERY}"
+        "-- migri:end-parallel\n"
+    )
+
+    watchdog = SimulatedLockQueueWatchdog(
+        [LockSample(blocked=0, max_wait=0.0)],
+        other_sample=LockSample(blocked=2, max_wait=0.1),
+        max_blocked=3,
+        interval=0.05,
+    )
+    results = await apply_migrations(
+        str(tmp_path), get_connection(str(tmp_path / "test.db")), watchdog=watchdog
+    )
+
+    assert results[0].status == MigrationStatus.FAILURE
+    assert results[0].message == (
+        "cancelled by lock watchdog: migration blocked 4 sessions (limit 3)"
+    )
+    # Only the connections blocking others
+    assert watchdog.cancelled == [2, 3]
+    assert watchdog._backends == {}